@@ -1,241 +1,280 @@
 import os
 import re
 import time
-import json
 import logging
+import argparse
 import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from bs4 import BeautifulSoup, NavigableString
+import soupsieve
+from bs4 import BeautifulSoup, NavigableString, Tag, SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
 
+from http_fetch import fetch_http_page, MATCH_PAGE_MARKERS
+from tulospalvelu_source import TulospalveluJsonSource, clean_stat_name
+from page_store import PageStore
+from match_store import MatchStore, STORE_FILE, read_records, should_replace, status_rank
+from driver_cache import start_chrome, profile_slots, apply_warm_profile, WARM_PROFILE
+from browser_profile import apply_blocking_options, enable_request_blocking, blocking_report, RESOURCE_BLOCKING
+from debug_artifacts import DebugArtifactWriter, DEBUG_MODE, DEBUG_MODES
+from page_ready import wait_until_ready, readiness_stats
+from tab_fetcher import TabFetcher, TAB_COUNT, apply_tab_options
+from rate_limiter import configure_rate_limiter, DEFAULT_BURST
+from scrape_metrics import scrape_metrics
+from log_setup import setup_logging, setup_worker_logging, LOG_FORMAT
+from live_tracker import LiveEventLog, diff_live_fields, LIVE_INTERVAL, LIVE_DURATION, LIVE_LOOKAHEAD
+from match_queue import MatchWorkQueue, QUEUE_FILE, gallop_frontier, GALLOP_MAX_SPAN
+from shard_lease import LeaseStore, SHARD_DB, PARTS_DIR, RANGE_SIZE, LEASE_TTL, default_owner, partition_dir, partition_dirs
+
 # --- Loggausasetukset ja Globaalit muuttujat ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("match_scraper.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FILE = os.environ.get("SCRAPER_LOG_FILE", "match_scraper.log")
+setup_logging(LOG_FILE) # Jono + taustakirjoittaja, kierrätys 1 Mt:n kohdalla, ks. log_setup.py
 logger = logging.getLogger(__name__)
 BASE_URL = "https://tulospalvelu.palloliitto.fi/match/{match_id}/stats"
 MAX_MATCHES = 10 # Hakee 10 ID:tä per ajo. Voit nostaa tätä väliaikaisesti, jos haluat nopeuttaa alkukeräystä.
-REQUEST_DELAY = 2.5
+REQUEST_DELAY = 2.5 # Nopeusrajoittimen aloitusväli sekunteina (kaikki workerit yhteensä); väli mukautuu ajon aikana
+WORKERS = 1 # Rinnakkaisten selainten määrä, ks. --workers
 CACHE_DIR = "scrape_cache"
 OUTPUT_FILE = "match_data.json"
 LAST_ID_FILE = "last_match_id.txt"
+DRIVER_MAX_PAGES = 25 # Kierrätetään selain tämän monen sivun jälkeen, ettei muistivuoto kasva
+POST_LOAD_SLEEP = 2 # Entinen kiinteä odotus latauksen jälkeen; valmiustunnistuksen säästö lasketaan tätä vasten
+PROBE_WAIT = 15 # Frontier-koetuksen lyhyt odotus; tyhjä ID ei maksa 3 x 60 s täyttä hakua
 Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
 
-# --- MatchDataScraper -luokka ---
-class MatchDataScraper:
-    def __init__(self):
-        self.current_id = self.load_last_id()
-        self.match_data = self.load_data()
-
-    def setup_driver_local(self):
-        chrome_options = Options()
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--lang=fi-FI")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            'intl.accept_languages': 'fi,fi_FI'
-        }
-        chrome_options.add_experimental_option('prefs', prefs)
-        try:
-            # Yritetään asentaa Chromedriver käyttäen Service-objektia, joka on suositeltu tapa
-            service = Service(ChromeDriverManager().install(), log_output=os.devnull) # log_output ohjaa driverin lokit pois
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.set_page_load_timeout(60) # Pidennetty timeout
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})") # Piilota webdriver-ominaisuus
-            logger.debug("Selain alustettu ilman kuvien latausta.")
-            return driver
-        except Exception as e:
-            logger.error(f"Selaimen alustus epäonnistui: {str(e)}")
-            # Fallback: Yritetään ilman Service-objektia, jos yllä oleva epäonnistuu
-            try:
-                logger.info("Yritetään yksinkertaisempaa driverin alustusta...")
-                driver = webdriver.Chrome(options=chrome_options)
-                driver.set_page_load_timeout(60)
-                logger.debug("Yksinkertaistettu selain alustettu ilman kuvien latausta.")
-                return driver
-            except Exception as e2:
-                logger.critical(f"Driverin alustus epäonnistui täysin: {e2}")
-                raise # Heitä virhe eteenpäin, jos kumpikaan ei onnistu
-
-    def fetch_page(self, url):
-        driver = None
-        last_exception = None
-        wait_element_selector = "div.widget-match" # Odotettava elementti, joka indikoi sivun latautumista
+# Jäsennysmoottori: lxml on selvästi nopeampi kuin Pythonin html.parser ja tuottaa saman tietueen
+try:
+    import lxml # noqa: F401
+    DEFAULT_PARSER_BACKEND = "lxml"
+except ImportError:
+    DEFAULT_PARSER_BACKEND = "html.parser"
+PARSER_BACKENDS = ("lxml", "html.parser")
+MARKUP_PREVIEW_CHARS = 200 # Varoituksiin vain lyhyt ote; koko prettify() vain debug-tasolla
 
-        for attempt in range(1, 4): # Yritä enintään 3 kertaa
-            try:
-                logger.debug(f"fetch_page yritys {attempt}/3 URL: {url}")
-                driver = self.setup_driver_local()
-                if not driver:
-                    raise WebDriverException("Driverin alustus epäonnistui setup_driver_local-metodissa.")
 
-                driver.get(url)
-                logger.debug(f"Sivu {url} avattu yrityksellä {attempt}")
+def markup_preview(tag):
+    """Short text of a tag for warnings; the full prettified markup only when DEBUG is enabled"""
+    # Muodostetaan heti kutsujan säikeessä: jäsennys voi vielä muokata puuta (esim. crest.extract())
+    if logger.isEnabledFor(logging.DEBUG):
+        return tag.prettify()
+    text = tag.get_text(" ", strip=True)
+    return text if len(text) <= MARKUP_PREVIEW_CHARS else text[:MARKUP_PREVIEW_CHARS] + "..."
 
-                try:
-                    logger.debug(f"Odotetaan elementtiä '{wait_element_selector}' enintään 60 sekuntia...")
-                    WebDriverWait(driver, 60).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, wait_element_selector))
-                    )
-                    logger.debug(f"Odotettu elementti '{wait_element_selector}' löytyi.")
-                except TimeoutException:
-                    page_title = driver.title
-                    logger.warning(
-                        f"Elementti '{wait_element_selector}' ei löytynyt ajoissa sivulla {url} (Otsikko: {page_title}). "
-                        f"Todennäköisesti sivu on tyhjä tai ei sisällä otteludataa. "
-                        f"Tarkista {CACHE_DIR}-kansiosta mahdolliset kuvakaappaukset."
-                    )
-                    # Tallenna kuvakaappaus, jos elementtiä ei löydy
-                    screenshot_path = os.path.join(CACHE_DIR, f"{url.split('/')[-2]}_wait_timeout_err.png")
-                    try:
-                        driver.save_screenshot(screenshot_path)
-                        logger.info(f"Kuvakaappaus tallennettu (wait timeout): {screenshot_path}")
-                    except Exception as ss_err:
-                        logger.error(f"Kuvakaappauksen tallennus epäonnistui (wait timeout): {ss_err}")
-                    # Ei palauteta None heti, vaan annetaan mahdollisuus jatkaa ja katsoa, onko sivulla silti jotain
-                
-                time.sleep(2) # Anna dynaamiselle sisällölle lisäaikaa latautua odotuksen jälkeen
+# --- Selainpooli ---
+class DriverPool:
+    """Keeps warm Chrome instances for one run and hands them out to fetch_page."""
 
-                page_source = driver.page_source
-                logger.debug(f"Sivun lähdekoodi haettu (pituus: {len(page_source)} merkkiä)")
+    def __init__(self, factory, size=1, max_pages_per_driver=DRIVER_MAX_PAGES, on_discard=None):
+        self.factory = factory # Funktio, joka luo uuden driverin (esim. setup_driver_local)
+        self.on_discard = on_discard # Kutsutaan suljetulle driverille, esim. profiilipaikan vapautus
+        self.size = max(1, size)
+        self.max_pages_per_driver = max_pages_per_driver
+        self._idle = [] # LIFO: viimeksi käytetty (lämpimin) selain annetaan ensin
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock) # Herättää odottajat, kun selain palaa tai paikka vapautuu
+        self._page_counts = {} # id(driver) -> haettujen sivujen määrä
+        self._drivers = {} # id(driver) -> driver, kaikki elossa olevat selaimet
+        self._reserved = 0 # Luonnissa olevat selaimet, jotta koko ei ylity rinnakkain
+        self.launches = 0
+        self.recycled = 0
 
-                if len(page_source) < 10000: # Tarkistus, että sivu ei ole epäilyttävän lyhyt
-                    logger.warning(f"Sivu {url} vaikuttaa lyhyeltä (koko: {len(page_source)}), mahdollinen virhe tai data puuttuu.")
-                    self.save_debug_files(url.split('/')[-2], page_source, "LYHYT_SIVU") # Tallenna lyhyt sivu debuggausta varten
-                    # Ei palauteta None tässä, vaan annetaan extract_data yrittää
-                    # return None
+    def acquire(self, timeout=None):
+        """Return an idle driver or start one within size; otherwise wait (queue.Empty after timeout)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._available:
+                # Kierrätetty tai kaatunut selain vapauttaa paikan ilman idle-selainta: tila tarkistetaan joka herätyksellä
+                while not self._idle and len(self._drivers) + self._reserved >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Empty
+                    self._available.wait(remaining)
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    self._reserved += 1
 
-                logger.info(f"Sivun {url} haku onnistui yrityksellä {attempt}")
-                return page_source
+            if driver is None:
+                driver = self._launch()
+                logger.debug("Pooli käynnisti uuden selaimen (%s. käynnistys tällä ajolla).", self.launches)
+                return driver
+            if self._is_healthy(driver):
+                return driver
+            logger.warning("Poolin selain ei vastannut terveystarkistukseen, käynnistetään uusi.")
+            self._discard(driver)
 
-            except (TimeoutException, WebDriverException, NoSuchElementException) as e:
-                logger.warning(f"{type(e).__name__} yrityksellä {attempt}/3 haettaessa {url}: {e}")
-                last_exception = e
-            except Exception as e: # Yleinen poikkeus
-                logger.error(f"Yleinen virhe sivun haussa yrityksellä {attempt}/3 ({url}): {type(e).__name__} - {str(e)}", exc_info=True)
-                last_exception = e
-            finally:
+    def _launch(self):
+        driver = None
+        try:
+            with scrape_metrics.timer('driver_startup_seconds'):
+                driver = self.factory()
+        finally:
+            with self._available:
+                self._reserved -= 1
                 if driver:
-                    logger.debug(f"Suljetaan driver yrityksen {attempt} jälkeen.")
-                    driver.quit()
-                if attempt < 3: # Jos ei ollut viimeinen yritys
-                    wait_time = REQUEST_DELAY + attempt * 3 # Kasvava odotusaika
-                    logger.debug(f"Odotetaan {wait_time}s ennen seuraavaa yritystä...")
-                    time.sleep(wait_time)
-        
-        logger.error(f"Sivun {url} haku epäonnistui {attempt} yrityksen jälkeen. Viimeisin virhe: {last_exception}")
-        return None
+                    self._drivers[id(driver)] = driver
+                    self._page_counts[id(driver)] = 0
+                    self.launches += 1
+                else:
+                    self._available.notify() # Varattu paikka vapautui toiselle odottajalle
+        if not driver:
+            raise WebDriverException("Driverin alustus epäonnistui poolissa.")
+        return driver
 
-    def save_debug_files(self, match_id, html_content, context_text):
-        try:
-            match_id_str = str(match_id)
-            debug_dir = os.path.join(CACHE_DIR, match_id_str)
-            Path(debug_dir).mkdir(parents=True, exist_ok=True)
-            
-            html_to_write = html_content if html_content else "<!-- HTML content was empty or None -->"
-            
-            # Poistetaan vanhat vastaavat tiedostot ennen uuden tallennusta
-            for old_file in Path(debug_dir).glob(f"{match_id_str}_{context_text}_*.html"):
-                old_file.unlink()
-
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            html_path = os.path.join(debug_dir, f"{match_id_str}_{context_text}_{timestamp}.html")
-            
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_to_write)
-            logger.debug(f"Tallennettu debug HTML: {html_path}")
-        except Exception as e:
-            logger.error(f"Debug HTML -tiedoston tallennus epäonnistui (ID: {match_id_str}): {e}")
+    def release(self, driver, broken=False):
+        if driver is None:
+            return
+        with self._lock:
+            if id(driver) not in self._drivers:
+                return
+            self._page_counts[id(driver)] += 1
+            worn_out = self._page_counts[id(driver)] >= self.max_pages_per_driver
+        if broken or worn_out:
+            logger.debug("Kierrätetään selain (%s).", 'kaatui' if broken else 'sivuraja täynnä')
+            self.recycled += 1
+            self._discard(driver)
+        else:
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
 
+    def close(self):
+        with self._lock:
+            drivers = list(self._drivers.values())
+            self._idle.clear()
+        for driver in drivers:
+            self._discard(driver)
+        logger.info("Selainpooli suljettu. Käynnistyksiä: %s, kierrätyksiä: %s", self.launches, self.recycled)
 
-    def load_last_id(self):
-        start_id_default = 3748451 # Oletusaloitus ID, jos tiedostoa ei löydy tai se on virheellinen
+    def _is_healthy(self, driver):
         try:
-            if os.path.exists(LAST_ID_FILE):
-                with open(LAST_ID_FILE, 'r') as f:
-                    last_id = int(f.read().strip())
-                logger.info(f"Ladatty viimeisin ID: {last_id} tiedostosta {LAST_ID_FILE}")
-                # Varmistetaan, että ID ei ole negatiivinen
-                return max(0, last_id)
-            else:
-                logger.info(f"Tiedostoa {LAST_ID_FILE} ei löytynyt. Aloitetaan ID:stä {start_id_default -1} (jotta ensimmäinen haettava ID on {start_id_default}).")
-                # Palautetaan ID, joka on yhtä pienempi kuin haluttu aloitus ID
-                return start_id_default - 1 
-        except (ValueError, Exception) as e:
-            logger.error(f"Virhe ladattaessa viimeisintä ID:tä tiedostosta {LAST_ID_FILE}: {e}. Aloitetaan ID:stä {start_id_default - 1}.")
-            return start_id_default - 1
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
 
-    def save_last_id(self):
+    def _discard(self, driver):
+        with self._available:
+            self._drivers.pop(id(driver), None)
+            self._page_counts.pop(id(driver), None)
+            self._available.notify() # Odottaja voi käynnistää korvaavan selaimen
         try:
-            with open(LAST_ID_FILE, 'w') as f:
-                f.write(str(self.current_id))
-            logger.info(f"Tallennettu viimeisin käsitelty ID: {self.current_id} tiedostoon {LAST_ID_FILE}")
+            driver.quit()
         except Exception as e:
-            logger.error(f"Virhe tallennettaessa viimeisintä ID:tä ({self.current_id}) tiedostoon {LAST_ID_FILE}: {e}")
+            logger.debug("Selaimen sulkeminen epäonnistui: %s", e)
+        if self.on_discard:
+            self.on_discard(driver)
 
-    def load_data(self):
-        try:
-            if os.path.exists(OUTPUT_FILE):
-                with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                    try:
-                        data = json.load(f)
-                        logger.info(f"Ladatty {len(data)} tietuetta tiedostosta {OUTPUT_FILE}.")
-                        return data if isinstance(data, list) else [] # Varmista, että palautetaan lista
-                    except json.JSONDecodeError:
-                        logger.error(f"Virhe JSON-datan dekoodauksessa tiedostosta {OUTPUT_FILE}. Aloitetaan tyhjästä listasta.")
-                        return [] # Palauta tyhjä lista, jos JSON on korruptoitunut
-            else:
-                logger.info(f"Tiedostoa {OUTPUT_FILE} ei löytynyt, aloitetaan tyhjästä listasta.")
-                return []
-        except Exception as e: # Yleinen poikkeus
-            logger.error(f"Yleinen virhe datan latauksessa tiedostosta {OUTPUT_FILE}: {e}. Aloitetaan tyhjästä listasta.")
-            return []
+# --- Osittainen jäsennys ---
+class MatchRegionStrainer(SoupStrainer):
+    """Keeps only the page regions extract_data reads; navigation, ads, scripts and other widgets are never built.
 
-    def save_data(self):
-        try:
-            # Varmistetaan, että data on lista ennen tallennusta
-            if not isinstance(self.match_data, list):
-                logger.error(f"Tallennusyritys epäonnistui: self.match_data ei ole lista (tyyppi: {type(self.match_data)}). Ei tallenneta.")
-                return
+    Works with both SoupStrainer APIs: search_tag (bs4 < 4.13) and allow_tag_creation (bs4 >= 4.13).
+    """
+
+    REGION_CLASSES = {'widget-match', 'widget-match-info', 'stats-wrapper', 'awards-container'}
+    REGION_CLASS_PREFIXES = ('widget-match-info-item', 'redcard_', 'yellowcard_')
+
+    def __init__(self):
+        super().__init__(name=['title', 'div', 'a', 'h3']) # Nimisääntö estää myös irralliset tekstisolmut
+
+    @classmethod
+    def is_region(cls, name, attrs):
+        if name == 'title':
+            return True
+        attrs = attrs if isinstance(attrs, dict) else dict(attrs or [])
+        element_id = attrs.get('id') or ''
+        raw_classes = attrs.get('class') or ''
+        classes = set(raw_classes.split() if isinstance(raw_classes, str) else raw_classes)
+        if name == 'a':
+            return element_id in ('team_A', 'team_B')
+        if name == 'h3':
+            return 'section-title' in classes # Maalit ja syötöt -otsikko
+        if name == 'div':
+            return bool(
+                classes & cls.REGION_CLASSES
+                or any(c.startswith(cls.REGION_CLASS_PREFIXES) for c in classes)
+                or {'row', 'gutter-12'} <= classes # Maalit ja syötöt -taulukot
+                or element_id.startswith('scorers_')
+            )
+        return False
+
+    def search_tag(self, markup_name=None, markup_attrs={}): # bs4 < 4.13
+        if isinstance(markup_name, Tag):
+            markup_attrs, markup_name = markup_name.attrs, markup_name.name
+        return markup_name if self.is_region(markup_name, markup_attrs) else None
+
+    def allow_tag_creation(self, nsprefix, name, attrs): # bs4 >= 4.13
+        return self.is_region(name, attrs)
+
+# --- Käännetty poimintasuunnitelma ---
+class ExtractionPlan:
+    """Compiles CSS selectors once and resolves all of them in a single walk over the document.
+
+    first_fields give the first matching element (like select_one), all_fields every match in
+    document order (like select). Selectors are bucketed by the tag name of their last compound,
+    so each element is only tested against selectors that can match it.
+    """
+
+    def __init__(self, first_fields, all_fields=None):
+        self.first_fields = dict(first_fields)
+        self.all_fields = dict(all_fields or {})
+        self._buckets = {} # tagin nimi (tai '*') -> [(kenttä, käännetty selektori, kaikki?)]
+        for fields, collect_all in ((self.first_fields, False), (self.all_fields, True)):
+            for field, css in fields.items():
+                self._buckets.setdefault(self._key_tag(css), []).append((field, soupsieve.compile(css), collect_all))
+
+    @staticmethod
+    def _key_tag(css):
+        last_compound = re.split(r'[\s>+~]+', css.strip())[-1]
+        tag_match = re.match(r'[a-zA-Z][\w-]*', last_compound)
+        return tag_match.group(0).lower() if tag_match else '*'
+
+    def run(self, root):
+        found = {field: None for field in self.first_fields}
+        found.update({field: [] for field in self.all_fields})
+        wildcard = self._buckets.get('*', [])
+        remaining_first = len(self.first_fields)
+        for element in root.descendants:
+            if not isinstance(element, Tag):
+                continue
+            candidates = self._buckets.get(element.name)
+            if not candidates and not wildcard:
+                continue
+            for field, selector, collect_all in (candidates or []) + wildcard:
+                if collect_all:
+                    if selector.match(element):
+                        found[field].append(element)
+                elif found[field] is None and selector.match(element):
+                    found[field] = element
+                    remaining_first -= 1
+            if remaining_first == 0 and not self.all_fields:
+                break
+        return found
+
+# --- Ottelusivun jäsennin ---
+class MatchPageParser:
+    """Turns a match page into a record. Has no browser or file state, so worker processes can use it."""
+
+    def __init__(self, parser_backend=DEFAULT_PARSER_BACKEND, partial=True):
+        if parser_backend not in PARSER_BACKENDS:
+            raise ValueError(f"Tuntematon jäsennysmoottori '{parser_backend}', vaihtoehdot: {', '.join(PARSER_BACKENDS)}")
+        self.parser_backend = parser_backend
+        self.partial = partial # Rakennetaan puu vain tarvittavista alueista (MatchRegionStrainer)
+
+    def make_soup(self, html):
+        if self.partial:
+            return BeautifulSoup(html, self.parser_backend, parse_only=MatchRegionStrainer())
+        return BeautifulSoup(html, self.parser_backend)
 
-            # Poistetaan duplikaatit ID:n perusteella ennen lopullista tallennusta, pitäen viimeisimmän version
-            final_data_map = {}
-            for item in self.match_data:
-                if isinstance(item, dict) and item.get('match_id') is not None:
-                    # Jos ID on jo olemassa, uudempi (myöhemmin listalla oleva) korvaa sen
-                    final_data_map[item.get('match_id')] = item 
-            
-            # Järjestä ID:n mukaan
-            sorted_data = sorted(list(final_data_map.values()), key=lambda x: x.get('match_id', 0))
-
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(sorted_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Tallennettu {len(sorted_data)} tietuetta tiedostoon {OUTPUT_FILE}.")
-        except Exception as e:
-            logger.error(f"Virhe tallennettaessa dataa tiedostoon {OUTPUT_FILE}: {e}")
-    
     # --- Selektorit ---
+    WAIT_ELEMENT_SELECTOR = "div.widget-match" # Odotettava elementti, joka indikoi sivun latautumista
     HOME_TEAM_SELECTOR = "a#team_A span.teamname"
     AWAY_TEAM_SELECTOR = "a#team_B span.teamname"
     SCORE_SELECTOR = "div.widget-match-header-score span.score"
@@ -269,13 +308,57 @@ class MatchDataScraper:
     GOAL_ASSIST_JERSEY_SELECTOR = "td.jersey"
     GOAL_ASSIST_PLAYER_SELECTOR = "td.player a"
     GOAL_ASSIST_CONTRIBUTION_SELECTOR = "td.contribution"
+    SCORERS_CONTAINER_SELECTOR = "div#scorers_{team} div.football.scorernames" # {team} = 'A' tai 'B'
+    RED_CARD_SELECTOR = "div.redcard_{team} span" # Olettaen että span sisältää nimen ja ajan
+    YELLOW_CARD_SELECTOR = "div.yellowcard_{team} span"
+
+    @classmethod
+    def compile_plan(cls):
+        """Build the ExtractionPlan for all page-level selectors of extract_data and extract_events."""
+        first_fields = {
+            'page_title': "title",
+            'team_home': cls.HOME_TEAM_SELECTOR,
+            'team_away': cls.AWAY_TEAM_SELECTOR,
+            'score': cls.SCORE_SELECTOR,
+            'score_halftime': cls.HALF_TIME_SCORE_SELECTOR,
+            'match_status_raw': cls.STATUS_SELECTOR,
+            'info_block': cls.INFO_BLOCK_SELECTOR,
+            'formation': cls.FORMATION_SELECTOR,
+            'match_duration_format': cls.MATCH_DURATION_SELECTOR,
+            'substitutions_allowed': cls.SUBSTITUTIONS_SELECTOR,
+            'weather': cls.WEATHER_SELECTOR,
+            'audience': cls.ATTENDANCE_SELECTOR,
+            'award_container': cls.AWARD_CONTAINER_SELECTOR,
+        }
+        all_fields = {'stat_wrappers': cls.STATS_WRAPPER_SELECTOR}
+        for team in ('A', 'B'):
+            first_fields[f'scorers_{team}'] = cls.SCORERS_CONTAINER_SELECTOR.format(team=team)
+            all_fields[f'red_cards_{team}'] = cls.RED_CARD_SELECTOR.format(team=team)
+            all_fields[f'yellow_cards_{team}'] = cls.YELLOW_CARD_SELECTOR.format(team=team)
+        return ExtractionPlan(first_fields, all_fields)
+
+    @classmethod
+    def compile_live_plan(cls):
+        """ExtractionPlan for the fields that change during a match (score, status, stats, events)."""
+        first_fields = {
+            'score': cls.SCORE_SELECTOR,
+            'score_halftime': cls.HALF_TIME_SCORE_SELECTOR,
+            'match_status_raw': cls.STATUS_SELECTOR,
+        }
+        all_fields = {'stat_wrappers': cls.STATS_WRAPPER_SELECTOR}
+        for team in ('A', 'B'):
+            first_fields[f'scorers_{team}'] = cls.SCORERS_CONTAINER_SELECTOR.format(team=team)
+            all_fields[f'red_cards_{team}'] = cls.RED_CARD_SELECTOR.format(team=team)
+            all_fields[f'yellow_cards_{team}'] = cls.YELLOW_CARD_SELECTOR.format(team=team)
+        return ExtractionPlan(first_fields, all_fields)
 
-    def extract_events(self, soup, team_id_suffix): # team_id_suffix 'A' tai 'B'
+    def extract_events(self, soup, team_id_suffix, nodes=None): # team_id_suffix 'A' tai 'B'
         events = {'goals': [], 'yellow_cards': [], 'red_cards': []}
         try:
+            if nodes is None: # Kutsuttu suoraan ilman extract_datan läpikäyntiä
+                nodes = self.extraction_plan.run(soup)
             # Maalit
-            scorers_container_selector = f"div#scorers_{team_id_suffix} div.football.scorernames"
-            scorers_container = soup.select_one(scorers_container_selector)
+            scorers_container = nodes[f'scorers_{team_id_suffix}']
             if scorers_container:
                 scorer_spans = scorers_container.find_all('span', recursive=False) # Vain suorat lapsielementit
                 for scorer_span in scorer_spans:
@@ -289,11 +372,10 @@ class MatchDataScraper:
                              goal_times = re.findall(r"(\d+'?)", goal_times_str) # Etsii numeroita ja valinnaista heittomerkkiä
                              for time_val in goal_times:
                                  events['goals'].append({'player': player_name, 'time': time_val.replace("'", "") + "'", 'link': player_href})
-                                 logger.debug(f"Maali ({team_id_suffix}): {player_name} ({time_val})")
+                                 logger.debug("Maali (%s): %s (%s)", team_id_suffix, player_name, time_val)
 
             # Punaiset kortit
-            red_card_selector = f"div.redcard_{team_id_suffix} span" # Olettaen että span sisältää nimen ja ajan
-            red_card_spans = soup.select(red_card_selector)
+            red_card_spans = nodes[f'red_cards_{team_id_suffix}']
             for span in red_card_spans:
                 text_content = span.get_text(strip=True)
                 # Yritä purkaa nimi ja aika, esim. "Pelaaja Nimi 78'"
@@ -302,11 +384,10 @@ class MatchDataScraper:
                     player_name = match_obj.group(1).strip()
                     time_str = match_obj.group(2).replace("'", "") + "'" # Varmista heittomerkki
                     events['red_cards'].append({'player': player_name, 'time': time_str})
-                    logger.debug(f"Punainen kortti ({team_id_suffix}): {player_name} ({time_str})")
+                    logger.debug("Punainen kortti (%s): %s (%s)", team_id_suffix, player_name, time_str)
 
             # Keltaiset kortit
-            yellow_card_selector = f"div.yellowcard_{team_id_suffix} span"
-            yellow_card_spans = soup.select(yellow_card_selector)
+            yellow_card_spans = nodes[f'yellow_cards_{team_id_suffix}']
             for span in yellow_card_spans:
                 text_content = span.get_text(strip=True)
                 match_obj = re.match(r"(.+)\s+(\d+'?)", text_content)
@@ -314,44 +395,75 @@ class MatchDataScraper:
                     player_name = match_obj.group(1).strip()
                     time_str = match_obj.group(2).replace("'", "") + "'"
                     events['yellow_cards'].append({'player': player_name, 'time': time_str})
-                    logger.debug(f"Keltainen kortti ({team_id_suffix}): {player_name} ({time_str})")
+                    logger.debug("Keltainen kortti (%s): %s (%s)", team_id_suffix, player_name, time_str)
 
         except Exception as e:
-            logger.error(f"Virhe tapahtumien purussa ({team_id_suffix}): {e}", exc_info=True)
+            logger.error("Virhe tapahtumien purussa (%s): %s", team_id_suffix, e, exc_info=True)
         return events
 
-    def extract_data(self, soup, match_id):
-        data = {'match_id': match_id, 'match_id_from_page': None}
-        logger.debug(f"Aloitetaan datan purku ID:lle {match_id}")
-
-        # Sivun otsikko
-        try: data['page_title'] = soup.find('title').get_text(strip=True) if soup.find('title') else None
-        except Exception as e: logger.warning(f"Virhe otsikko: {e}"); data['page_title'] = None
-        
-        # Joukkueet
-        try: data['team_home'] = soup.select_one(self.HOME_TEAM_SELECTOR).get_text(strip=True) if soup.select_one(self.HOME_TEAM_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe kotijoukkue: {e}"); data['team_home'] = None
-        try: data['team_away'] = soup.select_one(self.AWAY_TEAM_SELECTOR).get_text(strip=True) if soup.select_one(self.AWAY_TEAM_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe vierasjoukkue: {e}"); data['team_away'] = None
-
+    def extract_score_status(self, nodes, data):
         # Tulos ja puoliaikatulos
         try: 
-            score_el = soup.select_one(self.SCORE_SELECTOR)
+            score_el = nodes['score']
             score_text = score_el.get_text(strip=True).replace(" ", "") if score_el else None # Poista välilyönnit
             # Varmista, että tulos sisältää viivan, muuten se ei ole validi tulos
             data['score'] = score_text if score_text and '–' in score_text else None
-        except Exception as e: logger.warning(f"Virhe tulos: {e}"); data['score'] = None
+        except Exception as e: logger.warning("Virhe tulos: %s", e); data['score'] = None
         try:
-            ht_el = soup.select_one(self.HALF_TIME_SCORE_SELECTOR)
+            ht_el = nodes['score_halftime']
             ht_text = ht_el.get_text(strip=True).replace("(", "").replace(")", "").replace(" ", "") if ht_el else ""
             data['score_halftime'] = ht_text if ht_text and '–' in ht_text else None
-        except Exception as e: logger.warning(f"Virhe puoliaikatulos: {e}"); data['score_halftime'] = None
+        except Exception as e: logger.warning("Virhe puoliaikatulos: %s", e); data['score_halftime'] = None
         
         # Ottelun tila
         try:
-            status_element = soup.select_one(self.STATUS_SELECTOR)
+            status_element = nodes['match_status_raw']
             data['match_status_raw'] = status_element.get_text(strip=True) if status_element else None
-        except Exception as e: logger.warning(f"Virhe ottelun tila: {e}"); data['match_status_raw'] = None
+        except Exception as e: logger.warning("Virhe ottelun tila: %s", e); data['match_status_raw'] = None
+        return data
+
+    def extract_stats(self, nodes, data):
+        # Tilastot
+        data['stats'] = {}
+        try:
+            stat_wrappers = nodes['stat_wrappers']
+            logger.debug("Löytyi %s tilasto-wrapperia.", len(stat_wrappers))
+            for wrapper in stat_wrappers:
+                name_el = wrapper.select_one(self.STATS_NAME_SELECTOR)
+                home_el = wrapper.select_one(self.STATS_HOME_VALUE_SELECTOR)
+                away_el = wrapper.select_one(self.STATS_AWAY_VALUE_SELECTOR)
+                if name_el and home_el and away_el:
+                    stat_name_raw = name_el.get_text(strip=True)
+                    stat_name_clean = clean_stat_name(stat_name_raw)
+                    home_val_raw = home_el.get_text(strip=True)
+                    away_val_raw = away_el.get_text(strip=True)
+                    try: home_val = int(home_val_raw)
+                    except ValueError: home_val = home_val_raw # Jätä merkkijonoksi jos ei ole numero
+                    try: away_val = int(away_val_raw)
+                    except ValueError: away_val = away_val_raw
+                    data['stats'][stat_name_clean] = {'home': home_val, 'away': away_val}
+                    logger.debug("Tilasto: '%s' Koti: %s, Vieras: %s", stat_name_clean, home_val, away_val)
+                else:
+                    logger.warning("Ei voitu purkaa tilastoa tästä wrapperista (puuttuvia elementtejä): %s", markup_preview(wrapper))
+        except Exception as e: logger.error("Virhe tilastojen purussa: %s", e)
+        return data
+
+    def extract_data(self, soup, match_id):
+        data = {'match_id': match_id, 'match_id_from_page': None}
+        logger.debug("Aloitetaan datan purku ID:lle %s", match_id)
+        nodes = self.extraction_plan.run(soup) # Yksi läpikäynti täyttää kaikki sivutason selektorit
+
+        # Sivun otsikko
+        try: data['page_title'] = nodes['page_title'].get_text(strip=True) if nodes['page_title'] else None
+        except Exception as e: logger.warning("Virhe otsikko: %s", e); data['page_title'] = None
+        
+        # Joukkueet
+        try: data['team_home'] = nodes['team_home'].get_text(strip=True) if nodes['team_home'] else None
+        except Exception as e: logger.warning("Virhe kotijoukkue: %s", e); data['team_home'] = None
+        try: data['team_away'] = nodes['team_away'].get_text(strip=True) if nodes['team_away'] else None
+        except Exception as e: logger.warning("Virhe vierasjoukkue: %s", e); data['team_away'] = None
+
+        self.extract_score_status(nodes, data) # Tulos, puoliaikatulos ja ottelun tila
 
         # Pvm, aika, paikka ja ottelunumero sivulta
         data['match_datetime_raw'] = None
@@ -359,7 +471,7 @@ class MatchDataScraper:
         date_match_obj = None # Alustetaan, jotta sitä voidaan käyttää myöhemmin
 
         try:
-            info_block = soup.select_one(self.INFO_BLOCK_SELECTOR)
+            info_block = nodes['info_block']
             if info_block:
                 # Ottelunumero sivulta
                 match_date_el = info_block.select_one(self.MATCH_DATE_ID_SELECTOR)
@@ -376,15 +488,15 @@ class MatchDataScraper:
                 if match_venue_el:
                     venue_raw_text = match_venue_el.get_text(strip=True) # Koko teksti ilman separointia
                     venue_text_for_extraction = match_venue_el.get_text(separator='|', strip=True) # Teksti separoitu |
-                    logger.debug(f"Raw venue/time text (for datetime extraction): '{venue_text_for_extraction}'")
-                    logger.debug(f"Raw venue text (for venue cleanup): '{venue_raw_text}'")
+                    logger.debug("Raw venue/time text (for datetime extraction): '%s'", venue_text_for_extraction)
+                    logger.debug("Raw venue text (for venue cleanup): '%s'", venue_raw_text)
 
                     # Yritä ensin tarkkaa regexiä ajalle ja päivämäärälle
                     # Olettaa muodon "HH:MM | Viikonpäivä DD.MM." tai "HH:MM | Viikonpäivä DD.MM.YYYY"
                     time_date_match = re.search(r'(\d{1,2}:\d{2})\s*\|\s*([a-zA-ZÄÖÅäöå\s]+\s+\d{1,2}\.\d{1,2}\.?(\d{4})?)', venue_text_for_extraction)
                     if time_date_match:
                         extracted_datetime_str = f"{time_date_match.group(1)} | {time_date_match.group(2).strip().rstrip('.')}"
-                        logger.debug(f"Extracted datetime with strict regex: {extracted_datetime_str}")
+                        logger.debug("Extracted datetime with strict regex: %s", extracted_datetime_str)
                         # Otetaan päivämääräosa talteen myöhempää paikan siivousta varten
                         date_match_obj = re.search(r'([a-zA-ZÄÖÅäöå\s]+\s+\d{1,2}\.\d{1,2}\.?(\d{4})?)', time_date_match.group(2).strip())
 
@@ -402,9 +514,9 @@ class MatchDataScraper:
                         if time_match or date_match_obj: # Jos edes jompikumpi löytyi
                             extracted_datetime_str = f"{time_str} | {date_str}"
                         else:
-                            logger.warning(f"Could not extract time or date from: '{venue_text_for_extraction}'")
+                            logger.warning("Could not extract time or date from: '%s'", venue_text_for_extraction)
                             extracted_datetime_str = None
-                        if extracted_datetime_str: logger.debug(f"Extracted datetime with separate patterns: {extracted_datetime_str}")
+                        if extracted_datetime_str: logger.debug("Extracted datetime with separate patterns: %s", extracted_datetime_str)
 
                     data['match_datetime_raw'] = extracted_datetime_str
                     
@@ -418,7 +530,7 @@ class MatchDataScraper:
                             venue_link.get_text(strip=True)
                         ]
                         data['venue'] = ', '.join(filter(None, venue_parts))
-                        logger.debug(f"Extracted venue using link: {data['venue']}")
+                        logger.debug("Extracted venue using link: %s", data['venue'])
                     else: # Jos ei linkkiä, yritä siivota koko venue_raw_text
                         cleaned_venue = venue_raw_text
                         if time_match: # Poista kellonaika, jos löytyi
@@ -427,32 +539,32 @@ class MatchDataScraper:
                             cleaned_venue = cleaned_venue.replace(date_match_obj.group(0), '').strip()
                         # Poista mahdolliset jäljelle jääneet erottimet ja ylimääräiset välilyönnit
                         data['venue'] = cleaned_venue.replace('|','').strip(',').strip()
-                        logger.debug(f"Extracted venue by cleaning raw text: {data['venue']}")
+                        logger.debug("Extracted venue by cleaning raw text: %s", data['venue'])
             else:
-                logger.warning(f"Info block ({self.INFO_BLOCK_SELECTOR}) not found for ID {match_id}")
+                logger.warning("Info block (%s) not found for ID %s", self.INFO_BLOCK_SELECTOR, match_id)
         except Exception as e:
-            logger.error(f"Virhe info blockin (pvm/aika/paikka) purussa: {e}", exc_info=True)
+            logger.error("Virhe info blockin (pvm/aika/paikka) purussa: %s", e, exc_info=True)
 
         # Muut tiedot
         data['formation'] = None; data['match_duration_format'] = None; data['substitutions_allowed'] = None; data['weather'] = None; data['audience'] = None;
-        try: data['formation'] = soup.select_one(self.FORMATION_SELECTOR).get_text(strip=True) if soup.select_one(self.FORMATION_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe formation: {e}")
-        try: data['match_duration_format'] = soup.select_one(self.MATCH_DURATION_SELECTOR).get_text(strip=True) if soup.select_one(self.MATCH_DURATION_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe duration format: {e}")
-        try: data['substitutions_allowed'] = soup.select_one(self.SUBSTITUTIONS_SELECTOR).get_text(strip=True) if soup.select_one(self.SUBSTITUTIONS_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe substitutions: {e}")
-        try: data['weather'] = soup.select_one(self.WEATHER_SELECTOR).get_text(strip=True) if soup.select_one(self.WEATHER_SELECTOR) else None
-        except Exception as e: logger.warning(f"Virhe weather: {e}")
+        try: data['formation'] = nodes['formation'].get_text(strip=True) if nodes['formation'] else None
+        except Exception as e: logger.warning("Virhe formation: %s", e)
+        try: data['match_duration_format'] = nodes['match_duration_format'].get_text(strip=True) if nodes['match_duration_format'] else None
+        except Exception as e: logger.warning("Virhe duration format: %s", e)
+        try: data['substitutions_allowed'] = nodes['substitutions_allowed'].get_text(strip=True) if nodes['substitutions_allowed'] else None
+        except Exception as e: logger.warning("Virhe substitutions: %s", e)
+        try: data['weather'] = nodes['weather'].get_text(strip=True) if nodes['weather'] else None
+        except Exception as e: logger.warning("Virhe weather: %s", e)
         try:
-            audience_el = soup.select_one(self.ATTENDANCE_SELECTOR)
+            audience_el = nodes['audience']
             audience_text = audience_el.get_text(strip=True) if audience_el else None
             data['audience'] = int(audience_text) if audience_text and audience_text.isdigit() else None # Varmista, että on numero
-        except Exception as e: logger.warning(f"Virhe yleisömäärä: {e}")
+        except Exception as e: logger.warning("Virhe yleisömäärä: %s", e)
         
         # Palkinnot
         data['awards'] = []
         try:
-             award_container = soup.select_one(self.AWARD_CONTAINER_SELECTOR)
+             award_container = nodes['award_container']
              if award_container:
                   player_divs = award_container.select(self.AWARD_PLAYER_DIV_SELECTOR)
                   for player_div in player_divs:
@@ -478,45 +590,22 @@ class MatchDataScraper:
                         
                         if player_name and player_href:
                             data['awards'].append({'player': player_name, 'link': player_href, 'stars': star_count})
-                            logger.debug(f"Löytyi palkittu: {player_name} ({star_count} tähteä)")
+                            logger.debug("Löytyi palkittu: %s (%s tähteä)", player_name, star_count)
                         else:
-                            logger.warning(f"Ei saatu purettua palkitun nimeä/linkkiä: {link.prettify()}")
-        except Exception as e: logger.warning(f"Virhe palkinnot: {e}")
+                            logger.warning("Ei saatu purettua palkitun nimeä/linkkiä: %s", markup_preview(link))
+        except Exception as e: logger.warning("Virhe palkinnot: %s", e)
 
-        # Tilastot
-        data['stats'] = {}
-        try:
-            stat_wrappers = soup.select(self.STATS_WRAPPER_SELECTOR)
-            logger.debug(f"Löytyi {len(stat_wrappers)} tilasto-wrapperia.")
-            for wrapper in stat_wrappers:
-                name_el = wrapper.select_one(self.STATS_NAME_SELECTOR)
-                home_el = wrapper.select_one(self.STATS_HOME_VALUE_SELECTOR)
-                away_el = wrapper.select_one(self.STATS_AWAY_VALUE_SELECTOR)
-                if name_el and home_el and away_el:
-                    stat_name_raw = name_el.get_text(strip=True)
-                    # Siivoa tilaston nimi: poista sulut, pienet kirjaimet, välilyönnit alaviivoiksi, skandit
-                    stat_name_clean = re.sub(r'[()]', '', stat_name_raw.lower().replace(" ", "_").replace("ä", "a").replace("ö", "o"))
-                    home_val_raw = home_el.get_text(strip=True)
-                    away_val_raw = away_el.get_text(strip=True)
-                    try: home_val = int(home_val_raw)
-                    except ValueError: home_val = home_val_raw # Jätä merkkijonoksi jos ei ole numero
-                    try: away_val = int(away_val_raw)
-                    except ValueError: away_val = away_val_raw
-                    data['stats'][stat_name_clean] = {'home': home_val, 'away': away_val}
-                    logger.debug(f"Tilasto: '{stat_name_clean}' Koti: {home_val}, Vieras: {away_val}")
-                else:
-                    logger.warning(f"Ei voitu purkaa tilastoa tästä wrapperista (puuttuvia elementtejä): {wrapper.prettify()}")
-        except Exception as e: logger.error(f"Virhe tilastojen purussa: {e}")
+        self.extract_stats(nodes, data)
 
         # Tapahtumat (maalit, kortit) puretaan erikseen
         data['events_from_list'] = {};
         try:
-            home_events = self.extract_events(soup, 'A') # Kotijoukkueen ID on usein 'A'
-            away_events = self.extract_events(soup, 'B') # Vierasjoukkueen ID on usein 'B'
+            home_events = self.extract_events(soup, 'A', nodes) # Kotijoukkueen ID on usein 'A'
+            away_events = self.extract_events(soup, 'B', nodes) # Vierasjoukkueen ID on usein 'B'
             data['events_from_list']['home'] = home_events
             data['events_from_list']['away'] = away_events
         except Exception as e:
-            logger.error(f"Yllättävä virhe extract_events-kutsussa ID {match_id}: {e}", exc_info=True)
+            logger.error("Yllättävä virhe extract_events-kutsussa ID %s: %s", match_id, e, exc_info=True)
             data['events_from_list'] = {'home': {}, 'away': {}} # Alusta tyhjäksi virhetilanteessa
 
         # Maalit ja syötöt -taulukko
@@ -528,7 +617,7 @@ class MatchDataScraper:
                 parent_row = heading.find_next_sibling(self.GOAL_ASSIST_ROW_SELECTOR) # Olettaa, että data on seuraavassa rivielementissä
                 if parent_row:
                     cols = parent_row.select(self.GOAL_ASSIST_COL_SELECTOR) # Koti- ja vierasjoukkueen sarakkeet
-                    logger.debug(f"Löytyi {len(cols)} saraketta maali/syöttö-datalle.")
+                    logger.debug("Löytyi %s saraketta maali/syöttö-datalle.", len(cols))
                     for col in cols:
                         team_name_h3 = col.select_one(self.GOAL_ASSIST_TEAM_NAME_SELECTOR)
                         team_name = team_name_h3.get_text(strip=True) if team_name_h3 else None
@@ -536,15 +625,15 @@ class MatchDataScraper:
                         # Määritä, onko kyseessä koti- vai vierasjoukkue
                         if team_name and data['team_home'] and team_name in data['team_home']: team_key = 'home'
                         elif team_name and data['team_away'] and team_name in data['team_away']: team_key = 'away'
-                        else: logger.warning(f"Ei tunnistettu joukkuetta '{team_name}' maali/syöttö-taulukosta."); continue
+                        else: logger.warning("Ei tunnistettu joukkuetta '%s' maali/syöttö-taulukosta.", team_name); continue
                         
-                        logger.debug(f"Käsitellään maali/syöttö-taulukkoa joukkueelle: {team_name} ({team_key})")
+                        logger.debug("Käsitellään maali/syöttö-taulukkoa joukkueelle: %s (%s)", team_name, team_key)
                         table = col.select_one(self.GOAL_ASSIST_TABLE_SELECTOR)
                         if table:
                             tbody = table.select_one(self.GOAL_ASSIST_TABLE_BODY_SELECTOR)
                             if tbody:
                                 rows = tbody.select(self.GOAL_ASSIST_TABLE_ROW_SELECTOR)
-                                logger.debug(f"Löytyi {len(rows)} pelaajariviä taulukosta ({team_key}).")
+                                logger.debug("Löytyi %s pelaajariviä taulukosta (%s).", len(rows), team_key)
                                 for row in rows:
                                     jersey_el = row.select_one(self.GOAL_ASSIST_JERSEY_SELECTOR)
                                     player_link_el = row.select_one(self.GOAL_ASSIST_PLAYER_SELECTOR)
@@ -564,7 +653,7 @@ class MatchDataScraper:
                                                 assists = int(contrib_match.group(2))
                                                 total = int(contrib_match.group(3))
                                             except ValueError:
-                                                logger.warning(f"Virhe muunnettaessa G+A numeroiksi: {contrib_str}")
+                                                logger.warning("Virhe muunnettaessa G+A numeroiksi: %s", contrib_str)
 
                                         player_data = {
                                             'jersey': jersey, 'player': player_name, 'link': player_link, 
@@ -572,163 +661,876 @@ class MatchDataScraper:
                                         }
                                         data['goal_assist_details'][team_key].append(player_data)
                                     else:
-                                        logger.warning(f"Ei voitu purkaa kaikkia tietoja maali/syöttö-riviltä: {row.prettify()}")
-                            else: logger.warning(f"Ei löytynyt tbody-elementtiä maali/syöttö-taulukosta ({team_key}).")
-                        else: logger.warning(f"Ei löytynyt table-elementtiä maali/syöttö-sarakkeesta ({team_key}).")
+                                        logger.warning("Ei voitu purkaa kaikkia tietoja maali/syöttö-riviltä: %s", markup_preview(row))
+                            else: logger.warning("Ei löytynyt tbody-elementtiä maali/syöttö-taulukosta (%s).", team_key)
+                        else: logger.warning("Ei löytynyt table-elementtiä maali/syöttö-sarakkeesta (%s).", team_key)
                 else: logger.warning("Ei löytynyt rivielementtiä 'Maalit ja syötöt' -otsikon jälkeen.")
             else: logger.debug("Ei löytynyt 'Maalit ja syötöt' -otsikkoa.")
         except Exception as e:
-            logger.error(f"Virhe maali/syöttö-taulukon purussa: {e}")
+            logger.error("Virhe maali/syöttö-taulukon purussa: %s", e)
 
-        logger.debug(f"Datan purku valmis ID:lle {match_id}")
+        logger.debug("Datan purku valmis ID:lle %s", match_id)
+        return data
+
+    def extract_live(self, soup, match_id):
+        """Extract only the live fields (LIVE_FIELDS) with the smaller live plan"""
+        nodes = self.live_plan.run(soup)
+        data = {}
+        self.extract_score_status(nodes, data)
+        self.extract_stats(nodes, data)
+        try:
+            data['events_from_list'] = {'home': self.extract_events(soup, 'A', nodes),
+                                        'away': self.extract_events(soup, 'B', nodes)}
+        except Exception as e:
+            logger.error("Yllättävä virhe extract_events-kutsussa ID %s: %s", match_id, e, exc_info=True)
+            data['events_from_list'] = {'home': {}, 'away': {}}
         return data
 
+    def parse_page(self, html, match_id, scrape_timestamp=None, soup=None):
+        """Parse raw match page HTML into a classified record (same result as process_match's HTML path).
+
+        soup is the tree make_soup already built for html, e.g. by the HTTP marker check.
+        """
+        result_data = {'match_id': match_id, 'scrape_timestamp': scrape_timestamp, 'status_details': []}
+        soup = soup if soup is not None else self.make_soup(html)
+        extracted_data = self.extract_data(soup, match_id)
+        result_data.update(extracted_data) # Yhdistä purettu data result_data-sanakirjaan
+        result_data['data_source'] = 'html'
+        self.classify_result(result_data, match_id)
+        return result_data
+
+    def classify_result(self, result_data, match_id):
+        """Set status and status_details on an extracted record (same rules for every data source)."""
+        # Tarkistus ID-epäsuhdalle
+        if result_data.get('match_id_from_page') is not None and result_data['match_id_from_page'] != match_id:
+            logger.warning("ID %s eroaa sivulta löydetystä ID:stä %s", match_id, result_data['match_id_from_page'])
+            result_data['status_details'].append('match_id_mismatch')
+
+        # Tilamääritys
+        raw_status_value = result_data.get('match_status_raw')
+        raw_status = raw_status_value.lower() if isinstance(raw_status_value, str) else ''
+        score_value = result_data.get('score') or '' # Varmista, ettei ole None
+
+        if 'päättynyt' in raw_status:
+            result_data['status'] = 'success_finished' if result_data.get('team_home') else 'success_finished_partial'
+        elif 'ei alkanut' in raw_status:
+            result_data['status'] = 'success_not_started'
+        elif 'käynnissä' in raw_status or ('–' in score_value and ':' not in score_value) : # Käynnissä tai jos tulos on esim "1 – 0" ilman aikaa
+            result_data['status'] = 'success_live'
+        elif result_data.get('team_home'): # Jos joukkueet löytyy, mutta tila epäselvä
+            result_data['status'] = 'success_data_found_unknown_state'
+        elif result_data.get('page_title') and 'Tulospalvelu' in result_data.get('page_title'): # Jos sivu on tulospalvelun sivu, mutta dataa vähän
+            result_data['status'] = 'success_partial_data' # Esim. tyhjä ottelusivu
+        else: # Muuten oletetaan, että parsiminen epäonnistui
+            result_data['status'] = 'parsing_failed_no_data'
+            result_data['status_details'].append('No meaningful data extracted.')
+        
+        # Lisätarkistus: jos status on success, mutta oleellista dataa puuttuu
+        if result_data['status'].startswith('success') and not (result_data.get('team_home') and result_data.get('score') and result_data.get('stats')):
+             if result_data['status'] != 'success_not_started': # Ei varoiteta jos ottelu ei ole alkanut
+                logger.warning("Vaikka status on '%s', oleellista dataa (joukkueet/tulos/tilastot) puuttuu ID:llä %s.", result_data['status'], match_id)
+                result_data['status_details'].append('missing_core_data')
+             else:
+                logger.info("Ottelu %s ei ole alkanut, core data puuttuu odotetusti.", match_id)
+
+
+        logger.info("Käsittely valmis: ID %s. Tila: %s, Yleisö: %s, Tulos: %s, Tilastoja: %s", match_id, result_data.get('status'), result_data.get('audience'), result_data.get('score'), len(result_data.get('stats', {})))
+        events_home = result_data.get('events_from_list', {}).get('home', {})
+        events_away = result_data.get('events_from_list', {}).get('away', {})
+        logger.info("  Tapahtumat (G/Y/R): Koti=%s/%s/%s, Vieras=%s/%s/%s", len(events_home.get('goals',[])), len(events_home.get('yellow_cards',[])), len(events_home.get('red_cards',[])), len(events_away.get('goals',[])), len(events_away.get('yellow_cards',[])), len(events_away.get('red_cards',[])))
+        return result_data
+
+MatchPageParser.extraction_plan = MatchPageParser.compile_plan() # Käännetään kerran moduulin latautuessa
+MatchPageParser.live_plan = MatchPageParser.compile_live_plan()
+
+# --- MatchDataScraper -luokka ---
+class MatchDataScraper(MatchPageParser):
+    def __init__(self, workers=WORKERS, max_matches=MAX_MATCHES, request_delay=REQUEST_DELAY, burst=DEFAULT_BURST, http_first=True, source='html', parser_backend=DEFAULT_PARSER_BACKEND, discover=False, discover_span=GALLOP_MAX_SPAN, block_resources=RESOURCE_BLOCKING, debug_artifacts=DEBUG_MODE, warm_profile=WARM_PROFILE, tabs=TAB_COUNT, partition=None):
+        super().__init__(parser_backend)
+        # Osiotilassa (shard-worker) kaikki tila kirjoitetaan vain workerin omaan hakemistoon, ks. shard_lease.py
+        self.partition = partition
+        if partition:
+            os.makedirs(partition, exist_ok=True)
+        self.current_id = self.load_last_id()
+        self.match_data = self.load_data()
+        # Työjono päättää, mitkä ID:t haetaan; last_match_id.txt toimii uusien ID:iden frontierina
+        queue_file = os.path.join(partition, QUEUE_FILE) if partition else QUEUE_FILE
+        self.work_queue = MatchWorkQueue(queue_file, frontier=max(0, self.current_id))
+        if not self.work_queue.loaded:
+            self.work_queue.seed_from_records(self.match_data)
+        self.work_queue.reconcile(self.match_data) # Tulos ehti lokiin, mutta jonon kirjaus ei
+        self._progress_lock = threading.Lock() # Workerit kirjaavat tuloksensa itse, ks. _process_and_record
+        self.workers = max(1, workers)
+        self.max_matches = max_matches
+        self.warm_profile = warm_profile # Pysyvä profiili ja HTTP-välimuisti per poolin paikka, ks. driver_cache.py
+        self.driver_pool = DriverPool(self.setup_driver_local, size=self.workers, # Selaimet käynnistetään vasta tarvittaessa
+                                      on_discard=profile_slots.release_driver)
+        # Yksi token bucket kaikille hauille (HTTP, JSON, Selenium) ja workereille, ks. rate_limiter.py
+        self.rate_limiter = configure_rate_limiter(rate=1 / max(request_delay, 0.01), burst=burst)
+        self.http_first = http_first # Kokeillaan ensin tavallista HTTP-hakua, Selenium vain varapolkuna
+        # 'json' hakee tietueen suoraan rajapinnasta ja putoaa HTML-polulle, jos se ei onnistu
+        self.json_source = TulospalveluJsonSource() if source == 'json' else None
+        self.page_store = PageStore() # Kaikki haetut raakasivut talteen uudelleenjäsennystä varten
+        self.discover = discover # Etsitäänkö suurin olemassa oleva ID ennen uusien ID:iden jakamista
+        self.discover_span = discover_span
+        self.block_resources = block_resources # Kuvat, fontit, tyylit ja seurantaskriptit estetään, ks. browser_profile.py
+        self.debug_writer = DebugArtifactWriter(CACHE_DIR, mode=debug_artifacts) # Kuvakaappaukset ja dumpit taustasäikeessä
+        # Välilehtitila: Selenium-haut yhden selaimen N välilehdessä, ks. tab_fetcher.py
+        self.tabs = max(1, tabs)
+        self.tab_fetcher = TabFetcher(self.driver_pool, tabs=self.tabs, limiter=self.rate_limiter,
+                                      ready_selector=self.WAIT_ELEMENT_SELECTOR, settle_selectors=[self.STATUS_SELECTOR],
+                                      baseline=POST_LOAD_SLEEP, on_wait_timeout=self._log_wait_timeout,
+                                      block_resources=block_resources) if self.tabs > 1 else None
+
+    def setup_driver_local(self):
+        chrome_options = Options()
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--lang=fi-FI")
+        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        prefs = {
+            "profile.managed_default_content_settings.images": 2,
+            'intl.accept_languages': 'fi,fi_FI'
+        }
+        if self.block_resources:
+            apply_blocking_options(chrome_options, prefs)
+        if self.tab_fetcher:
+            apply_tab_options(chrome_options) # Taustavälilehdet etenevät täydellä nopeudella
+        chrome_options.add_experimental_option('prefs', prefs)
+        profile_dir = profile_slots.acquire() if self.warm_profile else None
+        if profile_dir:
+            apply_warm_profile(chrome_options, profile_dir)
+        try:
+            # Chromedriverin polku ratkaistaan kerran ja luetaan sen jälkeen välimuistista (ks. driver_cache.py)
+            driver = start_chrome(chrome_options)
+            profile_slots.bind(driver, profile_dir)
+            driver.set_page_load_timeout(60) # Pidennetty timeout
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})") # Piilota webdriver-ominaisuus
+            if self.block_resources:
+                enable_request_blocking(driver)
+            logger.debug("Selain alustettu ilman kuvien latausta.")
+            return driver
+        except Exception as e:
+            logger.error("Selaimen alustus epäonnistui: %s", str(e))
+            # Fallback: Yritetään ilman Service-objektia, jos yllä oleva epäonnistuu
+            try:
+                logger.info("Yritetään yksinkertaisempaa driverin alustusta...")
+                driver = webdriver.Chrome(options=chrome_options)
+                profile_slots.bind(driver, profile_dir)
+                driver.set_page_load_timeout(60)
+                if self.block_resources:
+                    enable_request_blocking(driver)
+                logger.debug("Yksinkertaistettu selain alustettu ilman kuvien latausta.")
+                return driver
+            except Exception as e2:
+                logger.critical("Driverin alustus epäonnistui täysin: %s", e2)
+                profile_slots.release(profile_dir)
+                raise # Heitä virhe eteenpäin, jos kumpikaan ei onnistu
+
+    def fetch_page(self, url):
+        """Return (html, soup); soup is the make_soup tree of an HTTP fetch and None on the Selenium path"""
+        if self.http_first:
+            # Merkkitarkistus tehdään samalla puulla, jonka jäsennys käyttää: sivu jäsennetään vain kerran
+            html, soup = fetch_http_page(url, MATCH_PAGE_MARKERS, make_soup=self.make_soup, limiter=self.rate_limiter)
+            if html:
+                scrape_metrics.count('fetch_path', path='http')
+                return html, soup
+
+        scrape_metrics.count('fetch_path', path='selenium')
+        if self.tab_fetcher:
+            page_source = self.tab_fetcher.fetch(url) # Sama aikaraja ja yritysmäärä välilehtikohtaisesti
+            if page_source:
+                self._check_page_length(url, page_source)
+            return page_source, None
+        return self.fetch_page_selenium(url), None
+
+    def _log_wait_timeout(self, driver, url, wait_element_selector=None):
+        """Warn about a missing match widget and queue a sampled screenshot of the current window"""
+        logger.warning(
+            "Elementti '%s' ei löytynyt ajoissa sivulla %s (Otsikko: %s). "
+            "Todennäköisesti sivu on tyhjä tai ei sisällä otteludataa. "
+            "Tarkista %s-kansiosta mahdolliset kuvakaappaukset.",
+            wait_element_selector or self.WAIT_ELEMENT_SELECTOR, url, driver.title, CACHE_DIR
+        )
+        # Kuvakaappaus vain ajon ensimmäisistä aikakatkaisuista; kirjoitus taustasäikeessä
+        screenshot_path = os.path.join(CACHE_DIR, f"{url.split('/')[-2]}_wait_timeout_err.png")
+        if self.debug_writer.save_screenshot(screenshot_path, driver, error_class="wait_timeout"):
+            logger.info("Kuvakaappaus tallennusjonossa (wait timeout): %s", screenshot_path)
+
+    def _check_page_length(self, url, page_source):
+        if len(page_source) < 10000: # Tarkistus, että sivu ei ole epäilyttävän lyhyt
+            logger.warning("Sivu %s vaikuttaa lyhyeltä (koko: %s), mahdollinen virhe tai data puuttuu.", url, len(page_source))
+            self.save_debug_files(url.split('/')[-2], page_source, "LYHYT_SIVU") # Tallenna lyhyt sivu debuggausta varten
+            # Ei palauteta None tässä, vaan annetaan extract_data yrittää
+
+    def fetch_page_selenium(self, url):
+        last_exception = None
+        wait_element_selector = self.WAIT_ELEMENT_SELECTOR
+
+        for attempt in range(1, 4): # Yritä enintään 3 kertaa
+            driver = None
+            broken = False
+            try:
+                logger.debug("fetch_page yritys %s/3 URL: %s", attempt, url)
+                if attempt > 1:
+                    scrape_metrics.count('retries')
+                driver = self.driver_pool.acquire() # Lämmin selain poolista
+
+                self.rate_limiter.acquire()
+                load_start = time.monotonic()
+                driver.get(url)
+                self.rate_limiter.record(time.monotonic() - load_start, ok=True)
+                scrape_metrics.observe('navigation_seconds', time.monotonic() - load_start)
+                logger.debug("Sivu %s avattu yrityksellä %s", url, attempt)
+
+                widget_found = False
+                try:
+                    logger.debug("Odotetaan elementtiä '%s' enintään 60 sekuntia...", wait_element_selector)
+                    with scrape_metrics.timer('element_wait_seconds'):
+                        WebDriverWait(driver, 60).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, wait_element_selector))
+                        )
+                    logger.debug("Odotettu elementti '%s' löytyi.", wait_element_selector)
+                    widget_found = True
+                except TimeoutException:
+                    scrape_metrics.count('timeouts', stage='element_wait')
+                    self._log_wait_timeout(driver, url, wait_element_selector)
+                    # Ei palauteta None heti, vaan annetaan mahdollisuus jatkaa ja katsoa, onko sivulla silti jotain
+                
+                # Dynaaminen sisältö: odotetaan tilasolmua ja DOMin rauhoittumista kiinteän 2 s sijaan.
+                # Jos widgetiä ei löytynyt, ei jäädä odottamaan solmuja, joita ei tule.
+                if widget_found:
+                    waited, ready = wait_until_ready(driver, [self.STATUS_SELECTOR], baseline=POST_LOAD_SLEEP)
+                else:
+                    waited, ready = wait_until_ready(driver, baseline=POST_LOAD_SLEEP, hard_cap=POST_LOAD_SLEEP)
+                scrape_metrics.observe('readiness_seconds', waited)
+                if not ready:
+                    scrape_metrics.count('timeouts', stage='readiness')
+
+                page_source = driver.page_source
+                scrape_metrics.observe('page_source_bytes', len(page_source.encode('utf-8')))
+                logger.debug("Sivun lähdekoodi haettu (pituus: %s merkkiä)", len(page_source))
+                if self.block_resources:
+                    blocking_report.collect(driver, url)
+
+                self._check_page_length(url, page_source)
+                logger.info("Sivun %s haku onnistui yrityksellä %s", url, attempt)
+                return page_source
+
+            except (TimeoutException, WebDriverException, NoSuchElementException) as e:
+                logger.warning("%s yrityksellä %s/3 haettaessa %s: %s", type(e).__name__, attempt, url, e)
+                scrape_metrics.count('timeouts' if isinstance(e, TimeoutException) else 'fetch_errors',
+                                     stage='navigation' if driver else 'driver_startup')
+                last_exception = e
+                broken = True # Selaimen tila on epävarma, kierrätetään
+                self.rate_limiter.record(ok=False)
+            except Exception as e: # Yleinen poikkeus
+                logger.error("Yleinen virhe sivun haussa yrityksellä %s/3 (%s): %s - %s", attempt, url, type(e).__name__, str(e), exc_info=True)
+                scrape_metrics.count('fetch_errors', stage='unexpected')
+                last_exception = e
+                broken = True
+            finally:
+                if driver:
+                    logger.debug("Palautetaan driver pooliin yrityksen %s jälkeen.", attempt)
+                    self.driver_pool.release(driver, broken=broken)
+                if attempt < 3 and broken: # Uusinta vain virheen jälkeen; satunnaistettu kasvava odotus
+                    self.rate_limiter.backoff(attempt)
+        
+        logger.error("Sivun %s haku epäonnistui %s yrityksen jälkeen. Viimeisin virhe: %s", url, attempt, last_exception)
+        scrape_metrics.count('fetch_failed')
+        return None
+
+    def probe_match(self, match_id):
+        """Cheap existence check for one ID: JSON, then plain HTTP, then one short Selenium wait"""
+        if self.json_source and self.json_source.fetch_record(match_id):
+            return True
+        url = BASE_URL.format(match_id=match_id)
+        if self.http_first and fetch_http_page(url, MATCH_PAGE_MARKERS, make_soup=self.make_soup, limiter=self.rate_limiter)[0]:
+            return True
+
+        driver = None
+        broken = False
+        try:
+            driver = self.driver_pool.acquire()
+            self.rate_limiter.acquire()
+            load_start = time.monotonic()
+            driver.get(url)
+            self.rate_limiter.record(time.monotonic() - load_start, ok=True)
+            WebDriverWait(driver, PROBE_WAIT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.WAIT_ELEMENT_SELECTOR))
+            )
+            return True
+        except TimeoutException:
+            return False # Ottelusivua ei renderöity: ID on tyhjä
+        except WebDriverException as e:
+            logger.warning("Frontier-koetus epäonnistui ID:lle %s: %s - %s", match_id, type(e).__name__, e)
+            broken = True
+            self.rate_limiter.record(ok=False)
+            return False
+        finally:
+            if driver:
+                if self.block_resources and not broken:
+                    blocking_report.collect(driver, url) # Tyhjennetään loki, ettei koetus kirjaudu seuraavalle sivulle
+                self.driver_pool.release(driver, broken=broken)
+
+    def discover_frontier(self):
+        """Gallop past the last populated ID to find the live frontier and negative-cache dead IDs"""
+        populated = [match_id for match_id, record in self.match_data.items()
+                     if str(record.get('status', '')).startswith('success')]
+        known_good = max(populated) if populated else self.work_queue.frontier
+        start_time = time.time()
+        highest, probes = gallop_frontier(self.probe_match, known_good, max_span=self.discover_span)
+        dead_ids = [match_id for match_id, exists in probes.items() if not exists]
+        for match_id in dead_ids:
+            self.work_queue.mark_empty(match_id)
+        self.work_queue.ceiling = highest
+        logger.info("Frontier-haku: suurin olemassa oleva ID %s (lähtö %s), %s koetusta, %s tyhjää ID:tä välimuistiin, kesto %.1fs",
+                    highest, known_good, len(probes), len(dead_ids), time.time() - start_time)
+        return highest
+
+    def save_debug_files(self, match_id, html_content, context_text):
+        # context_text on virheluokka: vain sen ensimmäiset dumpit tallennetaan, ja vanhimmat
+        # poistetaan levyrajan täyttyessä (ks. debug_artifacts.py)
+        match_id_str = str(match_id)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        html_path = os.path.join(CACHE_DIR, match_id_str, f"{match_id_str}_{context_text}_{timestamp}.html")
+        if self.debug_writer.save_html(html_path, html_content, error_class=context_text):
+            logger.debug("Debug HTML tallennusjonossa: %s", html_path)
+
+
+    def load_last_id(self):
+        start_id_default = 3748451 # Oletusaloitus ID, jos tiedostoa ei löydy tai se on virheellinen
+        try:
+            if os.path.exists(LAST_ID_FILE):
+                with open(LAST_ID_FILE, 'r') as f:
+                    last_id = int(f.read().strip())
+                logger.info("Ladatty viimeisin ID: %s tiedostosta %s", last_id, LAST_ID_FILE)
+                # Varmistetaan, että ID ei ole negatiivinen
+                return max(0, last_id)
+            else:
+                logger.info("Tiedostoa %s ei löytynyt. Aloitetaan ID:stä %s (jotta ensimmäinen haettava ID on %s).", LAST_ID_FILE, start_id_default -1, start_id_default)
+                # Palautetaan ID, joka on yhtä pienempi kuin haluttu aloitus ID
+                return start_id_default - 1 
+        except (ValueError, Exception) as e:
+            logger.error("Virhe ladattaessa viimeisintä ID:tä tiedostosta %s: %s. Aloitetaan ID:stä %s.", LAST_ID_FILE, e, start_id_default - 1)
+            return start_id_default - 1
+
+    def save_last_id(self):
+        if self.partition:
+            return # Frontierin päivittää vain yhdistäminen (merge), ei yksittäinen worker
+        try:
+            with open(LAST_ID_FILE, 'w') as f:
+                f.write(str(self.current_id))
+            logger.info("Tallennettu viimeisin käsitelty ID: %s tiedostoon %s", self.current_id, LAST_ID_FILE)
+        except Exception as e:
+            logger.error("Virhe tallennettaessa viimeisintä ID:tä (%s) tiedostoon %s: %s", self.current_id, LAST_ID_FILE, e)
+
+    def save_progress(self):
+        # Työjono ja frontier tallennetaan yhdessä; käsittelemättömät uudet ID:t jäävät jonoon erääntyneinä
+        try:
+            self.work_queue.save()
+        except Exception as e:
+            logger.error("Virhe tallennettaessa työjonoa tiedostoon %s: %s", self.work_queue.path, e)
+        self.current_id = self.work_queue.frontier
+        self.save_last_id()
+
+    def load_data(self):
+        # Tietueet ladataan append-only-lokista; ensimmäisellä kerralla loki luodaan match_data.json:sta.
+        # Osion loki alkaa tyhjästä: worker ei lue eikä kirjoita kanonista dataa.
+        store_file = os.path.join(self.partition, STORE_FILE) if self.partition else STORE_FILE
+        try:
+            self.store = MatchStore(store_file, seed_json=None if self.partition else OUTPUT_FILE)
+        except Exception as e: # Yleinen poikkeus
+            logger.error("Yleinen virhe datan latauksessa tiedostosta %s: %s. Aloitetaan tyhjästä.", store_file, e)
+            self.store = MatchStore(store_file + ".recovered")
+        # match_data on storen oma match_id -> tietue -sanakirja; järjestetty lista tehdään vasta viennissä
+        return self.store.records
+
+    def save_data(self, export=True):
+        # Tietueet on jo kirjoitettu lokiin upsertilla; välitallennus vain tyhjentää puskurin,
+        # joten sen hinta ei kasva arkiston mukana. Koko JSON viedään vain ajon lopussa.
+        try:
+            self.store.flush()
+            if self.store.needs_compaction():
+                self.store.compact_async() # Taustasäikeessä; uudet rivit lisätään sillä välin normaalisti
+            if export and not self.partition: # match_data.json syntyy osioista vasta yhdistämisessä
+                self.store.wait_compaction()
+                count = self.store.export_json(OUTPUT_FILE)
+                logger.info("Tallennettu %s tietuetta tiedostoon %s.", count, OUTPUT_FILE)
+        except Exception as e:
+            logger.error("Virhe tallennettaessa dataa tiedostoon %s: %s", OUTPUT_FILE, e)
+
     def process_match(self, match_id):
         url = BASE_URL.format(match_id=match_id)
-        logger.info(f"--- Käsittely alkaa: ID {match_id} ({url}) ---")
+        logger.info("--- Käsittely alkaa: ID %s (%s) ---", match_id, url)
         scrape_timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
         result_data = {'match_id': match_id, 'scrape_timestamp': scrape_timestamp, 'status_details': []}
 
         try:
-            html = self.fetch_page(url)
+            if self.json_source:
+                json_record = self.json_source.fetch_record(match_id)
+                if json_record:
+                    scrape_metrics.count('fetch_path', path='json')
+                    result_data.update(json_record)
+                    result_data['data_source'] = 'json'
+                    self.classify_result(result_data, match_id)
+                    return result_data
+
+            html, soup = self.fetch_page(url)
             if not html: # Jos fetch_page palauttaa None, sivu ei latautunut kunnolla
                 result_data['status'] = 'page_load_failed'
                 result_data['status_details'].append('HTML content was empty after fetch attempts.')
-                logger.error(f"HTML-sisältö tyhjä ID:lle {match_id} kaikkien yritysten jälkeen.")
+                logger.error("HTML-sisältö tyhjä ID:lle %s kaikkien yritysten jälkeen.", match_id)
                 return result_data # Palauta tässä vaiheessa, ei ole järkeä jatkaa ilman HTML:ää
-            
-            soup = BeautifulSoup(html, 'html.parser')
-            extracted_data = self.extract_data(soup, match_id)
-            result_data.update(extracted_data) # Yhdistä purettu data result_data-sanakirjaan
-
-            # Tarkistus ID-epäsuhdalle
-            if result_data.get('match_id_from_page') is not None and result_data['match_id_from_page'] != match_id:
-                logger.warning(f"ID {match_id} eroaa sivulta löydetystä ID:stä {result_data['match_id_from_page']}")
-                result_data['status_details'].append('match_id_mismatch')
-
-            # Tilamääritys
-            raw_status_value = result_data.get('match_status_raw')
-            raw_status = raw_status_value.lower() if isinstance(raw_status_value, str) else ''
-            score_value = result_data.get('score') or '' # Varmista, ettei ole None
-
-            if 'päättynyt' in raw_status:
-                result_data['status'] = 'success_finished' if result_data.get('team_home') else 'success_finished_partial'
-            elif 'ei alkanut' in raw_status:
-                result_data['status'] = 'success_not_started'
-            elif 'käynnissä' in raw_status or ('–' in score_value and ':' not in score_value) : # Käynnissä tai jos tulos on esim "1 – 0" ilman aikaa
-                result_data['status'] = 'success_live'
-            elif result_data.get('team_home'): # Jos joukkueet löytyy, mutta tila epäselvä
-                result_data['status'] = 'success_data_found_unknown_state'
-            elif result_data.get('page_title') and 'Tulospalvelu' in result_data.get('page_title'): # Jos sivu on tulospalvelun sivu, mutta dataa vähän
-                result_data['status'] = 'success_partial_data' # Esim. tyhjä ottelusivu
-            else: # Muuten oletetaan, että parsiminen epäonnistui
-                result_data['status'] = 'parsing_failed_no_data'
-                result_data['status_details'].append('No meaningful data extracted.')
-            
-            # Lisätarkistus: jos status on success, mutta oleellista dataa puuttuu
-            if result_data['status'].startswith('success') and not (result_data.get('team_home') and result_data.get('score') and result_data.get('stats')):
-                 if result_data['status'] != 'success_not_started': # Ei varoiteta jos ottelu ei ole alkanut
-                    logger.warning(f"Vaikka status on '{result_data['status']}', oleellista dataa (joukkueet/tulos/tilastot) puuttuu ID:llä {match_id}.")
-                    result_data['status_details'].append('missing_core_data')
-                 else:
-                    logger.info(f"Ottelu {match_id} ei ole alkanut, core data puuttuu odotetusti.")
-
-
-            logger.info(f"Käsittely valmis: ID {match_id}. Tila: {result_data.get('status')}, Yleisö: {result_data.get('audience')}, Tulos: {result_data.get('score')}, Tilastoja: {len(result_data.get('stats', {}))}")
-            events_home = result_data.get('events_from_list', {}).get('home', {})
-            events_away = result_data.get('events_from_list', {}).get('away', {})
-            logger.info(f"  Tapahtumat (G/Y/R): Koti={len(events_home.get('goals',[]))}/{len(events_home.get('yellow_cards',[]))}/{len(events_home.get('red_cards',[]))}, Vieras={len(events_away.get('goals',[]))}/{len(events_away.get('yellow_cards',[]))}/{len(events_away.get('red_cards',[]))}")
+
+            with scrape_metrics.timer('page_store_seconds'):
+                page_sha256 = self.page_store.put(match_id, html, url=url, fetch_time=scrape_timestamp)
+            with scrape_metrics.timer('parse_seconds'):
+                result_data = self.parse_page(html, match_id, scrape_timestamp, soup=soup)
+            result_data['page_sha256'] = page_sha256
             return result_data
         except Exception as e:
-            logger.exception(f"Kriittinen virhe käsiteltäessä ID {match_id}: {e}")
+            logger.exception("Kriittinen virhe käsiteltäessä ID %s: %s", match_id, e)
             result_data['status'] = 'critical_error_processing'
             result_data['error_message'] = str(e)
             return result_data
 
+    def _process_and_record(self, match_id):
+        """Run process_match and journal the result on the worker thread as soon as it exists"""
+        with scrape_metrics.timer('match_seconds'):
+            result = self.process_match(match_id)
+        save_start = time.monotonic()
+        with self._progress_lock:
+            success = self._merge_result(match_id, result)
+            entry = self.work_queue.record_result(match_id, result if isinstance(result, dict) else None)
+        scrape_metrics.observe('save_seconds', time.monotonic() - save_start) # Sisältää lukon odotuksen
+        scrape_metrics.count('result_status', status=result.get('status') if isinstance(result, dict) else 'invalid')
+        logger.debug("ID %s jonossa tilaan '%s', seuraava haku: %s", match_id, entry['state'], entry['next_due'])
+        return success
+
+    def _merge_result(self, match_id, result):
+        """Merge one process_match result into match_data. Returns True on success status."""
+        if isinstance(result, dict): # Varmista, että saatiin sanakirja takaisin
+            current = self.match_data.get(match_id)
+            if not should_replace(current, result):
+                # Esim. ohimenevä page_load_failed uusintakäynnillä: match_datetime_raw ym. säilyvät,
+                # jonon tila ja uusintaviive päivitetään silti (record_result)
+                logger.warning("ID %s: haku päättyi tilaan '%s', säilytetään aiempi parempi tietue (%s).",
+                               match_id, result.get('status'), current.get('status'))
+                return str(result.get('status') or '').startswith('success')
+            if result.get('match_id') in self.match_data: # O(1)-haku match_id:n perusteella
+                logger.info("Päivitetään olemassa oleva data ID:lle %s", result.get('match_id'))
+            self.store.upsert(result) # Päivittää myös match_datan; yksi lisätty lokirivi
+
+            return result.get('status', '').startswith('success')
+
+        # Jos process_match ei palauttanut sanakirjaa (epätodennäköistä, mutta varmuuden vuoksi)
+        logger.error("process_match palautti virheellisen tyypin (%s) ID:lle %s. Ohitetaan tallennus.", type(result), match_id)
+        # Lisätään virheellinen tulos vain jos ID:tä ei jo ole, jotta ei luoda duplikaatteja virheistä
+        error_result = {'match_id': match_id, 'status': 'internal_error_invalid_result_type', 'scrape_timestamp': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        if match_id not in self.match_data:
+            self.store.upsert(error_result)
+        return False
+
+    def reparse(self, workers=None):
+        """Re-run extract_data over the cached page of every match and rewrite match_data in one save.
+
+        The page a record was parsed from (page_sha256) is used; the newest page only if that one is gone.
+        """
+        latest = self.page_store.latest_entries()
+        existing = self.match_data
+        own_pages = {(entry.get('match_id'), entry.get('sha256')): entry for entry in self.page_store.iter_index()}
+        tasks = []
+        for match_id, newest in sorted(latest.items()):
+            current = existing.get(match_id) or {}
+            # Uudempi virhesivu ei saa syrjäyttää sivua, josta tallessa oleva tietue on jäsennetty
+            entry = own_pages.get((match_id, current.get('page_sha256')))
+            if entry is None or not self.page_store.blob_path(entry['sha256']).exists():
+                entry = newest
+            # Ei korvata tietuetta, joka on haettu sivua uudemmin (esim. JSON-lähteestä)
+            if entry.get('fetch_time', '') >= (current.get('scrape_timestamp') or ''):
+                tasks.append((match_id, entry))
+        if not tasks:
+            logger.info("Ei uudelleenjäsennettäviä sivuja varastossa.")
+            return 0
+
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        logger.info("Uudelleenjäsennetään %s sivua %s prosessilla...", len(tasks), workers)
+        start_time = time.time()
+        parsed_count = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_reparse_init, initargs=(str(self.page_store.root), self.parser_backend)) as executor:
+            for match_id, record in executor.map(_reparse_one, tasks, chunksize=chunksize):
+                if record is None:
+                    logger.warning("Raakasivu puuttuu ID:ltä %s, tietuetta ei päivitetty.", match_id)
+                    continue
+                if not should_replace(existing.get(match_id), record):
+                    logger.warning("ID %s: uudelleenjäsennys antoi tilan '%s', säilytetään tietue (%s).",
+                                   match_id, record.get('status'), existing[match_id].get('status'))
+                    continue
+                self.store.upsert(record, durable=False) # Sivut ovat tallessa, joten massajäsennys ei tarvitse fsyncia per rivi
+                parsed_count += 1
+        duration = time.time() - start_time
+
+        self.save_data()
+        logger.info("Uudelleenjäsennys valmis: %s sivua %.2f sekunnissa (%.1f sivua/s).",
+                    parsed_count, duration, parsed_count / duration if duration > 0 else 0)
+        return parsed_count
+
     def run(self):
-        logger.info(f"Skraperi käynnistyy. Aloitus ID (seuraava haettava): {self.current_id + 1}, Max ID:t tälle ajolle: {MAX_MATCHES}")
+        logger.info("Skraperi käynnistyy. Uusien ID:iden frontier: %s, Max ID:t tälle ajolle: %s, Workereita: %s", self.work_queue.frontier, self.max_matches, self.workers)
         processed_count = 0
         success_count = 0
         failed_count = 0
         start_time = time.time()
 
-        # Luo joukko olemassa olevista ID:istä nopeampaa tarkistusta varten
-        existing_ids = {match.get('match_id') for match in self.match_data if isinstance(match,dict) and match.get('match_id') is not None}
+        if self.discover:
+            self.discover_frontier() # Uusia ID:itä ei jaeta löydetyn rajan yli
+        # Budjetti käytetään vain ID:ihin, joista voi saada uutta dataa (ks. match_queue.py)
+        match_ids = self.work_queue.due_ids(self.max_matches)
 
+        # Välilehtitilassa säikeitä on vähintään välilehtien verran, jotta jokaiselle välilehdelle riittää haettavaa
+        executor = ThreadPoolExecutor(max_workers=max(self.workers, self.tabs), thread_name_prefix="scrape")
         try:
-            while processed_count < MAX_MATCHES:
-                # Varmistetaan, että current_id ei ole negatiivinen (voi tapahtua jos last_id.txt on tyhjä ja oletus -1)
-                if self.current_id < 0: self.current_id = 0 
-
-                next_id = self.current_id + 1
-                logger.info(f"Käsitellään {processed_count + 1}/{MAX_MATCHES} : ID {next_id}")
-                
-                result = self.process_match(next_id)
+            # Worker kirjaa jokaisen tuloksen journaaliin heti (match_data.jsonl + työjonon journaali),
+            # joten tapettu ajo jatkuu seuraavalla kerralla hakematta valmiita ID:itä uudelleen
+            futures = {executor.submit(self._process_and_record, match_id): match_id for match_id in match_ids}
+            for future in as_completed(futures):
+                next_id = futures[future]
                 processed_count += 1
+                logger.info("Käsitelty %s/%s : ID %s", processed_count, self.max_matches, next_id)
 
-                if isinstance(result, dict): # Varmista, että saatiin sanakirja takaisin
-                    # Etsi, onko tämä ID jo datassa
-                    existing_index = -1
-                    for i, existing_item in enumerate(self.match_data):
-                        if isinstance(existing_item, dict) and existing_item.get('match_id') == result.get('match_id'):
-                            existing_index = i
-                            break
-                    
-                    if existing_index != -1: # Jos ID löytyi, päivitä se
-                        logger.info(f"Päivitetään olemassa oleva data ID:lle {result.get('match_id')}")
-                        self.match_data[existing_index] = result
-                    else: # Jos ID on uusi, lisää se listaan
-                        self.match_data.append(result)
-                        existing_ids.add(result.get('match_id')) # Lisää myös settiin
-
-                    if result.get('status', '').startswith('success'):
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                else: # Jos process_match ei palauttanut sanakirjaa (epätodennäköistä, mutta varmuuden vuoksi)
-                    logger.error(f"process_match palautti virheellisen tyypin ({type(result)}) ID:lle {next_id}. Ohitetaan tallennus.")
-                    # Lisätään virheellinen tulos vain jos ID:tä ei jo ole, jotta ei luoda duplikaatteja virheistä
-                    error_result = {'match_id': next_id, 'status': 'internal_error_invalid_result_type', 'scrape_timestamp': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
-                    if next_id not in existing_ids:
-                         self.match_data.append(error_result)
-                         existing_ids.add(next_id)
+                if future.result():
+                    success_count += 1
+                else:
                     failed_count += 1
-                
-                self.current_id = next_id # Siirry seuraavaan ID:hen vasta onnistuneen käsittelyn jälkeen
 
-                # Välitallennus joka 10. ID:n jälkeen tai jos MAX_MATCHES on 1 (testausta varten)
-                if MAX_MATCHES == 1 or processed_count % 10 == 0:
-                    logger.info(f"Välitallennus {processed_count} ID:n jälkeen...")
-                    self.save_data()
-                    self.save_last_id() # Tallenna viimeisin KÄSITELTY ID
-                    logger.info(f"Tallennettu. Viimeisin käsitelty ID: {self.current_id}")
+                # Tilannekuva joka 10. ID:n jälkeen lyhentää käynnistyksen journaalin toistoa
+                if self.max_matches == 1 or processed_count % 10 == 0:
+                    logger.info("Välitallennus %s ID:n jälkeen...", processed_count)
+                    self.save_data(export=False)
+                    with self._progress_lock:
+                        self.save_progress()
+                    logger.info("Tallennettu. Frontier: %s", self.current_id)
 
-                if processed_count < MAX_MATCHES: # Pieni tauko ennen seuraavaa, jos ei olla vielä valmiita
-                    time.sleep(REQUEST_DELAY)
-        
         except KeyboardInterrupt:
             logger.warning("Käyttäjä keskeytti suorituksen (KeyboardInterrupt).")
         except Exception as e:
-            logger.exception(f"Odottamaton virhe pääsilmukassa: {e}")
+            logger.exception("Odottamaton virhe pääsilmukassa: %s", e)
         finally:
+            executor.shutdown(wait=True, cancel_futures=True)
             logger.info("Tallennetaan lopulliset tiedot ennen lopetusta...")
-            # Siivotaan ja järjestetään data ennen lopullista tallennusta
-            # Tämä poistaa duplikaatit ID:n perusteella, pitäen viimeisimmän version, ja järjestää
-            final_data = {}
-            for item in self.match_data:
-                if isinstance(item, dict) and item.get('match_id') is not None:
-                    final_data[item.get('match_id')] = item # Uudempi korvaa vanhemman, jos sama ID
-            
-            self.match_data = sorted(list(final_data.values()), key=lambda x: x.get('match_id', 0))
-
+            # match_data on jo avaimena match_id, joten duplikaatteja ei synny; järjestys tehdään viennissä
             self.save_data()
-            self.save_last_id() # Tallenna lopullinen käsitelty ID
+            self.save_progress()
+            self.close_browsers()
+            logger.info("Nopeusrajoitin: %s", self.rate_limiter.summary())
+            logger.info("Sivujen valmiustunnistus: %s", readiness_stats.summary())
+            if self.block_resources:
+                logger.info("Resurssiesto: %s", blocking_report.summary())
+            self.debug_writer.close()
+            logger.info("Debug-tiedostot: %s", self.debug_writer.summary())
+            self.report_metrics()
             duration = time.time() - start_time
-            logger.info(f"--- Skrapaus valmis --- Kesto: {duration:.2f}s")
-            logger.info(f"Yritetty käsitellä (uutta/päivitettyä): {processed_count}, Onnistuneita: {success_count}, Epäonnistuneita: {failed_count}")
+            logger.info("--- Skrapaus valmis --- Kesto: %.2fs", duration)
+            logger.info("Yritetty käsitellä (uutta/päivitettyä): %s, Onnistuneita: %s, Epäonnistuneita: %s", processed_count, success_count, failed_count)
+
+    def run_shard_worker(self, leases, owner):
+        """Lease ID ranges from the shared store and scrape them into this worker's partition until max_matches"""
+        logger.info("Shard-worker %s käynnistyy: osio %s, budjetti %s ID:tä, välit: %s", owner, self.partition, self.max_matches, leases.summary())
+        processed_count = 0
+        ranges_done = 0
+        lease = None
+        start_time = time.time()
+        executor = ThreadPoolExecutor(max_workers=max(self.workers, self.tabs), thread_name_prefix="shard")
+        try:
+            while processed_count < self.max_matches:
+                lease = leases.claim(owner)
+                if lease is None:
+                    logger.info("Ei vapaita ID-välejä, worker lopettaa.")
+                    break
+                first_id, last_id = lease
+                # Saman omistajan aiemmin loppuun hakemat ottelut ohitetaan (esim. keskeytetty ajo samalla --shard-ownerilla)
+                match_ids = [match_id for match_id in range(first_id, last_id + 1)
+                             if self.work_queue.entries.get(match_id, {}).get('state') != 'done']
+                budget = self.max_matches - processed_count
+                if len(match_ids) > budget:
+                    # Budjetti loppuu kesken välin: haetaan vain oma osuus ja loppu palautetaan vuokrattavaksi
+                    match_ids = match_ids[:budget]
+                    if leases.give_back(owner, first_id, match_ids[-1]):
+                        last_id = match_ids[-1]
+                logger.info("Väli %s-%s vuokrattu: %s haettavaa ID:tä.", first_id, last_id, len(match_ids))
+                futures = [executor.submit(self._process_and_record, match_id) for match_id in match_ids]
+                lost = False
+                for future in as_completed(futures):
+                    future.result()
+                    processed_count += 1
+                    if not leases.renew(owner, first_id): # Vuokra uusitaan jokaisen ID:n jälkeen
+                        logger.warning("Vuokra välille %s-%s menetettiin toiselle workerille, väli keskeytetään.", first_id, last_id)
+                        lost = True
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                self.save_data(export=False)
+                self.save_progress()
+                if not lost and leases.complete(owner, first_id, records=len(match_ids)):
+                    ranges_done += 1
+                lease = None
+        except KeyboardInterrupt:
+            logger.warning("Käyttäjä keskeytti shard-workerin (KeyboardInterrupt).")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if lease:
+                leases.release(owner, lease[0]) # Kesken jäänyt väli heti muiden haettavaksi
+            self.save_data(export=False)
+            self.save_progress()
+            self.close_browsers()
+            self.debug_writer.close()
+            self.report_metrics(job="audience_scraper_shard")
+            logger.info("--- Shard-worker valmis --- Kesto: %.2fs, ID:itä %s, valmiita välejä %s. Välit nyt: %s",
+                        time.time() - start_time, processed_count, ranges_done, leases.summary())
+
+    def merge_shards(self, root=PARTS_DIR):
+        """Fold every worker partition into the canonical store; the higher status rank wins, then the newer scrape_timestamp"""
+        merged_count = 0
+        skipped_count = 0
+        highest = None
+        for part in partition_dirs(root):
+            store_file = os.path.join(part, STORE_FILE)
+            if not os.path.exists(store_file):
+                continue
+            part_count = 0
+            for record in read_records(store_file):
+                match_id = record['match_id']
+                current = self.match_data.get(match_id)
+                if current and (not should_replace(current, record) # Heikompi tila ei korvaa parempaa tietuetta
+                                or (status_rank(current) == status_rank(record)
+                                    and (current.get('scrape_timestamp') or '') >= (record.get('scrape_timestamp') or ''))):
+                    skipped_count += 1
+                    continue
+                self.store.upsert(record, durable=False) # Osiot säilyvät, joten yhdistäminen voidaan toistaa
+                self.work_queue.record_result(match_id, record, journal=False)
+                highest = match_id if highest is None else max(highest, match_id)
+                part_count += 1
+            logger.info("Osio %s: %s tietuetta yhdistetty.", part, part_count)
+            merged_count += part_count
+        if highest is not None:
+            # Yhdistetyt ID:t eivät saa palata jonoon uusina, kun tavallinen ajo jatkaa frontierista
+            self.work_queue.frontier = max(self.work_queue.frontier, highest)
+        self.save_data()
+        self.save_progress()
+        logger.info("Yhdistäminen valmis: %s tietuetta päivitetty, %s ohitettu (kanoninen tietue yhtä uusi tai uudempi), frontier %s.",
+                    merged_count, skipped_count, self.current_id)
+        return merged_count
+
+    def close_browsers(self):
+        if self.tab_fetcher:
+            self.tab_fetcher.close() # Palauttaa välilehtien selaimen pooliin
+        self.driver_pool.close()
+
+    def report_metrics(self, job="audience_scraper"):
+        """Log p50/p95 per stage and write the run's metrics files"""
+        for line in scrape_metrics.summary_lines():
+            logger.info("Mittarit: %s", line)
+        scrape_metrics.write(job)
+
+    def track_live_match(self, match_id):
+        """Fetch one live match and parse only the live fields. Returns (record, changes, updated)."""
+        url = BASE_URL.format(match_id=match_id)
+        scrape_timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        old_record = self.match_data.get(match_id)
+        try:
+            html, soup = self.fetch_page(url)
+            if not html:
+                logger.warning("Live-haku epäonnistui ID:lle %s, yritetään seuraavalla kierroksella.", match_id)
+                return None, [], False
+            with scrape_metrics.timer('parse_seconds'):
+                soup = soup if soup is not None else self.make_soup(html)
+                live = self.extract_live(soup, match_id)
+        except Exception as e:
+            logger.exception("Virhe live-seurannassa ID %s: %s", match_id, e)
+            return None, [], False
+
+        changes = diff_live_fields(old_record, live)
+        finished = 'päättynyt' in (live.get('match_status_raw') or '').lower()
+        if old_record is None or (finished and changes):
+            # Ensimmäinen haku tai ottelu päättyi: koko tietue (yleisö, palkinnot) samasta sivusta
+            record = self.parse_page(html, match_id, scrape_timestamp, soup=soup)
+            record['page_sha256'] = self.page_store.put(match_id, html, url=url, fetch_time=scrape_timestamp)
+            return record, changes, True
+        if not changes:
+            return old_record, [], False
+        record = dict(old_record) # Päivitetään vain live-kentät, muu tietue säilyy
+        record.update(live)
+        record['scrape_timestamp'] = scrape_timestamp
+        record['status_details'] = []
+        self.classify_result(record, match_id)
+        return record, changes, True
+
+    def run_live(self, interval=LIVE_INTERVAL, duration=LIVE_DURATION):
+        """Poll in-progress matches every interval seconds and record score/event/stat changes"""
+        logger.info("Live-seuranta käynnistyy: väli %ss, enimmäiskesto %.0f min, workereita %s", interval, duration / 60, self.workers)
+        event_log = LiveEventLog()
+        deadline = time.time() + duration
+        cycles = 0
+        change_count = 0
+        executor = ThreadPoolExecutor(max_workers=max(self.workers, self.tabs), thread_name_prefix="live")
+        try:
+            while time.time() < deadline:
+                cycle_start = time.time()
+                match_ids = self.work_queue.live_ids(cycle_start)
+                if not match_ids:
+                    next_kickoff = self.work_queue.next_kickoff(cycle_start)
+                    if next_kickoff is None or next_kickoff > min(deadline, cycle_start + LIVE_LOOKAHEAD):
+                        logger.info("Ei käynnissä olevia tai pian alkavia otteluita, live-seuranta päättyy.")
+                        break
+                    logger.info("Ei käynnissä olevia otteluita; seuraava aloitus %.0f min päästä.", (next_kickoff - cycle_start) / 60)
+                    time.sleep(max(1.0, min(next_kickoff, deadline) - time.time()))
+                    continue
+
+                cycles += 1
+                logger.info("Live-kierros %s: %s ottelua %s", cycles, len(match_ids), match_ids)
+                for match_id, (record, changes, updated) in zip(match_ids, executor.map(self.track_live_match, match_ids)):
+                    if record is None:
+                        continue # Haku epäonnistui; tila säilyy ja ID yritetään uudelleen
+                    if updated:
+                        with scrape_metrics.timer('save_seconds'):
+                            self.store.upsert(record) # Sama match_id -> tietue korvautuu
+                    if changes:
+                        event_log.append(match_id, changes, record.get('scrape_timestamp'))
+                        change_count += len(changes)
+                        logger.info("ID %s: %s muutosta (%s), tulos %s", match_id, len(changes), ', '.join(sorted({c['type'] for c in changes})), record.get('score'))
+                    entry = self.work_queue.record_result(match_id, record)
+                    if entry['state'] == 'not_started': # Aloitusaika ohi: tarkistetaan joka kierroksella, ei 15 min välein
+                        entry['next_due'] = min(entry['next_due'], time.time() + interval)
+                self.save_data(export=False)
+                self.save_progress()
+                time.sleep(max(0.0, min(interval - (time.time() - cycle_start), deadline - time.time())))
+        except KeyboardInterrupt:
+            logger.warning("Käyttäjä keskeytti live-seurannan (KeyboardInterrupt).")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.save_data()
+            self.save_progress()
+            self.close_browsers()
+            self.debug_writer.close()
+            self.report_metrics(job="audience_scraper_live")
+            logger.info("--- Live-seuranta valmis --- Kierroksia: %s, muutostapahtumia: %s", cycles, change_count)
+
+# --- Uudelleenjäsennys prosessipoolissa ---
+_reparse_parser = None
+_reparse_store = None
+
+def _reparse_init(store_root, parser_backend):
+    global _reparse_parser, _reparse_store
+    setup_worker_logging(logging.WARNING) # Sivukohtaiset INFO-rivit hidastaisivat massajäsennystä; loki vain konsoliin
+    _reparse_parser = MatchPageParser(parser_backend)
+    _reparse_store = PageStore(store_root)
+
+def _reparse_one(task):
+    match_id, entry = task
+    html = _reparse_store.get(entry['sha256'])
+    if html is None:
+        return match_id, None
+    record = _reparse_parser.parse_page(html, match_id, entry.get('fetch_time'))
+    record['page_sha256'] = entry['sha256']
+    return match_id, record
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ykkösliigan otteludatan skraperi (tulospalvelu.palloliitto.fi)")
+    parser.add_argument("command", nargs="?", choices=["run", "reparse", "live", "shard", "merge", "prune-pages"], default="run",
+                        help="'run' hakee uudet ID:t, 'reparse' jäsentää välimuistissa olevat sivut uudelleen ilman verkkoa, "
+                             "'live' seuraa käynnissä olevia otteluita tiheästi, 'shard' hakee vuokrattuja ID-välejä omaan osioonsa, "
+                             "'merge' yhdistää osiot kanoniseen dataan, 'prune-pages' jättää raakasivuvarastoon vain "
+                             "uusimman sivun per ottelu ja tietueiden viittaamat sivut (oletus: %(default)s)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Rinnakkaisten selainten määrä; reparse-tilassa prosessien määrä (oletus: %(default)s)")
+    parser.add_argument("--max-matches", type=int, default=MAX_MATCHES,
+                        help="Käsiteltävien ID:iden määrä tällä ajolla (oletus: %(default)s)")
+    parser.add_argument("--request-delay", type=float, default=REQUEST_DELAY,
+                        help="Nopeusrajoittimen aloitusväli sivulatausten välillä sekunteina, yhteinen kaikille workereille; "
+                             "väli lyhenee nopeilla vastauksilla ja pitenee virheillä (oletus: %(default)s)")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help="Kuinka monta hakua saa lähteä peräkkäin ilman odotusta (oletus: %(default)s)")
+    parser.add_argument("--parser", dest="parser_backend", choices=PARSER_BACKENDS, default=DEFAULT_PARSER_BACKEND,
+                        help="HTML-jäsennysmoottori (oletus: %(default)s)")
+    parser.add_argument("--no-http-first", dest="http_first", action="store_false",
+                        help="Ohita suora HTTP-haku ja renderöi jokainen sivu Seleniumilla")
+    parser.add_argument("--source", choices=["html", "json"], default="html",
+                        help="Datalähde: 'json' hakee ottelut suoraan tulospalvelun rajapinnasta ja käyttää HTML-polkua varalla (oletus: %(default)s)")
+    parser.add_argument("--no-resource-blocking", dest="block_resources", action="store_false", default=RESOURCE_BLOCKING,
+                        help="Lataa sivut kokonaan (kuvat, fontit, tyylit, seurantaskriptit); oletuksena ne estetään")
+    parser.add_argument("--debug-artifacts", choices=DEBUG_MODES, default=DEBUG_MODE,
+                        help="Kuvakaappaukset ja HTML-dumpit: 'errors' tallentaa vain muutaman per virheluokka (oletus: %(default)s)")
+    parser.add_argument("--live-interval", type=int, default=LIVE_INTERVAL,
+                        help="Live-tilan kierrosväli sekunteina (oletus: %(default)s)")
+    parser.add_argument("--live-duration", type=int, default=LIVE_DURATION // 60,
+                        help="Live-tilan enimmäiskesto minuutteina (oletus: %(default)s)")
+    parser.add_argument("--discover", action="store_true",
+                        help="Etsi ennen hakua suurin olemassa oleva ID eksponentiaalisella ja binäärihaulla; tyhjät ID:t ohitetaan")
+    parser.add_argument("--discover-span", type=int, default=GALLOP_MAX_SPAN,
+                        help="Kuinka kauas viimeisimmän olemassa olevan ID:n yli frontier-haku enintään koettaa (oletus: %(default)s)")
+    parser.add_argument("--warm-profile", action="store_true", default=WARM_PROFILE,
+                        help="Käytä pysyvää selainprofiilia ja HTTP-levyvälimuistia per selain, jolloin toistuvat käynnit ovat nopeampia")
+    parser.add_argument("--tabs", type=int, default=TAB_COUNT,
+                        help="Hae Selenium-sivut yhden selaimen näin monessa välilehdessä rinnakkain; "
+                             "säästää muistia verrattuna selaimeen per worker (oletus: %(default)s = ei välilehtitilaa)")
+    parser.add_argument("--shard-db", default=SHARD_DB,
+                        help="Jaettu SQLite-tiedosto ID-välien vuokrille (oletus: %(default)s)")
+    parser.add_argument("--shard-owner", default=default_owner(),
+                        help="Workerin nimi ja osiohakemisto; pysyvä nimi jatkaa keskeytettyä osiota (oletus: kone-pid)")
+    parser.add_argument("--shard-range", type=int, nargs=2, metavar=("FIRST", "LAST"),
+                        help="Lisää välit FIRST..LAST vuokrattaviksi ennen hakua; jo olemassa olevat välit säilyvät")
+    parser.add_argument("--range-size", type=int, default=RANGE_SIZE,
+                        help="ID:tä per vuokrattava väli (oletus: %(default)s)")
+    parser.add_argument("--lease-ttl", type=int, default=LEASE_TTL,
+                        help="Sekunnit, joiden jälkeen uusimaton vuokra vapautuu muille workereille (oletus: %(default)s)")
+    parser.add_argument("--log-format", choices=["text", "json"], default=LOG_FORMAT,
+                        help="Lokirivien muoto; 'json' kirjoittaa yhden JSON-objektin riviä kohden (oletus: %(default)s)")
+    return parser.parse_args(argv)
 
 # --- Pääsuoritus ---
 if __name__ == '__main__':
-    scraper = MatchDataScraper()
-    scraper.run()
+    args = parse_args()
+    partition = partition_dir(args.shard_owner) if args.command == "shard" else None
+    if partition:
+        os.makedirs(partition, exist_ok=True)
+        setup_logging(os.path.join(partition, os.path.basename(LOG_FILE)), log_format=args.log_format) # Rinnakkaiset workerit eivät kierrätä samaa lokia
+    elif args.log_format != LOG_FORMAT:
+        setup_logging(LOG_FILE, log_format=args.log_format)
+    scraper = MatchDataScraper(workers=args.workers, max_matches=args.max_matches, request_delay=args.request_delay, burst=args.burst,
+                               http_first=args.http_first, source=args.source,
+                               parser_backend=args.parser_backend, discover=args.discover,
+                               discover_span=args.discover_span, block_resources=args.block_resources,
+                               debug_artifacts=args.debug_artifacts, warm_profile=args.warm_profile,
+                               tabs=args.tabs, partition=partition)
+    try:
+        if args.command == "reparse":
+            scraper.reparse(workers=args.workers if args.workers > 1 else None)
+        elif args.command == "shard":
+            leases = LeaseStore(args.shard_db, ttl=args.lease_ttl)
+            if args.shard_range:
+                leases.plan(*args.shard_range, range_size=args.range_size)
+            scraper.run_shard_worker(leases, args.shard_owner)
+        elif args.command == "prune-pages":
+            # CI:n välimuistiin tallennettava varasto pysyy otteluiden määrään sidottuna
+            scraper.page_store.prune(keep_digests={record.get('page_sha256') for record in scraper.match_data.values()})
+        elif args.command == "merge":
+            scraper.merge_shards() # Yksi kirjoittaja: aja vasta, kun workerit ovat valmiita tai pysähtyneet
+        elif args.command == "live":
+            scraper.run_live(interval=args.live_interval, duration=args.live_duration * 60)
+        else:
+            scraper.run()
+    finally:
+        # Debug-kirjoittaja on daemon-säie: jonossa olevat tiedostot kirjoitetaan myös poikkeuksen jälkeen.
+        # run, shard ja live sulkevat sen ja kirjoittavat mittarit jo omassa finally-lohkossaan; close on idempotentti.
+        scraper.debug_writer.close()
+        if args.command in ("reparse", "prune-pages", "merge"):
+            scraper.report_metrics(job=f"audience_scraper_{args.command.replace('-', '_')}")
     logger.info("Skraperin suoritus päättyi.")
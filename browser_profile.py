@@ -0,0 +1,122 @@
+import os
+import json
+import logging
+import threading
+
+# -------------------------------------------------------
+# Headless Chromen resurssienesto: skrapereille riittää DOM, joten kuvat, fontit,
+# tyylitiedostot, media sekä mainos- ja analytiikkapalvelut estetään.
+# - Chrome-asetukset (prefs) estävät kuvat ja ilmoitukset jo selaimen tasolla
+# - CDP:n Network.setBlockedURLs estää loput URL-kuvioiden perusteella
+# Sallittujen lista (SCRAPER_RESOURCE_ALLOWLIST, pilkuin eroteltu) poistaa kuvioita estolistalta,
+# ja SCRAPER_RESOURCE_BLOCKING=0 kytkee eston pois.
+# Selaimen performance-lokista lasketaan sivukohtaisesti estetyt pyynnöt ja säästetyt tavut.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"]
+BLOCKED_RESOURCE_PATTERNS = IMAGE_PATTERNS + [
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", # Fontit
+    "*.css", # Tyylit; DOM syntyy ilman niitä
+    "*.mp4", "*.webm", "*.mp3", # Media
+]
+BLOCKED_HOST_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*googleadservices.com*", "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*",
+    "*cookiebot.com*", "*consensu.org*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+]
+RESOURCE_ALLOWLIST = [pattern.strip() for pattern in os.environ.get("SCRAPER_RESOURCE_ALLOWLIST", "").split(",") if pattern.strip()]
+RESOURCE_BLOCKING = os.environ.get("SCRAPER_RESOURCE_BLOCKING", "1") != "0"
+
+BLOCKING_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+}
+
+# Estettyjen pyyntöjen tavuja ei voi mitata, joten säästö arvioidaan tyypillisillä kokoluokilla
+ESTIMATED_BYTES = {'Image': 25_000, 'Font': 40_000, 'Stylesheet': 20_000, 'Script': 60_000, 'Media': 250_000}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+def blocked_url_patterns(allowlist=None):
+    allowed = set(RESOURCE_ALLOWLIST if allowlist is None else allowlist)
+    return [pattern for pattern in BLOCKED_RESOURCE_PATTERNS + BLOCKED_HOST_PATTERNS if pattern not in allowed]
+
+
+def apply_blocking_options(chrome_options, prefs, allowlist=None):
+    """Add blocking prefs into prefs (set by the caller) and enable the performance log for the report"""
+    allowed = set(RESOURCE_ALLOWLIST if allowlist is None else allowlist)
+    for key, value in BLOCKING_PREFS.items():
+        if key.endswith('.images') and allowed & set(IMAGE_PATTERNS):
+            continue # Kuvia on sallittu, joten niitä ei estetä myöskään asetuksella
+        prefs[key] = value
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return prefs
+
+
+def enable_request_blocking(driver, allowlist=None):
+    """Block the non-essential URL patterns through CDP; returns the active patterns"""
+    patterns = blocked_url_patterns(allowlist)
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.debug("Resurssiesto käytössä: %s URL-kuviota.", len(patterns))
+    except Exception as e:
+        logger.warning("Resurssieston käyttöönotto epäonnistui, sivut ladataan kokonaan: %s", e)
+        return []
+    return patterns
+
+
+class BlockingReport:
+    """Counts blocked requests and loaded/saved bytes per page from Chrome's performance log."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.requests_loaded = 0
+        self.requests_blocked = 0
+        self.bytes_loaded = 0
+        self.bytes_saved_estimate = 0
+
+    def collect(self, driver, url=None):
+        """Drain the performance log after one page and return that page's counts"""
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            logger.debug("Performance-lokia ei saatu: %s", e)
+            return None
+        page = {'requests_loaded': 0, 'requests_blocked': 0, 'bytes_loaded': 0, 'bytes_saved_estimate': 0, 'blocked_by_type': {}}
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.loadingFinished':
+                page['requests_loaded'] += 1
+                page['bytes_loaded'] += int(params.get('encodedDataLength') or 0)
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                resource_type = params.get('type', 'Other')
+                page['requests_blocked'] += 1
+                page['blocked_by_type'][resource_type] = page['blocked_by_type'].get(resource_type, 0) + 1
+                page['bytes_saved_estimate'] += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        with self._lock:
+            self.pages += 1
+            self.requests_loaded += page['requests_loaded']
+            self.requests_blocked += page['requests_blocked']
+            self.bytes_loaded += page['bytes_loaded']
+            self.bytes_saved_estimate += page['bytes_saved_estimate']
+        logger.debug("Resurssiesto %s: ladattu %s pyyntöä / %.0f kt, estetty %s %s (arviolta %.0f kt)",
+                     url or '', page['requests_loaded'], page['bytes_loaded'] / 1024,
+                     page['requests_blocked'], page['blocked_by_type'], page['bytes_saved_estimate'] / 1024)
+        return page
+
+    def summary(self):
+        return (f"{self.pages} sivua, ladattu {self.requests_loaded} pyyntöä / {self.bytes_loaded / 1024:.0f} kt, "
+                f"estetty {self.requests_blocked} pyyntöä (arviolta {self.bytes_saved_estimate / 1024:.0f} kt säästöä)")
+
+
+blocking_report = BlockingReport()
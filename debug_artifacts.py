@@ -0,0 +1,154 @@
+import os
+import glob
+import queue
+import logging
+import threading
+
+# -------------------------------------------------------
+# Debug-tiedostot (kuvakaappaukset ja HTML-dumpit) kirjoitetaan taustasäikeessä,
+# jotta levykirjoitus ei hidasta hakua. Tila valitaan ajokohtaisesti:
+# - 'off'    : ei mitään
+# - 'errors' : virhetilanteista vain N ensimmäistä per virheluokka (oletus)
+# - 'all'    : kaikki, myös rutiinidumpit onnistuneista hauista
+# Hallittujen tiedostojen yhteiskoko pidetään rajan alla poistamalla vanhimmat.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+DEBUG_MODES = ("off", "errors", "all")
+DEBUG_MODE = os.environ.get("SCRAPER_DEBUG_ARTIFACTS", "errors")
+SAMPLES_PER_CLASS = 3 # Montako tiedostoa per virheluokka yhden ajon aikana
+MAX_DEBUG_BYTES = 50 * 1024 * 1024 # Debug-tiedostojen yhteiskoko levyllä
+WRITE_QUEUE_SIZE = 32 # Täysi jono -> tiedosto pudotetaan eikä haku jää odottamaan
+
+_STOP = object()
+
+
+class DebugArtifactWriter:
+    """Writes sampled debug artifacts on a background thread under a total disk cap."""
+
+    def __init__(self, root, mode=DEBUG_MODE, samples_per_class=SAMPLES_PER_CLASS, max_bytes=MAX_DEBUG_BYTES,
+                 managed_globs=("*.png", "*.html", "*/*.html"), queue_size=WRITE_QUEUE_SIZE):
+        if mode not in DEBUG_MODES:
+            logger.warning("Tuntematon debug-tila '%s', käytetään tilaa 'errors'.", mode)
+            mode = "errors"
+        self.root = root
+        self.mode = mode
+        self.samples_per_class = samples_per_class
+        self.max_bytes = max_bytes
+        self.managed_globs = managed_globs # Vain näihin osuvia tiedostoja lasketaan rajaan ja poistetaan
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._samples = {} # virheluokka -> tällä ajolla varatut tiedostot
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def should_capture(self, error_class=None):
+        """Reserve a slot for one artifact; error_class None means a routine dump of a successful fetch"""
+        if self.mode == "off":
+            return False
+        if error_class is None:
+            return self.mode == "all"
+        if self.mode == "all":
+            return True
+        with self._lock:
+            taken = self._samples.get(error_class, 0)
+            if taken >= self.samples_per_class:
+                return False
+            self._samples[error_class] = taken + 1
+            return True
+
+    def save_html(self, path, html, error_class=None):
+        if not self.should_capture(error_class):
+            return False
+        content = (html if html else "<!-- HTML content was empty or None -->").encode('utf-8')
+        return self._submit(path, content)
+
+    def save_screenshot(self, path, driver, error_class=None):
+        """Grab the PNG on the calling thread (the driver is not thread-safe) and write it in the background"""
+        if not self.should_capture(error_class):
+            return False
+        try:
+            png = driver.get_screenshot_as_png()
+        except Exception as e:
+            logger.error("Kuvakaappauksen otto epäonnistui: %s", e)
+            return False
+        return self._submit(path, png)
+
+    def _submit(self, path, content):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((path, content))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.debug("Debug-kirjoitusjono täynnä, ohitetaan %s", path)
+            return False
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            path, content = item
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                self.written += 1
+                logger.debug("Debug-tiedosto tallennettu: %s", path)
+                self._evict()
+            except Exception as e:
+                logger.error("Debug-tiedoston %s tallennus epäonnistui: %s", path, e)
+
+    def _managed_files(self):
+        files = set()
+        for pattern in self.managed_globs:
+            files.update(glob.glob(os.path.join(self.root, pattern)))
+        return files
+
+    def _evict(self):
+        """Delete the oldest managed files until their total size is under max_bytes"""
+        entries = []
+        for path in self._managed_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evicted += 1
+                logger.debug("Debug-tiedosto poistettu levyrajan vuoksi: %s", path)
+            except OSError:
+                continue
+
+    def close(self, timeout=30):
+        """Flush queued artifacts and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def summary(self):
+        return (f"tila '{self.mode}', kirjoitettu {self.written}, pudotettu {self.dropped}, "
+                f"poistettu levyrajan vuoksi {self.evicted}")
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import SessionNotCreatedException
+from webdriver_manager.chrome import ChromeDriverManager
+
+# -------------------------------------------------------
+# Selaimen käynnistyksen nopeutus:
+# 1) Chromedriverin polku ratkaistaan kerran ja tallennetaan levylle. ChromeDriverManager().install()
+#    tekee versiohaun (verkko) joka kutsulla, joten sitä kutsutaan vain, jos tallennettu polku ei kelpaa
+#    (tiedosto puuttuu, ei ole suoritettava tai on vanhempi kuin DRIVER_PATH_MAX_AGE) tai jos
+#    Chrome on päivittynyt eikä driver enää käynnisty.
+# 2) Valinnainen lämmin profiili: jokainen poolin selain saa oman pysyvän user-data-dirin ja levyvälimuistin,
+#    jolloin toistuvat käynnit käyttävät HTTP-välimuistia (skriptit, JSON). Paikka varataan lukkotiedostolla,
+#    jotta samalla koneella ajettavat prosessit eivät koskaan jaa samaa profiilia.
+# SCRAPER_BROWSER_CACHE vaihtaa hakemiston (oletus ~/.cache/scraper), SCRAPER_WARM_PROFILE=1 ottaa profiilin käyttöön.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+BROWSER_CACHE_DIR = os.environ.get("SCRAPER_BROWSER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "scraper"))
+DRIVER_PATH_FILE = os.path.join(BROWSER_CACHE_DIR, "chromedriver_path.json")
+DRIVER_PATH_MAX_AGE = 7 * 24 * 3600 # Viikon välein tarkistetaan silti uusi versio
+PROFILE_ROOT = os.path.join(BROWSER_CACHE_DIR, "chrome-profiles")
+WARM_PROFILE = os.environ.get("SCRAPER_WARM_PROFILE", "0") == "1"
+DISK_CACHE_BYTES = 32 * 1024 * 1024 # Per profiili; ottelusivun skriptit ja JSON mahtuvat reilusti, ja CI-välimuisti pysyy pienenä
+MAX_PROFILE_SLOTS = 16
+CHROME_SINGLETON_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _valid_driver_path(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _read_cached_path(path_file):
+    try:
+        with open(path_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached.get('resolved_at', 0) > DRIVER_PATH_MAX_AGE:
+        logger.info("Tallennettu chromedriver-polku on vanhentunut, tarkistetaan versio.")
+        return None
+    if not _valid_driver_path(cached.get('path')):
+        logger.info("Tallennettu chromedriver-polku ei kelpaa (%s), ratkaistaan uudelleen.", cached.get('path'))
+        return None
+    return cached['path']
+
+
+def resolve_driver_path(refresh=False, path_file=DRIVER_PATH_FILE):
+    """Return a chromedriver path: process memo, then the persisted path, then ChromeDriverManager"""
+    global _driver_path
+    with _driver_path_lock:
+        if not refresh and _valid_driver_path(_driver_path):
+            return _driver_path
+        path = None if refresh else _read_cached_path(path_file)
+        if path is None:
+            start = time.monotonic()
+            path = ChromeDriverManager().install()
+            logger.info("Chromedriver ratkaistu %.1fs:ssa: %s", time.monotonic() - start, path)
+            try:
+                os.makedirs(os.path.dirname(path_file), exist_ok=True)
+                with open(f"{path_file}.tmp", 'w', encoding='utf-8') as f:
+                    json.dump({'path': path, 'resolved_at': time.time()}, f)
+                os.replace(f"{path_file}.tmp", path_file)
+            except OSError as e:
+                logger.warning("Chromedriver-polun tallennus epäonnistui: %s", e)
+        _driver_path = path
+        return path
+
+
+def invalidate_driver_path(path_file=DRIVER_PATH_FILE):
+    """Forget the cached path, e.g. after Chrome was upgraded and the driver no longer starts a session"""
+    global _driver_path
+    with _driver_path_lock:
+        _driver_path = None
+        try:
+            os.remove(path_file)
+        except OSError:
+            pass
+
+
+def start_chrome(chrome_options):
+    """Start Chrome with the cached driver path; re-resolve once if the cached driver no longer fits the browser"""
+    driver_path = resolve_driver_path()
+    try:
+        return webdriver.Chrome(service=Service(driver_path, log_output=os.devnull), options=chrome_options) # log_output ohjaa driverin lokit pois
+    except SessionNotCreatedException as e:
+        logger.warning("Tallennettu chromedriver (%s) ei käynnistänyt selainta, ratkaistaan uudelleen: %s", driver_path, e.msg)
+        invalidate_driver_path()
+        return webdriver.Chrome(service=Service(resolve_driver_path(refresh=True), log_output=os.devnull), options=chrome_options)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ProfileSlots:
+    """Hands out persistent Chrome user-data-dirs, one per live browser, locked across processes."""
+
+    def __init__(self, root=PROFILE_ROOT, max_slots=MAX_PROFILE_SLOTS):
+        self.root = root
+        self.max_slots = max_slots
+        self._lock = threading.Lock()
+        self._by_driver = {} # id(driver) -> profiilihakemisto
+
+    def _try_lock(self, lock_path):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(lock_path, 'r') as f:
+                    owner = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                owner = 0
+            if owner and _pid_alive(owner):
+                return False
+            os.remove(lock_path) # Kaatuneen prosessin jättämä lukko
+            return self._try_lock(lock_path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def acquire(self, name="scraper"):
+        """Reserve a free profile directory; returns None when every slot is taken"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            for slot in range(self.max_slots):
+                profile_dir = os.path.join(self.root, f"{name}-{slot}")
+                if self._try_lock(f"{profile_dir}.lock"):
+                    os.makedirs(profile_dir, exist_ok=True)
+                    for singleton in CHROME_SINGLETON_FILES:
+                        # Paikka on nyt meidän: edellisen (esim. toisella koneella, välimuistista palautetun) Chromen
+                        # jättämä lukko estäisi muuten käynnistyksen
+                        try:
+                            os.remove(os.path.join(profile_dir, singleton))
+                        except OSError:
+                            pass
+                    return profile_dir
+        logger.warning("Kaikki %s lämmintä profiilia ovat käytössä, selain käynnistyy tyhjällä profiililla.", self.max_slots)
+        return None
+
+    def bind(self, driver, profile_dir):
+        if profile_dir:
+            with self._lock:
+                self._by_driver[id(driver)] = profile_dir
+
+    def release(self, profile_dir):
+        if not profile_dir:
+            return
+        try:
+            os.remove(f"{profile_dir}.lock")
+        except OSError:
+            pass
+
+    def release_driver(self, driver):
+        """Free the profile bound to a driver after it has quit"""
+        with self._lock:
+            profile_dir = self._by_driver.pop(id(driver), None)
+        self.release(profile_dir)
+
+
+profile_slots = ProfileSlots()
+
+
+def apply_warm_profile(chrome_options, profile_dir, disk_cache_bytes=DISK_CACHE_BYTES):
+    """Point Chrome at a persistent profile and HTTP disk cache"""
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    chrome_options.add_argument(f"--disk-cache-dir={os.path.join(profile_dir, 'cache')}")
+    chrome_options.add_argument(f"--disk-cache-size={disk_cache_bytes}")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
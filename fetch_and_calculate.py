@@ -10,26 +10,26 @@ from pathlib import Path
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from http_fetch import fetch_http_page, TABLE_PAGE_MARKERS, PLAYER_STATS_MARKERS
+from rate_limiter import get_rate_limiter
+from browser_profile import apply_blocking_options, enable_request_blocking, blocking_report, RESOURCE_BLOCKING
+from debug_artifacts import DebugArtifactWriter
+from page_ready import wait_until_ready, readiness_stats
+from scrape_metrics import scrape_metrics
+from log_setup import setup_logging
+from driver_cache import start_chrome, profile_slots, apply_warm_profile, WARM_PROFILE
+
 # -------------------------------------------------------
 # Fetch & Calculate - Veikkausliigan tilastot ja veikkaukset
 # -------------------------------------------------------
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("veikkausliiga_scraper.log", encoding='utf-8'), # Yhtenäinen lokitiedoston nimi
-        logging.StreamHandler()
-    ]
-)
+# Set up logging: queued background writer with a size-capped rotating file (see log_setup.py)
+setup_logging("veikkausliiga_scraper.log") # Yhtenäinen lokitiedoston nimi
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -46,11 +46,17 @@ CACHE_DIR = os.path.join(OUTPUT_DIR, "cache") # data/cache
 # Current time stamp for this run
 TIMESTAMP = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
 
+# Entiset kiinteät odotukset (3 s alkuodotus + 2 s vierityksen jälkeen); valmiustunnistuksen säästö lasketaan tätä vasten
+POST_LOAD_SLEEP = 5
+
 # Ensure directories exist
 Path(OUTPUT_DIR).mkdir(exist_ok=True)
 Path(CACHE_DIR).mkdir(exist_ok=True)
 
-def setup_driver(headless=True):
+# Raw HTML dumps are written off the fetch path; SCRAPER_DEBUG_ARTIFACTS=all keeps every dump (see debug_artifacts.py)
+debug_writer = DebugArtifactWriter(CACHE_DIR, managed_globs=("*_raw.html",))
+
+def setup_driver(headless=True, block_resources=RESOURCE_BLOCKING, warm_profile=WARM_PROFILE):
     """Configure and return a Chrome WebDriver with enhanced settings"""
     chrome_options = Options()
     if headless:
@@ -66,41 +72,52 @@ def setup_driver(headless=True):
     chrome_options.add_experimental_option('useAutomationExtension', False)
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     prefs = {'intl.accept_languages': 'fi,fi_FI'}
+    if block_resources: # Only the DOM is read: skip images, fonts, styles and trackers (see browser_profile.py)
+        apply_blocking_options(chrome_options, prefs)
     chrome_options.add_experimental_option('prefs', prefs)
+    profile_dir = profile_slots.acquire("fetch") if warm_profile else None # Persistent profile + HTTP disk cache (see driver_cache.py)
+    if profile_dir:
+        apply_warm_profile(chrome_options, profile_dir)
     
     try:
-        service = Service(ChromeDriverManager().install(), log_output=os.devnull)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver = start_chrome(chrome_options) # Cached chromedriver path, re-resolved only if the session cannot start
+        profile_slots.bind(driver, profile_dir)
         driver.set_page_load_timeout(45) # Hieman pidempi timeout
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        if block_resources:
+            enable_request_blocking(driver)
         return driver
     except Exception as e:
-        logger.error(f"Failed to setup Chrome driver with Service: {e}")
+        logger.error("Failed to setup Chrome driver with Service: %s", e)
         try:
             logger.info("Falling back to simpler Chrome driver setup...")
             driver = webdriver.Chrome(options=chrome_options) # Fallback
+            profile_slots.bind(driver, profile_dir)
             driver.set_page_load_timeout(45)
+            if block_resources:
+                enable_request_blocking(driver)
             return driver
         except Exception as e2:
-            logger.critical(f"Complete failure setting up Chrome: {e2}")
+            logger.critical("Complete failure setting up Chrome: %s", e2)
+            profile_slots.release(profile_dir)
             raise
 
 def save_cache(data, filename):
     """Save data to cache file"""
     cache_path = os.path.join(CACHE_DIR, filename)
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
+        with scrape_metrics.timer('save_seconds'), open(cache_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Cached data to {filename}")
+        logger.info("Cached data to %s", filename)
     except Exception as e:
-        logger.error(f"Error saving cache to {cache_path}: {e}")
+        logger.error("Error saving cache to %s: %s", cache_path, e)
 
 
 def load_cache(filename, max_age_hours=6): # Lyhennetty välimuistin ikä 6 tuntiin
     """Load data from cache if it exists and is not too old"""
     cache_path = os.path.join(CACHE_DIR, filename)
     if not os.path.exists(cache_path):
-        logger.info(f"Cache file not found: {cache_path}")
+        logger.info("Cache file not found: %s", cache_path)
         return None
     
     try:
@@ -108,39 +125,79 @@ def load_cache(filename, max_age_hours=6): # Lyhennetty välimuistin ikä 6 tunt
         file_age = datetime.datetime.now() - file_mod_time
         
         if file_age > datetime.timedelta(hours=max_age_hours):
-            logger.info(f"Cache {filename} expired (age: {file_age}, max_age: {max_age_hours}h). Will refetch.")
+            logger.info("Cache %s expired (age: %s, max_age: %sh). Will refetch.", filename, file_age, max_age_hours)
             return None # Välimuisti vanhentunut
         
         with open(cache_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        logger.info(f"Loaded data from cache {filename} (age: {file_age})")
+        scrape_metrics.count('fetch_path', path='cache')
+        logger.info("Loaded data from cache %s (age: %s)", filename, file_age)
         return data
     except json.JSONDecodeError as e:
-        logger.warning(f"Failed to decode JSON from cache file {cache_path}: {e}. Will refetch.")
+        logger.warning("Failed to decode JSON from cache file %s: %s. Will refetch.", cache_path, e)
         return None
     except Exception as e:
-        logger.warning(f"Failed to load cache {filename}: {e}. Will refetch.")
+        logger.warning("Failed to load cache %s: %s. Will refetch.", filename, e)
         return None
 
+def save_debug_html(page_source, debug_file, error_class=None):
+    """Queue raw HTML of a fetched page for the background debug writer"""
+    # Uniikki tiedostonimi aikaleimalla, jotta ei ylikirjoiteta
+    unique_debug_file = f"{TIMESTAMP}_{os.path.splitext(debug_file)[0]}{os.path.splitext(debug_file)[1]}"
+    debug_path = os.path.join(CACHE_DIR, unique_debug_file)
+    if debug_writer.save_html(debug_path, page_source, error_class=error_class):
+        logger.info("Queued raw HTML for %s", debug_path)
+
+def fetch_page(url, markers=TABLE_PAGE_MARKERS, debug_file=None, **selenium_kwargs):
+    """Fetch page with a plain HTTP GET first and fall back to Selenium if the data markers are missing.
+
+    Returns (html, soup); soup is the html.parser tree of the marker check, None on the Selenium path.
+    """
+    html, soup = fetch_http_page(url, markers)
+    if html:
+        scrape_metrics.count('fetch_path', path='http')
+        if debug_file:
+            save_debug_html(html, debug_file)
+        return html, soup
+    scrape_metrics.count('fetch_path', path='selenium')
+    return fetch_with_selenium(url, debug_file=debug_file, **selenium_kwargs), None
+
+def selector_to_css(selector, wait_type):
+    """Convert a (selector, wait_type) pair of fetch_with_selenium into a CSS selector"""
+    if wait_type.upper() == "CLASS_NAME":
+        return f".{selector}"
+    if wait_type.upper() == "CSS_SELECTOR":
+        return selector
+    return f"#{selector}"
+
 def fetch_with_selenium(url, wait_for_selector=None, wait_type="CLASS_NAME", debug_file=None, attempts=3, wait_time=25):
     """Fetch page using Selenium with multiple retry attempts and flexible wait condition"""
     driver = None
+    limiter = get_rate_limiter() # Sama rajoitin kuin HTTP-haulla
     for attempt in range(1, attempts + 1):
+        failed = False
+        if attempt > 1:
+            scrape_metrics.count('retries')
         try:
-            driver = setup_driver()
+            with scrape_metrics.timer('driver_startup_seconds'):
+                driver = setup_driver()
             if not driver:
-                logger.error(f"Driver setup failed on attempt {attempt} for {url}")
-                if attempt < attempts: time.sleep(5); continue
+                logger.error("Driver setup failed on attempt %s for %s", attempt, url)
+                if attempt < attempts: limiter.backoff(attempt); continue
                 else: return None
 
-            logger.info(f"Fetching with Selenium (attempt {attempt}/{attempts}): {url}")
+            logger.info("Fetching with Selenium (attempt %s/%s): %s", attempt, attempts, url)
+            limiter.acquire()
+            load_start = time.monotonic()
             driver.get(url)
-            
-            time.sleep(3) # Lyhyt alkuodotus
-            
+            limiter.record(time.monotonic() - load_start, ok=True)
+            scrape_metrics.observe('navigation_seconds', time.monotonic() - load_start)
+
+            ready_selectors = []
             if wait_for_selector:
                 try:
-                    logger.info(f"Waiting for element with {wait_type} '{wait_for_selector}' (max {wait_time}s)")
+                    logger.info("Waiting for element with %s '%s' (max %ss)", wait_type, wait_for_selector, wait_time)
+                    wait_start = time.monotonic()
                     if wait_type.upper() == "CLASS_NAME":
                         WebDriverWait(driver, wait_time).until(
                             EC.presence_of_element_located((By.CLASS_NAME, wait_for_selector))
@@ -153,46 +210,61 @@ def fetch_with_selenium(url, wait_for_selector=None, wait_type="CLASS_NAME", deb
                          WebDriverWait(driver, wait_time).until(
                             EC.presence_of_element_located((By.ID, wait_for_selector))
                         )
-                    logger.info(f"Found element '{wait_for_selector}'")
+                    scrape_metrics.observe('element_wait_seconds', time.monotonic() - wait_start)
+                    logger.info("Found element '%s'", wait_for_selector)
+                    ready_selectors = [selector_to_css(wait_for_selector, wait_type)]
                 except TimeoutException:
-                    logger.warning(f"Timed out waiting for '{wait_for_selector}' at {url}, continuing anyway...")
+                    scrape_metrics.count('timeouts', stage='element_wait')
+                    logger.warning("Timed out waiting for '%s' at %s, continuing anyway...", wait_for_selector, url)
             
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            # Vierityksen laukaisema lataus: odotetaan DOMin rauhoittumista kiinteiden sleepien sijaan
+            waited, ready = wait_until_ready(driver, ready_selectors, baseline=POST_LOAD_SLEEP)
+            scrape_metrics.observe('readiness_seconds', waited)
+            if not ready:
+                scrape_metrics.count('timeouts', stage='readiness')
             
             page_source = driver.page_source
+            scrape_metrics.observe('page_source_bytes', len(page_source.encode('utf-8')) if page_source else 0)
+            if RESOURCE_BLOCKING:
+                blocking_report.collect(driver, url)
             
+            short_page = not page_source or len(page_source) < 1000 # Tarkistus, onko sivu validi
             if debug_file:
-                # Uniikki tiedostonimi aikaleimalla, jotta ei ylikirjoiteta
-                unique_debug_file = f"{TIMESTAMP}_{os.path.splitext(debug_file)[0]}{os.path.splitext(debug_file)[1]}"
-                debug_path = os.path.join(CACHE_DIR, unique_debug_file)
-                try:
-                    with open(debug_path, 'w', encoding='utf-8') as f:
-                        f.write(page_source if page_source else "<!-- Page source was empty -->")
-                    logger.info(f"Saved raw HTML to {debug_path}")
-                except Exception as e:
-                    logger.error(f"Error saving debug HTML to {debug_path}: {e}")
-
-            if not page_source or len(page_source) < 1000: # Tarkistus, onko sivu validi
-                logger.warning(f"Page {url} may not have loaded correctly (size: {len(page_source) if page_source else 0} bytes)")
-                if attempt < attempts: time.sleep(5); continue # Yritä uudelleen
+                save_debug_html(page_source, debug_file, error_class="short_page" if short_page else None)
+
+            if short_page:
+                scrape_metrics.count('short_pages')
+                logger.warning("Page %s may not have loaded correctly (size: %s bytes)", url, len(page_source) if page_source else 0)
+                failed = True
+                if attempt < attempts: continue # Yritä uudelleen (odotus finally-lohkossa)
                 else: return None # Kaikki yritykset epäonnistuivat
             
             return page_source
         except WebDriverException as e: # Käsittele erikseen WebDriver-spesifit virheet
-             logger.error(f"WebDriverException on attempt {attempt} for {url}: {e}")
+             logger.error("WebDriverException on attempt %s for %s: %s", attempt, url, e)
+             limiter.record(ok=False)
+             scrape_metrics.count('timeouts' if isinstance(e, TimeoutException) else 'fetch_errors',
+                                  stage='navigation' if driver else 'driver_startup')
              if "net::ERR_NAME_NOT_RESOLVED" in str(e) or "net::ERR_CONNECTION_REFUSED" in str(e):
-                 logger.error(f"Network error for {url}. Stopping retries for this URL.")
+                 logger.error("Network error for %s. Stopping retries for this URL.", url)
+                 scrape_metrics.count('fetch_failed')
                  return None # Ei yritetä uudelleen verkkovirheissä
+             failed = True
         except Exception as e:
-            logger.error(f"General error on Selenium attempt {attempt} for {url}: {e}", exc_info=True)
+            logger.error("General error on Selenium attempt %s for %s: %s", attempt, url, e, exc_info=True)
+            scrape_metrics.count('fetch_errors', stage='unexpected')
+            failed = True
         finally:
             if driver:
                 driver.quit()
-            if attempt < attempts: # Jos ei ollut viimeinen yritys ja virhe tapahtui
-                time.sleep(5 + attempt * 2) # Kasvava odotus
+                profile_slots.release_driver(driver)
+                driver = None
+            if failed and attempt < attempts: # Jos ei ollut viimeinen yritys ja virhe tapahtui
+                limiter.backoff(attempt) # Satunnaistettu kasvava odotus
 
-    logger.error(f"All {attempts} attempts to fetch {url} failed.")
+    logger.error("All %s attempts to fetch %s failed.", attempts, url)
+    scrape_metrics.count('fetch_failed')
     return None
 
 def fetch_league_table():
@@ -202,7 +274,7 @@ def fetch_league_table():
     if cached_data:
         return cached_data
     
-    html = fetch_with_selenium(
+    html, soup = fetch_page(
         LEAGUE_URL, 
         wait_for_selector='spl-table', # Odotetaan tätä luokkaa
         wait_type="CLASS_NAME",
@@ -218,7 +290,9 @@ def fetch_league_table():
     # Tallennetaan aina tuorein haettu HTML debuggausta varten
     # (fetch_with_selenium hoitaa tämän jo, jos debug_file on annettu)
 
-    soup = BeautifulSoup(html, 'html.parser')
+    parse_start = time.monotonic()
+    if soup is None: # Seleniumin sivu; HTTP-haun puu on jo rakennettu merkkitarkistuksessa
+        soup = BeautifulSoup(html, 'html.parser')
     teams = []
     
     # Yritetään löytää taulukko, jolla on luokka 'spl-table'
@@ -238,7 +312,7 @@ def fetch_league_table():
     # Oletetaan, että ensimmäinen rivi on otsikkorivi ja se ohitetaan
     rows = table.select('tr') 
     if not rows or len(rows) < 2 : # Tarvitaan vähintään otsikko ja yksi datarivi
-        logger.warning(f"Table at {LEAGUE_URL} has too few rows ({len(rows)}). Cannot extract standings.")
+        logger.warning("Table at %s has too few rows (%s). Cannot extract standings.", LEAGUE_URL, len(rows))
         return []
 
     start_row_index = 0
@@ -253,7 +327,7 @@ def fetch_league_table():
     for idx, row in enumerate(rows[start_row_index:]): # Aloita datan parsiminen otsikkorivin jälkeen (tai alusta)
         cols = row.select('td')
         if len(cols) < 3: # Oletetaan vähintään Sija, Joukkue, Pisteet
-            logger.warning(f"Skipping row {idx+start_row_index} in league table: not enough columns (found {len(cols)}). Row content: {row.get_text('|', strip=True)}")
+            logger.warning("Skipping row %s in league table: not enough columns (found %s). Row content: %s", idx+start_row_index, len(cols), row.get_text('|', strip=True))
             continue
         
         try:
@@ -270,14 +344,14 @@ def fetch_league_table():
                 else: # Jos kummastakaan ei löytynyt numeroa, käytä indeksiä
                     position = idx + 1 # Käytä rivin indeksiä (0-pohjainen) + 1 sijoituksena
                     team_name_col_index = 1 # Oleta joukkueen nimi olevan sarakkeessa 1
-                    logger.info(f"Could not parse position for row {idx+start_row_index}, using index {position}. Text: '{position_text}'")
+                    logger.info("Could not parse position for row %s, using index %s. Text: '%s'", idx+start_row_index, position, position_text)
 
             else: # Jos ekasta sarakkeesta löytyi numero
                 position = int(position_match.group(0))
                 team_name_col_index = 1 # Oleta joukkueen nimi olevan sarakkeessa 1
 
             if team_name_col_index >= len(cols):
-                logger.warning(f"Team name column index {team_name_col_index} is out of bounds for row {idx+start_row_index}. Skipping.")
+                logger.warning("Team name column index %s is out of bounds for row %s. Skipping.", team_name_col_index, idx+start_row_index)
                 continue
             
             team_name = cols[team_name_col_index].get_text(strip=True)
@@ -286,7 +360,7 @@ def fetch_league_table():
             team_name = re.sub(r'\s*\(.*?\)\s*$', '', team_name).strip()
 
             if not team_name: # Jos joukkueen nimi on tyhjä, ohita rivi
-                logger.warning(f"Empty team name for row {idx+start_row_index} at position {position}. Skipping.")
+                logger.warning("Empty team name for row %s at position %s. Skipping.", idx+start_row_index, position)
                 continue
 
             teams.append({
@@ -294,15 +368,17 @@ def fetch_league_table():
                 'name': team_name, 
                 'source': 'web' # Merkitään, että data on haettu webistä
             })
-            logger.info(f"Extracted team: Pos: {position}, Name: {team_name}")
+            logger.info("Extracted team: Pos: %s, Name: %s", position, team_name)
 
         except Exception as e:
-            logger.warning(f"Error parsing row {idx+start_row_index} in league table: {e}. Row: {row.get_text('|', strip=True)}")
+            logger.warning("Error parsing row %s in league table: %s. Row: %s", idx+start_row_index, e, row.get_text('|', strip=True))
 
+    scrape_metrics.observe('parse_seconds', time.monotonic() - parse_start)
+    scrape_metrics.count('result_status', page='league_table', status='success' if teams else 'empty')
     if teams:
         teams = sorted(teams, key=lambda x: x['position']) # Järjestä sijoituksen mukaan
         save_cache(teams, cache_filename)
-        logger.info(f"Successfully extracted and cached {len(teams)} teams from league table.")
+        logger.info("Successfully extracted and cached %s teams from league table.", len(teams))
     else:
         logger.warning("No teams extracted from league table. Check HTML structure and selectors.")
         # Palauta tyhjä lista, jos mitään ei löytynyt
@@ -317,8 +393,9 @@ def fetch_player_stats_category(stats_url, category_name, debug_file_suffix):
     if cached_data:
         return cached_data
 
-    html = fetch_with_selenium(
+    html, soup = fetch_page(
         stats_url,
+        markers=PLAYER_STATS_MARKERS, # Yleinen taulukkomerkki hyväksyisi minkä tahansa sivun taulukon
         wait_for_selector='spl-table', # Odotetaan tätä luokkaa
         wait_type="CLASS_NAME",
         debug_file=f'player_stats_{debug_file_suffix}_raw.html',
@@ -326,32 +403,34 @@ def fetch_player_stats_category(stats_url, category_name, debug_file_suffix):
     )
 
     if not html:
-        logger.error(f"Failed to fetch HTML for {category_name} from {stats_url}")
+        logger.error("Failed to fetch HTML for %s from %s", category_name, stats_url)
         return []
 
-    soup = BeautifulSoup(html, 'html.parser')
+    parse_start = time.monotonic()
+    if soup is None:
+        soup = BeautifulSoup(html, 'html.parser')
     players = []
     table = soup.select_one('table.spl-table')
 
     if not table:
-        logger.warning(f"Player stats table ('table.spl-table') not found for {category_name} at {stats_url}")
+        logger.warning("Player stats table ('table.spl-table') not found for %s at %s", category_name, stats_url)
         return []
 
     rows = table.select('tr')
     if not rows or len(rows) < 2:
-        logger.warning(f"Stats table for {category_name} has too few rows ({len(rows)}).")
+        logger.warning("Stats table for %s has too few rows (%s).", category_name, len(rows))
         return []
     
     start_row_index = 0
     if rows[0].find('th'): # Tarkista onko header
         start_row_index = 1
-        logger.info(f"Skipping header row in {category_name} table.")
+        logger.info("Skipping header row in %s table.", category_name)
 
     # Yritetään dynaamisesti päätellä sarakkeiden indeksit otsikoiden perusteella
     name_idx, team_idx, stat_value_idx = -1, -1, -1
     if start_row_index == 1: # Jos header löytyi
         headers = [th.get_text(strip=True).lower() for th in rows[0].select('th, td')]
-        logger.info(f"Headers for {category_name}: {headers}")
+        logger.info("Headers for %s: %s", category_name, headers)
         try: name_idx = headers.index('pelaaja') # Oletus 'pelaaja'
         except ValueError: 
             try: name_idx = headers.index('nimi') # Fallback 'nimi'
@@ -378,18 +457,18 @@ def fetch_player_stats_category(stats_url, category_name, debug_file_suffix):
             stat_value_idx = 3 if len(headers) > 3 else len(headers) -1
 
 
-        logger.info(f"Determined column indices for {category_name}: Name={name_idx}, Team={team_idx}, StatValue={stat_value_idx}")
+        logger.info("Determined column indices for %s: Name=%s, Team=%s, StatValue=%s", category_name, name_idx, team_idx, stat_value_idx)
 
 
     else: # Jos ei headeria, käytä oletusindeksejä
         name_idx, team_idx, stat_value_idx = 1, 2, 3 # Oletus: Pelaaja, Joukkue, Maalit/Syötöt
-        logger.info(f"No header row found for {category_name}, using default indices: Name={name_idx}, Team={team_idx}, StatValue={stat_value_idx}")
+        logger.info("No header row found for %s, using default indices: Name=%s, Team=%s, StatValue=%s", category_name, name_idx, team_idx, stat_value_idx)
 
 
     for idx, row in enumerate(rows[start_row_index:]):
         cols = row.select('td')
         if len(cols) <= max(name_idx, team_idx, stat_value_idx): # Varmista, että kaikki tarvittavat sarakkeet ovat olemassa
-            logger.warning(f"Skipping row in {category_name} table: not enough columns (need up to {max(name_idx, team_idx, stat_value_idx)}, found {len(cols)}). Row: {row.get_text('|', strip=True)}")
+            logger.warning("Skipping row in %s table: not enough columns (need up to %s, found %s). Row: %s", category_name, max(name_idx, team_idx, stat_value_idx), len(cols), row.get_text('|', strip=True))
             continue
 
         try:
@@ -409,20 +488,22 @@ def fetch_player_stats_category(stats_url, category_name, debug_file_suffix):
                     'source': 'web'
                 })
             else:
-                logger.warning(f"Skipping player in {category_name}: empty name or team. Row: {row.get_text('|', strip=True)}")
+                logger.warning("Skipping player in %s: empty name or team. Row: %s", category_name, row.get_text('|', strip=True))
 
         except IndexError:
-            logger.warning(f"IndexError parsing row in {category_name} table (cols: {len(cols)}, needed: {name_idx}, {team_idx}, {stat_value_idx}). Row: {row.get_text('|', strip=True)}")
+            logger.warning("IndexError parsing row in %s table (cols: %s, needed: %s, %s, %s). Row: %s", category_name, len(cols), name_idx, team_idx, stat_value_idx, row.get_text('|', strip=True))
         except ValueError:
-            logger.warning(f"ValueError parsing stat value '{stat_text}' for player {name} in {category_name}. Setting to 0. Row: {row.get_text('|', strip=True)}")
+            logger.warning("ValueError parsing stat value '%s' for player %s in %s. Setting to 0. Row: %s", stat_text, name, category_name, row.get_text('|', strip=True))
         except Exception as e:
-            logger.warning(f"Error parsing player row in {category_name} table: {e}. Row: {row.get_text('|', strip=True)}")
+            logger.warning("Error parsing player row in %s table: %s. Row: %s", category_name, e, row.get_text('|', strip=True))
 
+    scrape_metrics.observe('parse_seconds', time.monotonic() - parse_start)
+    scrape_metrics.count('result_status', page=f'player_stats_{category_name}', status='success' if players else 'empty')
     if players:
         save_cache(players, cache_filename)
-        logger.info(f"Successfully extracted and cached {len(players)} players for {category_name}.")
+        logger.info("Successfully extracted and cached %s players for %s.", len(players), category_name)
     else:
-        logger.warning(f"No players extracted for {category_name}. Check HTML structure and selectors at {stats_url}")
+        logger.warning("No players extracted for %s. Check HTML structure and selectors at %s", category_name, stats_url)
     
     return players
 
@@ -461,7 +542,7 @@ def fetch_all_player_stats():
     all_players = merge_player_stats(goals_stats, assists_stats)
     
     if all_players:
-        logger.info(f"Successfully merged player stats. Total unique players: {len(all_players)}")
+        logger.info("Successfully merged player stats. Total unique players: %s", len(all_players))
     else:
         logger.warning("Merged player stats list is empty.")
         
@@ -471,7 +552,7 @@ def fetch_all_player_stats():
 def parse_predictions(filename):
     """Parse prediction files with better error handling and format flexibility"""
     if not os.path.exists(filename):
-        logger.warning(f"Prediction file not found: {filename}")
+        logger.warning("Prediction file not found: %s", filename)
         return {'teams': [], 'players': [], 'promotion': '', 'playoff': ''} # Palauta tyhjä rakenne
     
     try:
@@ -512,7 +593,7 @@ def parse_predictions(filename):
                         goals = int(goals_str)
                         players.append({'name': name, 'goals': goals})
                     except ValueError:
-                        logger.warning(f"Could not parse goals '{goals_str}' for player '{name}' in {filename}")
+                        logger.warning("Could not parse goals '%s' for player '%s' in %s", goals_str, name, filename)
 
         # Jos pelaajia ei löydy yllä olevilla kaavoilla, kokeillaan muita formaatteja
         if not players:
@@ -536,7 +617,7 @@ def parse_predictions(filename):
                     if name and not name.startswith('#'):
                         players.append({'name': name})
         
-        logger.info(f"Parsed predictions from {filename}: {len(teams)} teams, {len(players)} players")
+        logger.info("Parsed predictions from %s: %s teams, %s players", filename, len(teams), len(players))
         
         promotion = teams[0] if teams else ''
         playoff = teams[1] if len(teams) > 1 else '' # Toiseksi sijoittunut playoffiin
@@ -548,7 +629,7 @@ def parse_predictions(filename):
             'playoff': playoff
         }
     except Exception as e:
-        logger.error(f"Error parsing predictions from {filename}: {e}", exc_info=True)
+        logger.error("Error parsing predictions from %s: %s", filename, e, exc_info=True)
         return {'teams': [], 'players': [], 'promotion': '', 'playoff': ''} # Palauta tyhjä rakenne virhetilanteessa
 
 def normalize(text):
@@ -571,20 +652,20 @@ def find_matching_item(name_to_find, item_list, key_in_item='name'):
     # 1. Tarkka normalisoitu osuma
     for item in item_list:
         if normalize(item.get(key_in_item, '')) == norm_name_to_find:
-            logger.debug(f"Exact match found for '{name_to_find}' -> '{item.get(key_in_item)}'")
+            logger.debug("Exact match found for '%s' -> '%s'", name_to_find, item.get(key_in_item))
             return item
     
     # 2. Osittainen osuma (normalisoitu nimi sisältyy kohteen normalisoituun nimeen)
     for item in item_list:
         if norm_name_to_find in normalize(item.get(key_in_item, '')):
-            logger.debug(f"Substring match found for '{name_to_find}' in '{item.get(key_in_item)}'")
+            logger.debug("Substring match found for '%s' in '%s'", name_to_find, item.get(key_in_item))
             return item
 
     # 3. Osittainen osuma (kohteen normalisoitu nimi sisältyy etsittävään normalisoituun nimeen)
     for item in item_list:
         item_norm_name = normalize(item.get(key_in_item, ''))
         if item_norm_name and item_norm_name in norm_name_to_find : # Varmista ettei item_norm_name ole tyhjä
-            logger.debug(f"Substring match (reversed) found for '{item.get(key_in_item)}' in '{name_to_find}'")
+            logger.debug("Substring match (reversed) found for '%s' in '%s'", item.get(key_in_item), name_to_find)
             return item
 
     # 4. Sumea osuma: vähintään etu- ja sukunimi täsmäävät (jos nimessä osia)
@@ -595,10 +676,10 @@ def find_matching_item(name_to_find, item_list, key_in_item='name'):
         for item in item_list:
             item_norm = normalize(item.get(key_in_item, ''))
             if first_part in item_norm and last_part in item_norm:
-                logger.debug(f"Fuzzy (first/last) match for '{name_to_find}' with '{item.get(key_in_item)}'")
+                logger.debug("Fuzzy (first/last) match for '%s' with '%s'", name_to_find, item.get(key_in_item))
                 return item
     
-    logger.debug(f"No match found for '{name_to_find}'")
+    logger.debug("No match found for '%s'", name_to_find)
     return None
 
 
@@ -624,7 +705,7 @@ def calculate_points(actual_table, actual_players, predictions):
                     points += team_points
                     breakdown.append(f"{team_points}p: Oikea sija {actual_team_pos}. ({actual_team_name})")
             else:
-                logger.warning(f"calculate_points: Predicted team '{pred_team_name}' not found in actual league table.")
+                logger.warning("calculate_points: Predicted team '%s' not found in actual league table.", pred_team_name)
 
 
     # Pelaajatilastot: 2p per maali, 1p per syöttö veikkatuille pelaajille
@@ -662,7 +743,7 @@ def calculate_points(actual_table, actual_players, predictions):
             points += playoff_points
             breakdown.append(f"{playoff_points}p: Oikea karsija ({predictions['playoff']})")
             
-    logger.info(f"Calculated total points: {points} with {len(breakdown)} scoring events. Breakdown: {'; '.join(breakdown)}")
+    logger.info("Calculated total points: %s with %s scoring events. Breakdown: %s", points, len(breakdown), '; '.join(breakdown))
     return {'points': points, 'breakdown': breakdown}
 
 def generate_report():
@@ -683,14 +764,14 @@ def generate_report():
     # Luo tyhjät ennustetiedostot, jos niitä ei ole, jotta skripti ei kaadu
     for pred_file_path in prediction_files.values():
         if not os.path.exists(pred_file_path):
-            logger.warning(f"Prediction file {pred_file_path} not found. Creating an empty template.")
+            logger.warning("Prediction file %s not found. Creating an empty template.", pred_file_path)
             try:
                 with open(pred_file_path, 'w', encoding='utf-8') as f:
                     f.write(f"# Ennusteet tiedostolle {os.path.basename(pred_file_path)}\n\n")
                     f.write("## Sarjataulukko\n1. Joukkue A\n2. Joukkue B\n3. Joukkue C\n\n")
                     f.write("## Maalintekijäveikkaus (top 1)\n- Pelaaja X (maalimäärä ei vaikuta pisteisiin)\n")
             except Exception as e:
-                logger.error(f"Could not create template prediction file {pred_file_path}: {e}")
+                logger.error("Could not create template prediction file %s: %s", pred_file_path, e)
 
     predictions_by_user = {name: parse_predictions(file) for name, file in prediction_files.items()}
     
@@ -773,7 +854,17 @@ if __name__ == '__main__':
         output_md_file = 'Veikkaustilanne.md'
         with open(output_md_file, 'w', encoding='utf-8') as f:
             f.write(report_output)
-        logger.info(f"✅ {output_md_file} päivitetty onnistuneesti!")
+        logger.info("✅ %s päivitetty onnistuneesti!", output_md_file)
+        if readiness_stats.pages:
+            logger.info("Page readiness: %s", readiness_stats.summary())
+        if blocking_report.pages:
+            logger.info("Resource blocking: %s", blocking_report.summary())
         
     except Exception as e:
-        logger.error(f"❌ Virhe ohjelman suorituksessa (fetch_and_calculate.py): {e}", exc_info=True)
+        logger.error("❌ Virhe ohjelman suorituksessa (fetch_and_calculate.py): %s", e, exc_info=True)
+    finally:
+        # Virhetilanteessa jonossa on juuri ne debug-dumpit, joita tarvitaan: kirjoitetaan ne ennen lopetusta
+        debug_writer.close()
+        for line in scrape_metrics.summary_lines():
+            logger.info("Metrics: %s", line)
+        scrape_metrics.write("fetch_and_calculate")
@@ -0,0 +1,157 @@
+import time
+import logging
+import threading
+import collections
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from rate_limiter import get_rate_limiter
+from scrape_metrics import scrape_metrics
+
+# -------------------------------------------------------
+# HTTP-first haku: tavallinen GET yhteisellä yhteyspoolilla.
+# Selenium on vain hidas varapolku sivuille, joiden data syntyy vasta JS:llä.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+HTTP_TIMEOUT = 15 # sekuntia, selvästi lyhyempi kuin Seleniumin 45-60 s
+POOL_SIZE = 16 # Riittää myös rinnakkaisille workereille
+
+# Merkit, joiden perusteella HTML kelpaa jäsennettäväksi ilman selainta: (CSS-selektori, vähimmäismäärä)
+MATCH_PAGE_MARKERS = [("div.widget-match", 1)]
+TABLE_PAGE_MARKERS = [("table tr", 2)] # Otsikkorivi + vähintään yksi datarivi
+# Pelaajatilastosivuilla on muitakin taulukoita; vain spl-table kertoo, että tilastot ovat HTML:ssä
+PLAYER_STATS_MARKERS = [("table.spl-table tr", 2)]
+
+RETRY_STATUSES = (429, 500, 502, 503, 504) # Palvelimen kuormitus -> nopeusrajoitin hidastaa
+
+# JS:llä renderöidyllä sivustolla staattisesta HTML:stä ei juuri koskaan löydy merkkejä, jolloin jokainen HTTP-yritys
+# maksaisi nopeusrajoittimen tokenin ennen Seleniumia. Kun (isäntä, merkit) -parin viimeisimmistä vastauksista
+# valtaosa on ollut ilman merkkejä, HTTP-yritys ohitetaan ja vain joka HTTP_REPROBE_EVERY. kutsu kokeilee uudelleen.
+HTTP_MISS_WINDOW = 20 # Viimeisimmät 200-vastaukset, joista osuus lasketaan
+HTTP_MISS_MIN_SAMPLES = 10
+HTTP_MISS_SKIP_RATE = 0.9
+HTTP_REPROBE_EVERY = 25
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class MarkerMissTracker:
+    """Per (host, markers) outcome of recent HTTP fetches; tells when the HTTP attempt is not worth a token."""
+
+    def __init__(self, window=HTTP_MISS_WINDOW, min_samples=HTTP_MISS_MIN_SAMPLES, skip_rate=HTTP_MISS_SKIP_RATE,
+                 reprobe_every=HTTP_REPROBE_EVERY):
+        self.window = window
+        self.min_samples = min_samples
+        self.skip_rate = skip_rate
+        self.reprobe_every = max(1, reprobe_every)
+        self._lock = threading.Lock()
+        self._outcomes = {} # (isäntä, merkit) -> deque(True = merkit löytyivät)
+        self._skipped = collections.Counter()
+
+    @staticmethod
+    def key(url, markers):
+        return urllib.parse.urlsplit(url).netloc, tuple(tuple(marker) for marker in markers)
+
+    def should_try(self, url, markers):
+        key = self.key(url, markers)
+        with self._lock:
+            outcomes = self._outcomes.get(key)
+            if not outcomes or len(outcomes) < self.min_samples:
+                return True
+            if outcomes.count(False) / len(outcomes) < self.skip_rate:
+                return True
+            self._skipped[key] += 1
+            return self._skipped[key] % self.reprobe_every == 0 # Harvakseltaan uusi yritys, jos sivusto muuttuu
+
+    def record(self, url, markers, found):
+        key = self.key(url, markers)
+        with self._lock:
+            self._outcomes.setdefault(key, collections.deque(maxlen=self.window)).append(found)
+
+
+marker_misses = MarkerMissTracker()
+
+
+def get_session():
+    """Return the process-wide pooled requests.Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "fi-FI,fi;q=0.9",
+            })
+            _session = session
+        return _session
+
+
+def has_markers(page, markers):
+    """Check that page (HTML or an already parsed soup) contains every (selector, min_count) marker"""
+    if not page:
+        return False
+    soup = BeautifulSoup(page, 'html.parser') if isinstance(page, str) else page
+    for selector, min_count in markers:
+        found = soup.select(selector, limit=min_count)
+        if len(found) < min_count:
+            logger.debug("HTTP-vastauksesta puuttuu merkki '%s' (löytyi %s/%s)", selector, len(found), min_count)
+            return False
+    return True
+
+
+def fetch_http(url, markers, timeout=HTTP_TIMEOUT, limiter=None):
+    """Fetch url with a plain GET; return the HTML only if it contains all markers, else None"""
+    return fetch_http_page(url, markers, timeout=timeout, limiter=limiter)[0]
+
+
+def fetch_http_page(url, markers, make_soup=None, timeout=HTTP_TIMEOUT, limiter=None):
+    """Like fetch_http but return (html, soup); the marker check runs on make_soup's tree, so the caller parses once"""
+    make_soup = make_soup or (lambda html: BeautifulSoup(html, 'html.parser'))
+    if not marker_misses.should_try(url, markers):
+        scrape_metrics.count('http_skipped')
+        logger.debug("HTTP-haku ohitetaan (%s): staattisesta HTML:stä puuttuvat merkit lähes aina.", url)
+        return None, None
+    limiter = limiter or get_rate_limiter()
+    limiter.acquire()
+    start = time.monotonic()
+    try:
+        response = get_session().get(url, timeout=timeout)
+    except requests.RequestException as e:
+        limiter.record(time.monotonic() - start, ok=False)
+        scrape_metrics.observe('http_fetch_seconds', time.monotonic() - start)
+        scrape_metrics.count('http_status', status=type(e).__name__) # Ei vastausta: tilana poikkeuksen nimi
+        logger.info("HTTP-haku epäonnistui (%s): %s - %s. Käytetään Seleniumia.", url, type(e).__name__, e)
+        return None, None
+    limiter.record(time.monotonic() - start, ok=response.status_code not in RETRY_STATUSES)
+    scrape_metrics.observe('http_fetch_seconds', time.monotonic() - start)
+    scrape_metrics.count('http_status', status=response.status_code)
+
+    if response.status_code != 200:
+        logger.info("HTTP-haku palautti tilan %s (%s). Käytetään Seleniumia.", response.status_code, url)
+        return None, None
+
+    if response.encoding is None or response.encoding.lower() == 'iso-8859-1':
+        response.encoding = response.apparent_encoding or 'utf-8' # Palvelin ei aina kerro merkistöä
+    html = response.text
+    scrape_metrics.observe('page_source_bytes', len(response.content))
+    soup = make_soup(html) if html else None
+    found = has_markers(soup, markers)
+    marker_misses.record(url, markers, found)
+    if not found:
+        scrape_metrics.count('http_missing_markers')
+        logger.info("HTTP-vastaus (%s merkkiä) ei sisällä tarvittavaa dataa (%s). Käytetään Seleniumia.", len(html), url)
+        return None, None
+
+    logger.info("Sivu haettu suoraan HTTP:llä (%s merkkiä): %s", len(html), url)
+    return html, soup
@@ -0,0 +1,68 @@
+import json
+import logging
+import datetime
+import threading
+
+# -------------------------------------------------------
+# Käynnissä olevien otteluiden seuranta: live-haussa jäsennetään vain muuttuvat kentät
+# (tulos, tila, tilastot, maalit ja kortit), verrataan niitä tallessa olevaan tietueeseen
+# ja kirjataan erot tiiviinä muutostapahtumina live_events.jsonl-tiedostoon.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+LIVE_EVENTS_FILE = "live_events.jsonl"
+LIVE_FIELDS = ('score', 'score_halftime', 'match_status_raw', 'stats', 'events_from_list')
+LIVE_INTERVAL = 60 # sekuntia kahden seurantakierroksen välillä
+LIVE_DURATION = 3 * 3600 # Live-tilan enimmäiskesto yhdellä ajolla
+LIVE_LOOKAHEAD = 2 * 3600 # Odotetaan alkavia otteluita, jos aloitus on tämän ajan sisällä
+
+EVENT_TYPES = {'goals': 'goal', 'yellow_cards': 'yellow_card', 'red_cards': 'red_card'}
+
+
+def _event_key(event):
+    return (event.get('player'), event.get('time'))
+
+
+def diff_live_fields(old, new):
+    """Return compact change events between the live fields of two records"""
+    old = old or {}
+    changes = []
+    for field in ('score', 'score_halftime', 'match_status_raw'):
+        if new.get(field) != old.get(field):
+            changes.append({'type': field, 'from': old.get(field), 'to': new.get(field)})
+
+    old_events = old.get('events_from_list') or {}
+    for team in ('home', 'away'):
+        old_team, new_team = old_events.get(team) or {}, (new.get('events_from_list') or {}).get(team) or {}
+        for kind, event_type in EVENT_TYPES.items():
+            seen = {_event_key(event) for event in old_team.get(kind) or []}
+            for event in new_team.get(kind) or []:
+                if _event_key(event) not in seen:
+                    changes.append({'type': event_type, 'team': team, 'player': event.get('player'), 'time': event.get('time')})
+            current = {_event_key(event) for event in new_team.get(kind) or []}
+            for player, time_str in seen - current: # Esim. hylätty maali tai korjattu merkintä
+                changes.append({'type': f"{event_type}_removed", 'team': team, 'player': player, 'time': time_str})
+
+    old_stats, new_stats = old.get('stats') or {}, new.get('stats') or {}
+    for name, values in new_stats.items():
+        if old_stats.get(name) != values:
+            changes.append({'type': 'stat', 'name': name, 'home': values.get('home'), 'away': values.get('away')})
+    return changes
+
+
+class LiveEventLog:
+    """Append-only JSONL log of live change events."""
+
+    def __init__(self, path=LIVE_EVENTS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, match_id, changes, timestamp=None):
+        if not changes:
+            return
+        timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        line = json.dumps({'match_id': match_id, 'ts': timestamp, 'changes': changes}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
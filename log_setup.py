@@ -0,0 +1,103 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# -------------------------------------------------------
+# Skrapereiden yhteinen lokitus: workerit vain lisäävät tietueen jonoon, ja
+# taustasäie (QueueListener) muotoilee ja kirjoittaa sen. Levy-I/O ja merkkijonojen
+# muotoilu eivät siis hidasta hakua, vaikka workereita olisi useita.
+# - Lokitiedosto kierrätetään kokorajalla (RotatingFileHandler), ettei commitoitava loki kasva loputtomasti
+# - SCRAPER_LOG_FORMAT=json kirjoittaa yhden JSON-objektin riviä kohden
+# - Kutsupaikoilla käytetään %-muotoilua, jolloin pois päältä olevat debug-rivit eivät maksa mitään
+# -------------------------------------------------------
+
+LOG_FORMAT = os.environ.get("SCRAPER_LOG_FORMAT", "text") # 'text' tai 'json'
+LOG_LEVEL = os.environ.get("SCRAPER_LOG_LEVEL", "INFO")
+LOG_MAX_BYTES = 1024 * 1024 # Kierrätysraja; vanhin varmuuskopio poistuu
+LOG_BACKUPS = 2
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per log record."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() formats the message on the calling thread so the record can be pickled;
+    our queue never leaves the process, so the record is passed on as is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def make_formatter(log_format=LOG_FORMAT):
+    return JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(log_file, log_format=LOG_FORMAT, level=LOG_LEVEL, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUPS):
+    """Route the root logger through a queue to a rotating file and the console; safe to call again"""
+    global _listener
+    stop_logging()
+    formatter = make_formatter(log_format)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def setup_worker_logging(level=logging.WARNING, log_format=LOG_FORMAT):
+    """Console-only logging for pool child processes; they must not rotate the parent's log file"""
+    stop_logging() # Spawn-lapsi on käynnistänyt oman listenerin; forkatulla lapsella säie ei ole elossa
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(make_formatter(log_format))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+atexit.register(stop_logging)
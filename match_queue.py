@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import logging
+import datetime
+from zoneinfo import ZoneInfo
+
+from match_store import truncate_torn_tail, append_durable
+
+# -------------------------------------------------------
+# Ottelu-ID:iden työjono: jokaisella ID:llä on tila ja seuraava hakuaika.
+# - päättyneitä otteluita ei haeta uudelleen
+# - alkamattomat tulevat hakuun aloitusajan kohdalla (match_datetime_raw)
+# - käynnissä olevia haetaan tiheästi
+# - epäonnistuneet odottavat eksponentiaalisesti kasvavan ajan
+# Uudet ID:t jaetaan frontierin (aiemmin last_match_id.txt) jälkeen, kun erääntyneet on käsitelty.
+# gallop_frontier etsii suurimman olemassa olevan ID:n, ja tyhjät ID:t jäävät jonoon
+# tilaan 'empty' (negatiivinen välimuisti), kunnes niiden uudelleentarkistusaika koittaa.
+# Jokainen tilamuutos ja jaettu uusi ID kirjataan heti fsyncattuun journaaliin (<jono>.journal),
+# joka toistetaan tilannekuvan päälle käynnistyksessä; save() kirjoittaa tilannekuvan ja tyhjentää journaalin.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = "match_queue.json"
+LOCAL_TZ = ZoneInfo("Europe/Helsinki")
+
+LIVE_POLL_INTERVAL = 5 * 60 # Käynnissä oleva ottelu haetaan uudelleen 5 min välein
+KICKOFF_RECHECK = 15 * 60 # Aloitusaika ohi, mutta ottelu ei vielä käynnissä -> tarkistetaan 15 min välein
+UNKNOWN_KICKOFF_RECHECK = 24 * 3600 # Aloitusaikaa ei saatu sivulta
+FAILURE_BACKOFF_BASE = 10 * 60
+UNKNOWN_BACKOFF_BASE = 60 * 60
+BACKOFF_MAX = 7 * 24 * 3600
+EMPTY_RECHECK_TTL = 3 * 24 * 3600 # Tyhjäksi todettu ID tarkistetaan uudelleen 3 päivän päästä
+GALLOP_MAX_SPAN = 4096 # Kuinka kauas frontierin yli eksponentiaalinen haku enintään kurkistaa
+
+# Pienempi numero = korkeampi prioriteetti
+STATE_PRIORITY = {'live': 0, 'not_started': 1, 'new': 2, 'unknown': 3, 'failed': 4, 'empty': 5}
+
+
+def parse_kickoff(datetime_raw, now=None):
+    """Parse 'HH:MM | Viikonpäivä DD.MM.[YYYY]' into an aware datetime, or None"""
+    if not datetime_raw:
+        return None
+    time_match = re.search(r'(\d{1,2}):(\d{2})', datetime_raw)
+    date_match = re.search(r'(\d{1,2})\.(\d{1,2})\.(\d{4})?', datetime_raw)
+    if not time_match or not date_match:
+        return None
+    now = now or datetime.datetime.now(LOCAL_TZ)
+    day, month = int(date_match.group(1)), int(date_match.group(2))
+    year = int(date_match.group(3)) if date_match.group(3) else now.year
+    try:
+        kickoff = datetime.datetime(year, month, day, int(time_match.group(1)), int(time_match.group(2)), tzinfo=LOCAL_TZ)
+    except ValueError:
+        return None
+    if not date_match.group(3) and kickoff < now - datetime.timedelta(days=180):
+        kickoff = kickoff.replace(year=year + 1) # Vuodenvaihteen yli menevä ottelu ilman vuotta
+    return kickoff
+
+
+def backoff_delay(attempts, base):
+    return min(base * (2 ** max(0, attempts - 1)), BACKOFF_MAX)
+
+
+def gallop_frontier(probe, known_good, max_span=GALLOP_MAX_SPAN):
+    """Find the highest populated ID above known_good with exponential and then binary steps.
+
+    probe(match_id) -> bool tells whether the ID has a match. Returns (highest_populated, probes)
+    where probes maps every probed ID to its result, so dead IDs can go to the negative cache.
+    A single dead ID right after known_good does not stop the search, because the exponential
+    phase keeps stepping until max_span.
+    """
+    probes = {}
+
+    def check(match_id):
+        if match_id not in probes:
+            probes[match_id] = bool(probe(match_id))
+            logger.debug("Frontier-koetus ID %s: %s", match_id, 'olemassa' if probes[match_id] else 'tyhjä')
+        return probes[match_id]
+
+    # Eksponentiaalinen vaihe: known_good + 1, 2, 4, 8, ...
+    last_good, first_bad, step = known_good, None, 1
+    while step <= max_span:
+        match_id = known_good + step
+        if check(match_id):
+            last_good, first_bad = match_id, None
+        elif first_bad is None:
+            first_bad = match_id
+            if last_good > known_good:
+                break # Olemassa olevan jälkeen tyhjä: raja on näiden välissä
+        step *= 2
+
+    if first_bad is None or first_bad < last_good:
+        return last_good, probes
+
+    # Binäärivaihe: raja on välillä (last_good, first_bad)
+    low, high = last_good, first_bad
+    while high - low > 1:
+        middle = (low + high) // 2
+        if check(middle):
+            low = middle
+        else:
+            high = middle
+    return low, probes
+
+
+class MatchWorkQueue:
+    """Persistent per-ID state and next-due time for the scraper."""
+
+    def __init__(self, path=QUEUE_FILE, frontier=0):
+        self.path = path
+        self.entries = {} # match_id -> {'state', 'next_due', 'attempts'}
+        self.frontier = frontier # Suurin koskaan jonoon annettu ID
+        self.ceiling = None # Suurin tunnettu olemassa oleva ID (gallop_frontier); None = ei rajaa
+        self.journal_path = f"{path}.journal"
+        self._journal_file = None
+        self.loaded = self.load() # Kertoo vain tilannekuvasta; journaali toistetaan aina sen päälle
+        self.replay_journal()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.frontier = int(data.get('frontier', self.frontier))
+            self.entries = {int(match_id): entry for match_id, entry in data.get('entries', {}).items()}
+            logger.info("Työjono ladattu: %s ID:tä, frontier %s.", len(self.entries), self.frontier)
+            return True
+        except (json.JSONDecodeError, OSError, ValueError) as e:
+            logger.error("Työjonon %s lukeminen epäonnistui: %s. Aloitetaan tyhjästä jonosta.", self.path, e)
+            return False
+
+    def replay_journal(self):
+        """Apply journaled entries written after the last snapshot; returns True if any were applied"""
+        if not os.path.exists(self.journal_path):
+            return False
+        truncate_torn_tail(self.journal_path)
+        applied = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                    match_id = int(item.pop('match_id'))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    continue
+                self.entries[match_id] = item
+                if item.get('state') != 'empty':
+                    # Vain jaetut tai tuloksen saaneet ID:t siirtävät frontieria; frontier-haun tyhjiksi
+                    # merkitsemät koetukset voivat olla olemassa olevien, hakemattomien ID:iden yläpuolella
+                    self.frontier = max(self.frontier, match_id)
+                applied += 1
+        if applied:
+            logger.info("Työjonon journaalista toistettu %s muutosta, frontier %s.", applied, self.frontier)
+        return applied > 0
+
+    def reconcile(self, records):
+        """Settle claimed 'new' IDs whose result reached the store before the run was killed"""
+        settled = [match_id for match_id, entry in self.entries.items()
+                   if entry['state'] == 'new' and match_id in records]
+        for match_id in settled:
+            self.record_result(match_id, records[match_id])
+        if settled:
+            logger.info("Työjonoon kirjattu %s jo tallennettua tulosta edellisestä ajosta.", len(settled))
+        return len(settled)
+
+    def _journal(self, match_ids):
+        """Durably append the current entries of match_ids to the journal"""
+        if not match_ids:
+            return
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        append_durable(self._journal_file, [json.dumps({'match_id': match_id, **self.entries[match_id]}, ensure_ascii=False)
+                                            for match_id in match_ids])
+
+    def save(self):
+        data = {'frontier': self.frontier,
+                'entries': {str(match_id): self.entries[match_id] for match_id in sorted(self.entries)}}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        # Tilannekuva sisältää nyt kaiken journaalissa olleen
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def seed_from_records(self, records, now=None):
+        """Build entries for an existing archive so unfinished matches get revisited"""
+        for match_id, record in records.items():
+            self.record_result(match_id, record, now=now, journal=False)
+            self.entries[match_id]['attempts'] = 0 if self.entries[match_id]['state'] != 'failed' else 1
+        if records:
+            self.frontier = max(self.frontier, max(records))
+        self.replay_journal() # Edellisen, kesken tapetun ajon muutokset ovat tietueita uudempia
+        logger.info("Työjono alustettu %s tietueesta, frontier %s.", len(records), self.frontier)
+
+    def record_result(self, match_id, record, now=None, journal=True):
+        """Update the state and next-due time of match_id from a process_match result"""
+        now = now or time.time()
+        entry = self.entries.setdefault(match_id, {'state': 'new', 'next_due': now, 'attempts': 0})
+        status = (record or {}).get('status', '')
+
+        if status in ('success_finished', 'success_finished_partial'):
+            entry.update(state='done', next_due=None, attempts=0)
+        elif status == 'success_not_started':
+            kickoff = parse_kickoff(record.get('match_datetime_raw'))
+            if kickoff is None:
+                next_due = now + UNKNOWN_KICKOFF_RECHECK
+            else:
+                next_due = max(kickoff.timestamp(), now + KICKOFF_RECHECK)
+            entry.update(state='not_started', next_due=next_due, attempts=0)
+        elif status == 'success_live':
+            entry.update(state='live', next_due=now + LIVE_POLL_INTERVAL, attempts=0)
+        elif status.startswith('success'):
+            # Sivu on olemassa, mutta dataa vähän (esim. ottelua ei ole vielä julkaistu)
+            attempts = entry.get('attempts', 0) + 1
+            entry.update(state='unknown', next_due=now + backoff_delay(attempts, UNKNOWN_BACKOFF_BASE), attempts=attempts)
+        else:
+            attempts = entry.get('attempts', 0) + 1
+            entry.update(state='failed', next_due=now + backoff_delay(attempts, FAILURE_BACKOFF_BASE), attempts=attempts)
+        if journal:
+            self._journal([match_id])
+        return entry
+
+    def mark_empty(self, match_id, now=None):
+        """Put a dead ID in the negative cache until EMPTY_RECHECK_TTL has passed"""
+        now = now or time.time()
+        entry = self.entries.setdefault(match_id, {'state': 'empty', 'next_due': None, 'attempts': 0})
+        if entry['state'] in ('new', 'empty', 'failed', 'unknown'): # Tunnettua dataa ei ylikirjoiteta
+            entry.update(state='empty', next_due=now + EMPTY_RECHECK_TTL)
+            self._journal([match_id])
+
+    def live_ids(self, now=None):
+        """IDs to track in live mode: live matches and not-started matches whose kickoff recheck is due"""
+        now = now or time.time()
+        return sorted(match_id for match_id, entry in self.entries.items()
+                      if entry['state'] == 'live'
+                      or (entry['state'] == 'not_started' and entry.get('next_due') is not None and entry['next_due'] <= now))
+
+    def next_kickoff(self, now=None):
+        """Earliest next-due time of a not-started match in the future, or None"""
+        now = now or time.time()
+        upcoming = [entry['next_due'] for entry in self.entries.values()
+                    if entry['state'] == 'not_started' and entry.get('next_due') is not None and entry['next_due'] > now]
+        return min(upcoming) if upcoming else None
+
+    def due_ids(self, budget, now=None):
+        """Return up to budget IDs to fetch now: due known IDs by priority, then new IDs past the frontier"""
+        now = now or time.time()
+        due = [(STATE_PRIORITY.get(entry['state'], 9), entry['next_due'], match_id)
+               for match_id, entry in self.entries.items()
+               if entry['state'] != 'done' and entry.get('next_due') is not None and entry['next_due'] <= now]
+        selected = [match_id for _, _, match_id in sorted(due)[:budget]]
+
+        claimed = [] # Uudet ID:t journaaliin, jotta kesken tapettu ajo hakee ne uudelleen eikä ohita niitä
+        while len(selected) < budget: # Loput budjetista uusiin ID:ihin
+            if self.ceiling is not None and self.frontier >= self.ceiling:
+                break # Suurempia ID:itä ei vielä ole olemassa
+            self.frontier += 1
+            if self.entries.get(self.frontier, {}).get('state') == 'empty':
+                continue # Negatiivisessa välimuistissa; tulee hakuun vasta TTL:n jälkeen
+            self.entries[self.frontier] = {'state': 'new', 'next_due': now, 'attempts': 0}
+            selected.append(self.frontier)
+            claimed.append(self.frontier)
+        self._journal(claimed)
+
+        by_state = {}
+        for match_id in selected:
+            state = self.entries[match_id]['state']
+            by_state[state] = by_state.get(state, 0) + 1
+        logger.info("Työjonosta valittu %s ID:tä: %s", len(selected), by_state)
+        return sorted(selected)
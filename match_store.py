@@ -0,0 +1,233 @@
+import os
+import json
+import logging
+import threading
+
+# -------------------------------------------------------
+# Otteludatan tallennuskerros: append-only JSONL-loki, jossa jokainen rivi on
+# yhden ottelun koko tietue. Päivitys on yksi lisätty rivi (O(1)), ja myöhempi
+# rivi samalla match_id:llä korvaa aiemman. Loki tiivistetään ajoittain yhdeksi
+# riviksi per ottelu. match_data.json viedään lokista analyze_data.py:tä varten.
+# Loki toimii myös write-ahead-journaalina: jokainen rivi fsyncataan heti, joten
+# tapettu ajo menettää enintään kesken jääneen rivin, joka katkaistaan latauksessa.
+# Tiivistys ajetaan taustasäikeessä, eikä se pysäytä rivien lisäämistä.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = "match_data.jsonl"
+COMPACT_RATIO = 2.0 # Tiivistetään, kun lokissa on yli 2x rivejä tietueisiin nähden
+COMPACT_MIN_LINES = 200 # Pientä lokia ei kannata tiivistää
+
+
+def truncate_torn_tail(path):
+    """Cut an unterminated last line left by a killed writer; returns the number of bytes removed"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # Etsitään viimeinen kokonainen rivi lopusta päin
+        position = size - 1
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        f.truncate(position)
+    logger.warning("Tiedoston %s lopusta katkaistiin keskeneräinen rivi (%s tavua).", path, size - position)
+    return size - position
+
+
+# Onnistuneiden tilojen järjestys: täydellinen tietue > live/ei alkanut > vajaa sivu; epäonnistuminen on 0
+STATUS_RANKS = {
+    'success_finished': 3,
+    'success_live': 2,
+    'success_not_started': 2,
+    'success_finished_partial': 1,
+    'success_data_found_unknown_state': 1,
+    'success_partial_data': 1,
+}
+
+
+def status_rank(record):
+    status = str((record or {}).get('status') or '')
+    return STATUS_RANKS.get(status, 1 if status.startswith('success') else 0)
+
+
+def should_replace(current, new):
+    """A result never replaces a stored record of a higher rank; the work queue still records the revisit"""
+    return current is None or status_rank(new) >= status_rank(current)
+
+
+def read_records(path):
+    """Yield the records of a store log without modifying it; an unterminated last line is skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break # Kirjoittaja voi olla vielä kesken rivin
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and record.get('match_id') is not None:
+                yield record
+
+
+def append_durable(f, lines):
+    """Append complete lines and force them to disk before returning"""
+    f.write("".join(line + "\n" for line in lines))
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class MatchStore:
+    """Append-only JSONL store of match records keyed by match_id."""
+
+    def __init__(self, path=STORE_FILE, seed_json=None, durable=True):
+        self.path = path
+        self.records = {} # match_id -> tietue
+        self.line_count = 0
+        self.durable = durable # fsync jokaisen rivin jälkeen
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = None # Tiivistyksen aikana lisätyt rivit
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self.load(seed_json)
+
+    def load(self, seed_json=None):
+        if os.path.exists(self.path):
+            truncate_torn_tail(self.path) # Tapettu ajo voi jättää puolikkaan rivin
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("Ohitetaan rikkinäinen rivi tiedostossa %s", self.path)
+                        continue
+                    if isinstance(record, dict) and record.get('match_id') is not None:
+                        self.records[record['match_id']] = record
+                        self.line_count += 1
+            logger.info("Ladattu %s tietuetta lokista %s (%s riviä).", len(self.records), self.path, self.line_count)
+        elif seed_json and os.path.exists(seed_json):
+            # Ensimmäinen ajo: siirretään vanha match_data.json lokiin
+            try:
+                with open(seed_json, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error("Tiedostoa %s ei voitu lukea lokin pohjaksi: %s. Aloitetaan tyhjästä.", seed_json, e)
+                data = []
+            for record in data if isinstance(data, list) else []:
+                if isinstance(record, dict) and record.get('match_id') is not None:
+                    self.records[record['match_id']] = record
+            self.compact()
+            logger.info("Luotu %s %s tietueella tiedostosta %s.", self.path, len(self.records), seed_json)
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def upsert(self, record, durable=None):
+        """Add or replace the record for record['match_id'] by appending one line"""
+        match_id = record.get('match_id')
+        if match_id is None:
+            raise ValueError("Tietueelta puuttuu match_id")
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            f = self._open()
+            if self.durable if durable is None else durable:
+                append_durable(f, [line])
+            else:
+                f.write(line + "\n")
+            if self._pending is not None:
+                self._pending.append(line)
+            self.records[match_id] = record
+            self.line_count += 1
+
+    def get(self, match_id):
+        return self.records.get(match_id)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def needs_compaction(self):
+        return self.line_count >= COMPACT_MIN_LINES and self.line_count > COMPACT_RATIO * len(self.records)
+
+    def compact(self):
+        """Rewrite the log with one line per match, sorted by match_id"""
+        with self._compact_lock:
+            with self._lock:
+                snapshot = dict(self.records)
+                self._pending = []
+            # Raskas kirjoitus lukon ulkopuolella; samaan aikaan lisätyt rivit kerätään _pendingiin
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for match_id in sorted(snapshot):
+                        f.write(json.dumps(snapshot[match_id], ensure_ascii=False) + "\n")
+                    with self._lock:
+                        pending, self._pending = self._pending, None
+                        append_durable(f, pending)
+                        if self._file is not None:
+                            self._file.close()
+                            self._file = None
+                        os.replace(tmp_path, self.path)
+                        self.line_count = len(snapshot) + len(pending)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+        logger.info("Loki %s tiivistetty: %s riviä.", self.path, self.line_count)
+
+    def compact_async(self):
+        """Start compaction on a background thread unless one is already running"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_logged, name="store-compact", daemon=True)
+        self._compactor.start()
+
+    def _compact_logged(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error("Lokin %s tiivistys epäonnistui: %s", self.path, e)
+
+    def wait_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def sorted_records(self):
+        return [self.records[match_id] for match_id in sorted(self.records)]
+
+    def export_json(self, path):
+        """Write the current records as the sorted JSON list analyze_data.load_data expects"""
+        records = self.sorted_records()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return len(records)
+
+    def close(self):
+        self.wait_compaction()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+
+# -------------------------------------------------------
+# Sivun valmiuden tunnistus Seleniumille kiinteiden time.sleep-odotusten tilalle.
+# Sivu on valmis, kun
+# 1) document.readyState on 'complete',
+# 2) kaikki vaaditut solmut (esim. tila ja tulos) löytyvät DOMista ja
+# 3) DOM ei ole muuttunut quiet_period-aikaan (MutationObserver) tai vaaditut solmut ovat
+#    olleet paikallaan quiet_period-ajan.
+# Observer seuraa vain solmujen lisäyksiä ja poistoja (childList): käynnissä olevan ottelun kello ja
+# luokkien vaihtelu eivät siis nollaa hiljaisuutta. Kello, joka vaihtaa tekstisolmun, on silti childList-
+# muutos, joten vaadittujen solmujen löytyminen riittää lopettamaan odotuksen ilman hard_cap-aikaa.
+# Odotus katkaistaan viimeistään hard_cap-ajan jälkeen. Jokaisesta sivusta kirjataan,
+# paljonko aikaa säästyi verrattuna entiseen kiinteään odotukseen.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+READY_QUIET_PERIOD = 0.5 # sekuntia ilman DOM-muutoksia
+READY_POLL_INTERVAL = 0.1
+READY_HARD_CAP = 8.0 # Yläraja odotukselle, vaikka sivu muuttuisi jatkuvasti
+
+# Asentaa MutationObserverin ensimmäisellä kutsulla ja palauttaa valmiustilan yhdellä edestakaisella kutsulla
+_READY_SCRIPT = """
+var selectors = arguments[0];
+if (!window.__scraperReady) {
+    window.__scraperReady = {last: performance.now(), found: null};
+    new MutationObserver(function () { window.__scraperReady.last = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+}
+var missing = [];
+for (var i = 0; i < selectors.length; i++) {
+    if (!document.querySelector(selectors[i])) { missing.push(selectors[i]); }
+}
+var now = performance.now();
+if (missing.length) { window.__scraperReady.found = null; }
+else if (window.__scraperReady.found === null) { window.__scraperReady.found = now; }
+return {quiet: (now - window.__scraperReady.last) / 1000,
+        present: missing.length ? 0 : (now - window.__scraperReady.found) / 1000,
+        complete: document.readyState === 'complete', missing: missing};
+"""
+
+
+class ReadinessStats:
+    """Thread-safe totals of readiness waits and the time saved against the old fixed sleeps."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.capped = 0
+        self.waited = 0.0
+        self.saved = 0.0
+
+    def add(self, waited, baseline, ready):
+        with self._lock:
+            self.pages += 1
+            self.capped += 0 if ready else 1
+            self.waited += waited
+            self.saved += baseline - waited
+
+    def summary(self):
+        average = self.saved / self.pages if self.pages else 0.0
+        return (f"{self.pages} sivua, odotettu {self.waited:.1f}s, säästetty {self.saved:.1f}s "
+                f"({average:.2f}s/sivu), yläraja täyttyi {self.capped} kertaa")
+
+
+readiness_stats = ReadinessStats()
+
+
+def check_ready(driver, required_selectors=(), quiet_period=READY_QUIET_PERIOD):
+    """One non-blocking readiness check of the current window; returns (ready, state)"""
+    try:
+        state = driver.execute_script(_READY_SCRIPT, list(required_selectors)) or {}
+    except Exception as e:
+        logger.debug("Valmiustarkistus epäonnistui: %s - %s", type(e).__name__, e)
+        state = {}
+    # Jatkuvasti päivittyvä sivu (live-kello) ei koskaan hiljene: vaaditut solmut riittävät, kun ne ovat pysyneet
+    settled = state.get('quiet', 0) >= quiet_period or bool(required_selectors and state.get('present', 0) >= quiet_period)
+    ready = bool(state.get('complete') and not state.get('missing') and settled)
+    return ready, state
+
+
+def wait_until_ready(driver, required_selectors=(), baseline=0.0, quiet_period=READY_QUIET_PERIOD,
+                     hard_cap=READY_HARD_CAP, poll_interval=READY_POLL_INTERVAL, stats=readiness_stats):
+    """Wait until required nodes exist and the DOM is quiet; returns (seconds waited, ready)"""
+    start = time.monotonic()
+    ready = False
+    state = {}
+    while True:
+        ready, state = check_ready(driver, required_selectors, quiet_period)
+        elapsed = time.monotonic() - start
+        if ready:
+            break
+        if elapsed >= hard_cap:
+            break
+        time.sleep(poll_interval)
+
+    waited = time.monotonic() - start
+    if stats is not None:
+        stats.add(waited, baseline, ready)
+    if ready:
+        logger.debug("Sivu valmis %.2fs:ssa (kiinteä odotus olisi ollut %.1fs)", waited, baseline)
+    else:
+        logger.debug("Sivu ei rauhoittunut %.1fs:ssa, puuttuvat solmut: %s", hard_cap, state.get('missing'))
+    return waited, ready
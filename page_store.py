@@ -0,0 +1,130 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import datetime
+import threading
+from pathlib import Path
+
+# -------------------------------------------------------
+# Sisältöosoitteellinen raakasivuvarasto: jokainen haettu sivu tallennetaan
+# gzip-pakattuna SHA-256-tiivisteen mukaan nimettyyn tiedostoon, ja index.jsonl
+# kertoo mikä blobi haettiin millekin ottelulle milloinkin.
+# Sama sisältö tallentuu vain kerran, vaikka sivu haettaisiin monta kertaa.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+PAGE_STORE_DIR = os.path.join("scrape_cache", "pages")
+INDEX_FILE_NAME = "index.jsonl"
+
+
+class PageStore:
+    """Stores raw pages by content hash with an index of (match_id, fetch_time) -> blob."""
+
+    def __init__(self, root=PAGE_STORE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.index_path = self.root / INDEX_FILE_NAME
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return self.objects_dir / digest[:2] / f"{digest[2:]}.html.gz"
+
+    def put(self, match_id, html, url=None, fetch_time=None):
+        """Save html for match_id and return its content hash"""
+        if not html:
+            return None
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        fetch_time = fetch_time or datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        path = self.blob_path(digest)
+        try:
+            if not path.exists(): # Sama sisältö on jo tallessa -> vain indeksirivi lisätään
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(gzip.compress(raw, compresslevel=6))
+                os.replace(tmp_path, path)
+                logger.debug("Uusi raakasivu tallennettu: %s (%s tavua pakkaamattomana)", path, len(raw))
+            else:
+                logger.debug("Raakasivu %s oli jo varastossa (ID %s), ei kirjoiteta uudelleen.", digest[:12], match_id)
+
+            entry = {'match_id': match_id, 'fetch_time': fetch_time, 'sha256': digest, 'bytes': len(raw), 'url': url}
+            with self._lock, open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            return digest
+        except Exception as e:
+            logger.error("Raakasivun tallennus epäonnistui (ID %s): %s", match_id, e)
+            return None
+
+    def get(self, digest):
+        """Return the decompressed HTML for a content hash, or None if the blob is missing"""
+        path = self.blob_path(digest)
+        try:
+            with open(path, 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            logger.warning("Raakasivua %s ei löytynyt varastosta.", digest)
+            return None
+
+    def iter_index(self):
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Ohitetaan rikkinäinen indeksirivi tiedostossa %s", self.index_path)
+
+    def latest_entries(self):
+        """Return {match_id: newest index entry} over the whole index"""
+        latest = {}
+        for entry in self.iter_index():
+            match_id = entry.get('match_id')
+            if match_id is None:
+                continue
+            current = latest.get(match_id)
+            if current is None or entry.get('fetch_time', '') >= current.get('fetch_time', ''):
+                latest[match_id] = entry
+        return latest
+
+    def latest(self, match_id):
+        """Return (entry, html) for the newest stored fetch of match_id, or (None, None)"""
+        entry = self.latest_entries().get(match_id)
+        if not entry:
+            return None, None
+        return entry, self.get(entry['sha256'])
+
+    def prune(self, keep_digests=()):
+        """Keep only the newest page per match plus keep_digests; returns (blobs removed, bytes freed)"""
+        latest = self.latest_entries()
+        keep = {entry['sha256'] for entry in latest.values()} | set(keep_digests)
+        removed = freed = 0
+        with self._lock:
+            for path in self.objects_dir.glob("*/*.html.gz"):
+                digest = path.parent.name + path.name[:-len(".html.gz")]
+                if digest in keep:
+                    continue
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+            # Indeksiin jäävät vain rivit, joiden blobi on yhä tallessa
+            entries = [entry for entry in self.iter_index() if entry.get('sha256') in keep]
+            tmp_path = self.index_path.with_name(f"{INDEX_FILE_NAME}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.index_path)
+        logger.info("Raakasivuvarasto karsittu: %s blobia poistettu (%.1f Mt), %s jäljellä.", removed, freed / 1e6, len(keep))
+        return removed, freed
@@ -0,0 +1,339 @@
+import os
+import sys
+import time
+import glob
+import json
+import platform
+import logging
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+
+import bs4
+
+from audience_scraper import MatchPageParser, ExtractionPlan, PARSER_BACKENDS, DEFAULT_PARSER_BACKEND, CACHE_DIR, logger
+from page_store import PageStore, PAGE_STORE_DIR
+
+# -------------------------------------------------------
+# Jäsentimen suorituskykytestit tallennetuilla sivuilla (täysin offline):
+# 1) pariteetti: jokaisen moottorin (koko puu ja osittainen jäsennys) on tuotettava täsmälleen sama tietue
+# 2) nopeus: sivua/s per moottori ja per sivuluokka (päättynyt, ei alkanut, käynnissä, tyhjä)
+# 3) kenttäkohtainen hinta: jokaisen selektorin ratkaisu ja purkuvaiheet mikrosekunteina per sivu
+# 4) muistin huippu (tracemalloc) yhden sivun jäsennyksessä
+# Tulokset voi tallentaa perustasoksi (--save-baseline) ja seuraavat ajot verrataan siihen.
+# Luokat, joita tallennetuissa sivuissa ei ole, täydennetään synteettisillä sivuilla.
+# Ajo: python parser_benchmark.py [--rounds 5] [--save-baseline] [--fail-on-regression]
+# -------------------------------------------------------
+
+BASELINE_FILE = "parser_benchmark_baseline.json"
+PAGE_CLASSES = ("finished", "not_started", "live", "empty")
+REGRESSION_THRESHOLD = 0.10 # Yli 10 % huonompi tulos perustasoon verrattuna on regressio
+SYNTHETIC_NOISE_BLOCKS = 400 # Navigaatiota ja skriptejä, jotta sivun koko vastaa oikeaa ottelusivua
+
+
+def load_corpus(store_root=PAGE_STORE_DIR, cache_dir=CACHE_DIR):
+    """Return [(name, match_id, html)] from the page store and the old debug HTML files in scrape_cache"""
+    corpus = []
+    store = PageStore(store_root)
+    for match_id, entry in sorted(store.latest_entries().items()):
+        html = store.get(entry['sha256'])
+        if html:
+            corpus.append((f"store:{match_id}", match_id, html))
+    for path in sorted(glob.glob(f"{cache_dir}/*/*.html")):
+        match_id = os.path.basename(os.path.dirname(path)) # scrape_cache/<ID>/<ID>_LYHYT_SIVU_*.html
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus.append((path, int(match_id) if match_id.isdigit() else None, f.read()))
+    return corpus
+
+
+def page_class(record):
+    """Map a parsed record's status to one of PAGE_CLASSES"""
+    status = record.get('status') or ''
+    if status.startswith('success_finished'):
+        return "finished"
+    if status == 'success_not_started':
+        return "not_started"
+    if status == 'success_live':
+        return "live"
+    return "empty"
+
+
+def synthetic_page(kind, match_id=3748500):
+    """A full match page in the tulospalvelu layout for a page class missing from the recorded corpus"""
+    if kind == 'empty': # Sama muoto kuin scrape_cachen palvelinvirhesivut
+        return ("<html><head><title>palloliitto.fi | 500: Internal server error</title></head><body>"
+                "<div id=\"cf-wrapper\"><h1>Internal server error</h1><span class=\"code-label\">Error code 500</span></div></body></html>")
+    status, score, halftime, attendance = {
+        'finished': ("Päättynyt", "2 – 1", "(1 – 0)", "1234"),
+        'not_started': ("Ei alkanut", "–", "", ""),
+        'live': ("Käynnissä", "1 – 1", "(0 – 1)", ""),
+    }[kind]
+    played = kind != 'not_started'
+    scorers_a = '<span><a class="scorer" href="/pelaaja/101">Pekka Pelaaja</a> 12\', 78\'</span>' if played else ""
+    scorers_b = '<span><a class="scorer" href="/pelaaja/201">Ville Vieras</a> 33\'</span>' if played else ""
+    cards = '<div class="yellowcard_A"><span>Kalle Koti 44\'</span></div><div class="redcard_B"><span>Ville Vieras 88\'</span></div>' if played else ""
+    stats = "".join(
+        f'<div class="stat"><div class="name">{name}</div><div class="value-A">{home}</div><div class="value-B">{away}</div></div>'
+        for name, home, away in (("Pallonhallinta (%)", 55, 45), ("Laukaukset", 12, 7), ("Kulmapotkut", 6, 3),
+                                 ("Rikkeet", 10, 14), ("Paitsiot", 2, 1))) if played else ""
+    awards = ('<div class="awards-container"><div class="player"><a href="/pelaaja/101"><span class="name">'
+              '<span class="crest"></span>Pekka Pelaaja</span><span class="stars"><i class="fa-star"></i>'
+              '<i class="fa-star"></i><i class="fa-star"></i></span></a></div></div>') if kind == 'finished' else ""
+    goal_rows = ('<h3 class="section-title">Maalit ja syötöt</h3><div class="row gutter-12">'
+                 '<div class="col-md-6"><h3 class="subsection-title">Koti FC</h3><table class="table-stats"><tbody>'
+                 '<tr><td class="jersey">9</td><td class="player"><a href="/pelaaja/101">Pekka Pelaaja</a></td><td class="contribution">2+0=2</td></tr>'
+                 '</tbody></table></div><div class="col-md-6"><h3 class="subsection-title">Vieras FC</h3><table class="table-stats"><tbody>'
+                 '<tr><td class="jersey">7</td><td class="player"><a href="/pelaaja/201">Ville Vieras</a></td><td class="contribution">1+0=1</td></tr>'
+                 '</tbody></table></div></div>') if kind == 'finished' else ""
+    noise = "".join(f'<li class="menu-item"><a href="/category/{i}">Sarja {i}</a><script>window.t{i}={i};</script></li>'
+                    for i in range(SYNTHETIC_NOISE_BLOCKS))
+    return f"""<html><head><title>Koti FC - Vieras FC | Tulospalvelu</title><script>var config = {{}};</script></head><body>
+<nav><ul>{noise}</ul></nav>
+<div class="widget-match"><a id="team_A"><span class="teamname">Koti FC</span></a><a id="team_B"><span class="teamname">Vieras FC</span></a>
+<div class="widget-match-header-score"><span class="score">{score}</span><span class="halftime">{halftime}</span></div>
+<div class="widget-match-header-status"><span class="status-name">{status}</span></div>
+<div id="scorers_A"><div class="football scorernames">{scorers_a}</div></div><div id="scorers_B"><div class="football scorernames">{scorers_b}</div></div>
+{cards}</div>
+<div class="widget-match-info"><span class="match-date">Ottelu {match_id}</span>
+<span class="match-venue">18:00 | Lauantai 17.10.2026 | <a href="/venue/1">Keskuskenttä</a></span>
+<div class="widget-match-info-item--attendance"><span class="value">{attendance}</span></div>
+<div class="widget-match-info-item--formation"><span class="value">11 vs 11</span></div>
+<div class="widget-match-info-item--duration"><span class="value">2 x 45 min</span></div>
+<div class="widget-match-info-item--substitutions"><span class="value">5</span></div>
+<div class="widget-match-info-item--weather"><span class="value">Pilvistä</span></div></div>
+{awards}<div class="stats-wrapper">{stats}</div>{goal_rows}
+<footer>{noise[:5000]}</footer></body></html>"""
+
+
+def classify_corpus(corpus, synthetic=True):
+    """Return [(name, match_id, html, class)]; classes absent from the recordings get one synthetic page"""
+    reference = MatchPageParser(DEFAULT_PARSER_BACKEND)
+    classified = [(name, match_id, html, page_class(reference.parse_page(html, match_id, scrape_timestamp="benchmark")))
+                  for name, match_id, html in corpus]
+    if synthetic:
+        present = {page_cls for _, _, _, page_cls in classified}
+        for kind in PAGE_CLASSES:
+            if kind not in present:
+                classified.append((f"synthetic:{kind}", 3748500, synthetic_page(kind), kind))
+    return classified
+
+
+def parse_all(parser, corpus):
+    return [parser.parse_page(page[2], page[1], scrape_timestamp="benchmark") for page in corpus]
+
+
+def variants(backends=PARSER_BACKENDS):
+    """Every (backend, partial) combination: full-tree and region-only parsing for each backend"""
+    return [(backend, partial) for backend in backends for partial in (True, False)]
+
+
+def variant_name(backend, partial):
+    return f"{backend}{' (osittainen)' if partial else ''}"
+
+
+def check_parity(corpus, backends=PARSER_BACKENDS, reference=("html.parser", False)):
+    """Compare every variant against the full html.parser tree; return a list of mismatching page names"""
+    expected = parse_all(MatchPageParser(*reference), corpus)
+    mismatches = []
+    for backend, partial in variants(backends):
+        if (backend, partial) == reference:
+            continue
+        got = parse_all(MatchPageParser(backend, partial), corpus)
+        for page, exp, rec in zip(corpus, expected, got):
+            if json.dumps(exp, sort_keys=True, ensure_ascii=False) != json.dumps(rec, sort_keys=True, ensure_ascii=False):
+                mismatches.append(f"{variant_name(backend, partial)}: {page[0]}")
+    return mismatches
+
+
+def _best_of(func, rounds):
+    """Minimum wall time of func over rounds runs (least disturbed by other load)"""
+    best = None
+    for _ in range(max(1, rounds)):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def benchmark(corpus, backends=PARSER_BACKENDS, rounds=5):
+    results = {}
+    for backend, partial in variants(backends):
+        parser = MatchPageParser(backend, partial)
+        parse_all(parser, corpus) # Lämmittely
+        duration = _best_of(lambda: parse_all(parser, corpus), rounds)
+        results[variant_name(backend, partial)] = len(corpus) / duration if duration > 0 else 0.0
+    return results
+
+
+def benchmark_classes(corpus, parser, rounds=5):
+    """Pages/s and MB/s per page class with the production parser"""
+    results = {}
+    for kind in PAGE_CLASSES:
+        pages = [page for page in corpus if page[3] == kind]
+        if not pages:
+            continue
+        size_mb = sum(len(page[2].encode('utf-8')) for page in pages) / (1024 * 1024)
+        parse_all(parser, pages)
+        duration = _best_of(lambda: parse_all(parser, pages), rounds)
+        results[kind] = {'pages': len(pages), 'pages_per_s': round(len(pages) / duration, 1),
+                         'mb_per_s': round(size_mb / duration, 2)}
+    return results
+
+
+def field_costs(corpus, parser, rounds=5):
+    """Microseconds per page for each extraction step: tree build, every selector of the plan and the extract helpers"""
+    soups = [(parser.make_soup(page[2]), page[1]) for page in corpus]
+    plan = parser.extraction_plan
+    per_page = lambda duration: round(duration / len(corpus) * 1e6, 1)
+    costs = {'make_soup': per_page(_best_of(lambda: [parser.make_soup(page[2]) for page in corpus], rounds))}
+
+    # Selektorikohtainen hinta: yhden kentän suunnitelma (läpikäynti löytöön asti tai koko puu) miinus kiinteä pohja
+    overhead = per_page(_best_of(lambda: [ExtractionPlan({}, {}).run(soup) for soup, _ in soups], rounds))
+    full_walk = ExtractionPlan({}, {'_none': "x-none"}) # Ei osu mihinkään: koko puun läpikäynnin hinta
+    costs['plan_walk'] = per_page(_best_of(lambda: [full_walk.run(soup) for soup, _ in soups], rounds))
+    for field, css in {**plan.first_fields, **plan.all_fields}.items():
+        single = ExtractionPlan({field: css}) if field in plan.first_fields else ExtractionPlan({}, {field: css})
+        cost = per_page(_best_of(lambda: [single.run(soup) for soup, _ in soups], rounds))
+        costs[f"selector:{field}"] = round(max(0.0, cost - overhead), 1)
+    costs['plan_run'] = per_page(_best_of(lambda: [plan.run(soup) for soup, _ in soups], rounds))
+
+    nodes = [(plan.run(soup), soup, match_id) for soup, match_id in soups]
+    costs['extract_score_status'] = per_page(_best_of(lambda: [parser.extract_score_status(n, {}) for n, _, _ in nodes], rounds))
+    costs['extract_stats'] = per_page(_best_of(lambda: [parser.extract_stats(n, {}) for n, _, _ in nodes], rounds))
+    costs['extract_events'] = per_page(_best_of(
+        lambda: [(parser.extract_events(soup, 'A', n), parser.extract_events(soup, 'B', n)) for n, soup, _ in nodes], rounds))
+    # extract_data muokkaa puuta (crest.extract()), joten jokaiselle kierrokselle jäsennetään oma puu
+    fresh = lambda: [(parser.make_soup(page[2]), page[1]) for page in corpus]
+    batches = [fresh() for _ in range(max(1, rounds))]
+    costs['extract_data'] = per_page(min(_best_of(lambda: [parser.extract_data(soup, match_id) for soup, match_id in batch], 1)
+                                         for batch in batches))
+    costs['parse_page'] = per_page(_best_of(lambda: parse_all(parser, corpus), rounds))
+    return costs
+
+
+def memory_peaks(corpus, parser):
+    """tracemalloc peak in KiB while parsing each page; returns the max and the mean over the corpus"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for page in corpus:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            parser.parse_page(page[2], page[1], scrape_timestamp="benchmark")
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+    return {'peak_kib_max': round(max(peaks), 1), 'peak_kib_mean': round(statistics.mean(peaks), 1)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return [(metric, old, new, change)] for metrics that got worse than threshold; throughput up is better, cost down"""
+    regressions = []
+    checks = [(f"variants.{name}", baseline.get('variants', {}).get(name), value, True)
+              for name, value in results['variants'].items()]
+    checks += [(f"classes.{kind}.pages_per_s", baseline.get('classes', {}).get(kind, {}).get('pages_per_s'), stats['pages_per_s'], True)
+               for kind, stats in results['classes'].items()]
+    checks += [(f"fields.{field}", baseline.get('fields', {}).get(field), value, False)
+               for field, value in results['fields'].items() if not field.startswith("selector:")]
+    checks += [(f"memory.{key}", baseline.get('memory', {}).get(key), value, False) for key, value in results['memory'].items()]
+    for metric, old, new, higher_is_better in checks:
+        if not old:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Ottelusivun jäsentimen pariteetti, nopeus, kenttäkohtainen hinta ja muisti")
+    arg_parser.add_argument("--rounds", type=int, default=5, help="Mittauskierroksia; tuloksena paras kierros (oletus: %(default)s)")
+    arg_parser.add_argument("--baseline", default=BASELINE_FILE, help="Perustasotiedosto vertailua varten (oletus: %(default)s)")
+    arg_parser.add_argument("--save-baseline", action="store_true", help="Tallenna tämän ajon tulokset perustasoksi")
+    arg_parser.add_argument("--fail-on-regression", action="store_true",
+                            help=f"Palauta virhekoodi, jos jokin mittari on yli {REGRESSION_THRESHOLD:.0%} perustasoa huonompi")
+    arg_parser.add_argument("--no-synthetic", dest="synthetic", action="store_false",
+                            help="Älä täydennä puuttuvia sivuluokkia synteettisillä sivuilla")
+    arg_parser.add_argument("--output", help="Kirjoita tulokset myös tähän JSON-tiedostoon")
+    args = arg_parser.parse_args(argv)
+    logger.setLevel(logging.ERROR) # Sivukohtaiset lokirivit vääristäisivät mittausta
+
+    corpus = classify_corpus(load_corpus(), synthetic=args.synthetic)
+    if not corpus:
+        print("Ei tallennettuja sivuja vertailuun.")
+        return 1
+    class_counts = {kind: sum(1 for page in corpus if page[3] == kind) for kind in PAGE_CLASSES}
+    synthetic_count = sum(1 for page in corpus if page[0].startswith("synthetic:"))
+    print(f"Korpus: {len(corpus)} sivua ({synthetic_count} synteettistä), {sum(len(page[2]) for page in corpus)} merkkiä, "
+          f"luokat: {', '.join(f'{kind} {count}' for kind, count in class_counts.items())}")
+
+    mismatches = check_parity(corpus)
+    if mismatches:
+        print("PARITEETTI EPÄONNISTUI:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+    else:
+        print("Pariteetti OK: kaikki moottorit ja osittainen jäsennys tuottivat saman tietueen.")
+
+    parser = MatchPageParser(DEFAULT_PARSER_BACKEND)
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'bs4': bs4.__version__,
+        'parser_backend': DEFAULT_PARSER_BACKEND,
+        'corpus': class_counts,
+        'variants': {name: round(value, 1) for name, value in benchmark(corpus, rounds=args.rounds).items()},
+        'classes': benchmark_classes(corpus, parser, rounds=args.rounds),
+        'fields': field_costs(corpus, parser, rounds=args.rounds),
+        'memory': memory_peaks(corpus, parser),
+    }
+
+    print("\nMoottorit (sivua/s):")
+    for name, pages_per_s in results['variants'].items():
+        print(f"  {name:24s} {pages_per_s:8.1f}")
+    print(f"\nSivuluokat ({DEFAULT_PARSER_BACKEND}, osittainen):")
+    for kind, stats in results['classes'].items():
+        print(f"  {kind:12s} {stats['pages']:4d} sivua {stats['pages_per_s']:8.1f} sivua/s {stats['mb_per_s']:7.2f} Mt/s")
+    print("\nVaiheiden ja kenttien hinta (µs/sivu):")
+    for field, cost in sorted(results['fields'].items(), key=lambda item: -item[1]):
+        print(f"  {field:36s} {cost:10.1f}")
+    print(f"\nMuisti: huippu {results['memory']['peak_kib_max']:.0f} KiB/sivu, keskimäärin {results['memory']['peak_kib_mean']:.0f} KiB/sivu")
+
+    exit_code = 1 if mismatches else 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != class_counts:
+            print(f"\nHUOM: korpus eroaa perustasosta ({baseline.get('corpus')}), vertailu on suuntaa-antava.")
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\nREGRESSIOITA perustasoon {baseline.get('commit')} verrattuna:")
+            for metric, old, new, change in regressions:
+                print(f"  {metric}: {old} -> {new} ({change:+.0%})")
+            if args.fail_on_regression:
+                exit_code = 1
+        else:
+            print(f"\nEi regressioita perustasoon {baseline.get('commit')} ({baseline.get('timestamp')}) verrattuna.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Perustaso tallennettu: {args.baseline}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
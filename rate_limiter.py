@@ -0,0 +1,120 @@
+import time
+import random
+import logging
+import threading
+
+# -------------------------------------------------------
+# Yhteinen nopeusrajoitin kaikille sivuhauille (HTTP, JSON ja Selenium).
+# Token bucket: keskimäärin `rate` hakua sekunnissa, enintään `burst` peräkkäin.
+# Nopeus mukautuu palvelimen vasteeseen (AIMD):
+# - onnistunut ja nopea haku nostaa nopeutta vähitellen kohti max_rate:a
+# - virhe (429/5xx, verkkovirhe, selaimen kaatuminen) puolittaa nopeuden
+# - hidas vastaus (yli slow_latency) laskee nopeutta maltillisesti
+# Uusintayritysten odotus on eksponentiaalinen ja satunnaistettu (full jitter).
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 1 / 2.5 # Hakua sekunnissa; vastaa entistä REQUEST_DELAY = 2.5 -väliä
+DEFAULT_BURST = 2
+MIN_RATE = 1 / 30 # Pahimmillaankin yksi haku 30 s välein
+MAX_RATE = 2.0
+RATE_STEP = 0.02 # Lisäys per onnistunut haku (additive increase)
+ERROR_FACTOR = 0.5 # Kerroin virheen jälkeen (multiplicative decrease)
+SLOW_FACTOR = 0.85
+SLOW_LATENCY = 10.0 # sekuntia; tätä hitaampi vastaus tulkitaan palvelimen kuormitukseksi
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket whose rate adapts to observed latency and errors."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 slow_latency=SLOW_LATENCY):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.rate = min(max(rate, min_rate), self.max_rate)
+        self.burst = max(1, burst)
+        self.slow_latency = slow_latency
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds waited"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def reserve(self):
+        """Take a token without sleeping; returns the seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Varataan token heti (saldo voi mennä negatiiviseksi), jotta rinnakkaiset workerit jonoutuvat reilusti
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.requests += 1
+            self.waited += delay
+        return delay
+
+    def record(self, latency=None, ok=True):
+        """Feed one fetch outcome back into the rate"""
+        with self._lock:
+            self._refill(time.monotonic())
+            old_rate = self.rate
+            if not ok:
+                self.errors += 1
+                self.rate = max(self.min_rate, self.rate * ERROR_FACTOR)
+                self._tokens = min(self._tokens, 0.0) # Ei purskeita heti virheen perään
+            elif latency is not None and latency > self.slow_latency:
+                self.rate = max(self.min_rate, self.rate * SLOW_FACTOR)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+        if self.rate < old_rate:
+            logger.info("Hakunopeutta laskettu %.2f -> %.2f hakua/s (%s)", old_rate, self.rate,
+                        'virhe' if not ok else f'hidas vastaus {latency:.1f}s')
+
+    def backoff(self, attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+        """Sleep a jittered exponential delay before retry number attempt (1, 2, ...)"""
+        delay = self.backoff_delay(attempt, base, cap)
+        logger.debug("Odotetaan %.1fs ennen seuraavaa yritystä (%s. uusinta)...", delay, attempt)
+        time.sleep(delay)
+        return delay
+
+    def backoff_delay(self, attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+        """The jittered delay backoff() would sleep, for callers that schedule the retry themselves"""
+        return random.uniform(base, max(base, min(cap, base * (2 ** attempt))))
+
+    def summary(self):
+        return (f"{self.requests} hakua, {self.errors} virhettä, odotettu yhteensä {self.waited:.1f}s, "
+                f"lopullinen nopeus {self.rate:.2f} hakua/s")
+
+
+def configure_rate_limiter(rate=DEFAULT_RATE, burst=DEFAULT_BURST, **kwargs):
+    """Replace the process-wide limiter, e.g. from command line options"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = AdaptiveRateLimiter(rate, burst, **kwargs)
+        return _limiter
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter shared by every fetch path"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveRateLimiter()
+        return _limiter
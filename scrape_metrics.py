@@ -0,0 +1,148 @@
+import os
+import json
+import math
+import time
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+
+# -------------------------------------------------------
+# Vaihekohtaiset ajoitukset ja laskurit skrapereille, jotta hitaasta ajosta näkee,
+# johtuuko hitaus Chromesta, sivustosta vai omasta jäsentimestä.
+# - Ajoitukset (sekunteina) ja koot kerätään näytteinä: driverin käynnistys, navigointi,
+#   elementin odotus, valmiusodotus, sivun koko, jäsennys ja tallennus
+# - Laskurit: uusinnat, aikakatkaisut, HTTP-tilat, hakupolut ja tietueiden tilajakauma
+# Ajon lopussa yksi yhteenvetorivi lisätään JSONL-tiedostoon ja Prometheus-textfile
+# kirjoitetaan atomisesti uudelleen (node_exporterin textfile collector lukee sen).
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.environ.get("SCRAPER_METRICS_DIR", "metrics")
+METRICS_PREFIX = "scraper"
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _prom_labels(labels):
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class ScrapeMetrics:
+    """Thread-safe per-run stage samples and labelled counters with JSONL and Prometheus export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {} # nimi -> näytteet (esim. navigation_seconds, page_source_bytes)
+        self._counters = {} # (nimi, ((nimiö, arvo), ...)) -> määrä
+        self.started = time.time()
+
+    def observe(self, name, value):
+        with self._lock:
+            self._samples.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items()))) # Esim. 200 ja 'ConnectTimeout' samassa nimiössä
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def stage_stats(self):
+        """Return name -> {count, sum, p50, p95, max} over the samples of this run"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+        stats = {}
+        for name, values in sorted(samples.items()):
+            stats[name] = {'count': len(values), 'sum': round(sum(values), 4), 'max': round(values[-1], 4)}
+            for q in QUANTILES:
+                stats[name][f"p{int(q * 100)}"] = round(percentile(values, q), 4)
+        return stats
+
+    def counters(self):
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [{'name': name, **dict(labels), 'value': value} for (name, labels), value in items]
+
+    def snapshot(self, job):
+        return {
+            'job': job,
+            'ts': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'duration_seconds': round(time.time() - self.started, 3),
+            'stages': self.stage_stats(),
+            'counters': self.counters(),
+        }
+
+    def prometheus_text(self, job, snapshot=None):
+        snapshot = snapshot or self.snapshot(job)
+        job_label = {'job': job}
+        lines = []
+        for name, stats in snapshot['stages'].items():
+            metric = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for q in QUANTILES:
+                lines.append(f"{metric}{_prom_labels({**job_label, 'quantile': q})} {stats[f'p{int(q * 100)}']}")
+            lines.append(f"{metric}_sum{_prom_labels(job_label)} {stats['sum']}")
+            lines.append(f"{metric}_count{_prom_labels(job_label)} {stats['count']}")
+        typed = set()
+        for counter in snapshot['counters']:
+            metric = f"{METRICS_PREFIX}_{counter['name']}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            labels = {key: value for key, value in counter.items() if key not in ('name', 'value')}
+            lines.append(f"{metric}{_prom_labels({**job_label, **labels})} {counter['value']}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_run_duration_seconds{_prom_labels(job_label)} {snapshot['duration_seconds']}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{METRICS_PREFIX}_last_run_timestamp_seconds{_prom_labels(job_label)} {int(time.time())}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, job, directory=METRICS_DIR):
+        """Append this run's summary to <job>_metrics.jsonl and rewrite <job>.prom; returns the snapshot"""
+        snapshot = self.snapshot(job)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{job}_metrics.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+            prom_path = os.path.join(directory, f"{job}.prom")
+            with open(f"{prom_path}.tmp", 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text(job, snapshot))
+            os.replace(f"{prom_path}.tmp", prom_path) # Collector ei koskaan näe puolikasta tiedostoa
+        except OSError as e:
+            logger.error("Mittareiden tallennus hakemistoon %s epäonnistui: %s", directory, e)
+        return snapshot
+
+    def summary_lines(self):
+        """Human-readable p50/p95 line per stage followed by the counters"""
+        lines = []
+        for name, stats in self.stage_stats().items():
+            fmt = "{:.3f}s" if name.endswith("_seconds") else "{:.0f}"
+            lines.append(f"{name}: p50 {fmt.format(stats['p50'])}, p95 {fmt.format(stats['p95'])}, "
+                         f"max {fmt.format(stats['max'])} (n={stats['count']})")
+        counters = [f"{c['name']}" + "".join(f"[{k}={v}]" for k, v in c.items() if k not in ('name', 'value')) + f"={c['value']}"
+                    for c in self.counters()]
+        if counters:
+            lines.append("laskurit: " + ", ".join(counters))
+        return lines
+
+
+scrape_metrics = ScrapeMetrics()
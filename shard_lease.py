@@ -0,0 +1,153 @@
+import os
+import time
+import socket
+import sqlite3
+import logging
+import contextlib
+
+# -------------------------------------------------------
+# ID-välien koordinointi useammalle rinnakkaiselle skraperiprosessille (taustahaku, backfill).
+# Välit (esim. 50 ID:tä) ja niiden vuokrasopimukset (lease) ovat jaetussa SQLite-tiedostossa:
+# - worker varaa seuraavan vapaan tai vanhentuneen välin BEGIN IMMEDIATE -transaktiossa,
+#   joten kaksi prosessia ei koskaan saa samaa väliä yhtä aikaa
+# - vuokra uusitaan haun aikana; jos worker kuolee, väli vapautuu TTL:n jälkeen toiselle
+# - jokainen worker kirjoittaa vain omaan osioonsa (shards/parts/<owner>/), joten
+#   match_data.json, match_queue.json ja last_match_id.txt eivät koskaan ole kilpailtuja
+# Yhdistäminen (audience_scraper.py merge) kokoaa osioista kanonisen datan yhdellä kirjoittajalla.
+# SQLite-lukitus toimii saman koneen prosessien välillä ja jaetulla levyllä, joka tukee POSIX-lukkoja.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIR = os.environ.get("SCRAPER_SHARD_DIR", "shards")
+SHARD_DB = os.path.join(SHARD_DIR, "leases.sqlite")
+PARTS_DIR = os.path.join(SHARD_DIR, "parts")
+RANGE_SIZE = 50 # ID:tä per väli
+LEASE_TTL = 15 * 60 # Vuokra vanhenee, ellei sitä uusita tänä aikana
+DB_TIMEOUT = 30 # Sekuntia lukon odotusta ennen virhettä
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranges (
+    start INTEGER PRIMARY KEY,
+    end INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending', -- pending / leased / done
+    owner TEXT,
+    expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    records INTEGER,
+    updated REAL
+)
+"""
+
+
+def default_owner():
+    """host-pid: unique among concurrent workers; pass a stable name to resume a worker's own partition"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseStore:
+    """SQLite table of ID ranges and the worker leases on them."""
+
+    def __init__(self, path=SHARD_DB, ttl=LEASE_TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._transaction() as db:
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=DB_TIMEOUT, isolation_level=None) # Transaktiot hallitaan itse
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so claims never race between processes"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def plan(self, first_id, last_id, range_size=RANGE_SIZE):
+        """Split first_id..last_id into ranges; existing ranges are kept, so every worker may call this"""
+        range_size = max(1, range_size)
+        rows = [(start, min(start + range_size - 1, last_id), time.time())
+                for start in range(first_id, last_id + 1, range_size)]
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO ranges (start, end, updated) VALUES (?, ?, ?)", rows)
+            added = db.total_changes - before
+        logger.info("Välit %s-%s (%s ID:tä per väli): %s uutta väliä lisätty.", first_id, last_id, range_size, added)
+        return added
+
+    def claim(self, owner, now=None):
+        """Lease the lowest pending or expired range to owner; returns (start, end) or None"""
+        now = now or time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT start, end, owner, state FROM ranges "
+                             "WHERE state = 'pending' OR (state = 'leased' AND expires < ?) "
+                             "ORDER BY start LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE ranges SET state = 'leased', owner = ?, expires = ?, attempts = attempts + 1, updated = ? "
+                       "WHERE start = ?", (owner, now + self.ttl, now, row['start']))
+        if row['state'] == 'leased':
+            logger.warning("Väli %s-%s otettiin haltuun vanhentuneelta vuokraajalta %s.", row['start'], row['end'], row['owner'])
+        return row['start'], row['end']
+
+    def renew(self, owner, start, now=None):
+        """Extend owner's lease on the range; False means the lease was lost to another worker"""
+        now = now or time.time()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE ranges SET expires = ?, updated = ? WHERE start = ? AND owner = ? AND state = 'leased'",
+                                (now + self.ttl, now, start, owner))
+            return cursor.rowcount == 1
+
+    def complete(self, owner, start, records=None):
+        """Mark the range done if owner still holds it"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE ranges SET state = 'done', expires = NULL, records = ?, updated = ? "
+                                "WHERE start = ? AND owner = ? AND state = 'leased'", (records, time.time(), start, owner))
+            return cursor.rowcount == 1
+
+    def give_back(self, owner, start, last_kept):
+        """Shrink owner's range to start..last_kept and return the rest as a new pending range"""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT end FROM ranges WHERE start = ? AND owner = ? AND state = 'leased'", (start, owner)).fetchone()
+            if row is None or last_kept >= row['end']:
+                return False
+            db.execute("UPDATE ranges SET end = ?, updated = ? WHERE start = ?", (last_kept, now, start))
+            db.execute("INSERT INTO ranges (start, end, updated) VALUES (?, ?, ?)", (last_kept + 1, row['end'], now))
+        logger.info("Väli %s-%s palautettu muille workereille.", last_kept + 1, row['end'])
+        return True
+
+    def release(self, owner, start):
+        """Hand an unfinished range back, e.g. on KeyboardInterrupt, without waiting for the TTL"""
+        with self._transaction() as db:
+            db.execute("UPDATE ranges SET state = 'pending', owner = NULL, expires = NULL, updated = ? "
+                       "WHERE start = ? AND owner = ? AND state = 'leased'", (time.time(), start, owner))
+
+    def summary(self):
+        db = self._connect()
+        try:
+            counts = dict(db.execute("SELECT state, COUNT(*) FROM ranges GROUP BY state").fetchall())
+        finally:
+            db.close()
+        return ", ".join(f"{state} {counts.get(state, 0)}" for state in ('pending', 'leased', 'done'))
+
+
+def partition_dir(owner, root=PARTS_DIR):
+    return os.path.join(root, owner)
+
+
+def partition_dirs(root=PARTS_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, name) for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
@@ -0,0 +1,333 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from selenium.common.exceptions import WebDriverException
+
+from page_ready import check_ready, readiness_stats, READY_HARD_CAP
+from browser_profile import blocking_report
+from scrape_metrics import scrape_metrics
+
+# -------------------------------------------------------
+# Usean välilehden haku yhdessä selaimessa: yksi Chrome-prosessi ja N välilehteä
+# antavat rinnakkaisuutta ilman, että selaimen muistinkäyttö (RSS) moninkertaistuu.
+# Selenium-driver ei ole säieturvallinen, joten yksi taustasäie omistaa selaimen:
+# se käynnistää navigoinnin jokaisessa vapaassa välilehdessä (location.href, ei odota latausta),
+# kiertää välilehtiä ja kerää page_sourcen heti, kun välilehti on valmis.
+# Välilehtikohtaiset rajat ovat samat kuin fetch_page_seleniumissa:
+# lataus 60 s (page_load_timeout), widgetin odotus 60 s, valmiusodotus ja 3 yritystä.
+# Workerit kutsuvat fetch(url) ja odottavat tulosta; nopeusrajoitin ja uusintaviiveet
+# ajoitetaan säikeessä nukkumatta, jotta muut välilehdet etenevät sillä välin.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+TAB_COUNT = int(os.environ.get("SCRAPER_TABS", "1")) # 1 = ei välilehtitilaa, jokainen worker käyttää omaa selaintaan
+TAB_LOAD_TIMEOUT = 60 # Sama kuin set_page_load_timeout(60)
+TAB_ELEMENT_WAIT = 60 # Sama kuin WebDriverWait(driver, 60)
+TAB_ATTEMPTS = 3
+TAB_POLL_INTERVAL = 0.1
+# Taustavälilehtien ajastimia ja renderöintiä ei saa hidastaa, muuten vain näkyvä välilehti etenee
+BACKGROUND_TAB_FLAGS = ("--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+                        "--disable-backgrounding-occluded-windows")
+
+# Vanha dokumentti merkitään ennen navigointia; merkin puuttuminen kertoo, että uusi sivu on vaihtunut tilalle
+_NAVIGATE_SCRIPT = "window.__scraperPrevious = true; window.location.href = arguments[0];"
+_LOAD_STATE_SCRIPT = "return {fresh: !window.__scraperPrevious, complete: document.readyState === 'complete'};"
+_ELEMENT_SCRIPT = "return !!document.querySelector(arguments[0]);"
+
+_STOP = object()
+
+
+def apply_tab_options(chrome_options):
+    for flag in BACKGROUND_TAB_FLAGS:
+        chrome_options.add_argument(flag)
+
+
+class _TabTask:
+    """One URL in flight in one tab and its per-tab deadlines."""
+
+    def __init__(self, url, future):
+        self.url = url
+        self.future = future
+        self.attempt = 0
+        self.phase = 'backoff' # backoff -> queued -> loading -> element -> settling
+        self.not_before = 0.0
+        self.phase_start = 0.0
+        self.widget_found = False
+        self.last_error = None
+
+
+class TabFetcher:
+    """Fetches pages in several tabs of one pooled browser, driven by a single background thread."""
+
+    def __init__(self, driver_pool, tabs=TAB_COUNT, limiter=None, ready_selector="div.widget-match",
+                 settle_selectors=(), baseline=0.0, on_wait_timeout=None,
+                 load_timeout=TAB_LOAD_TIMEOUT, element_wait=TAB_ELEMENT_WAIT, attempts=TAB_ATTEMPTS,
+                 block_resources=False):
+        self.driver_pool = driver_pool
+        self.tabs = max(1, tabs)
+        self.limiter = limiter
+        self.ready_selector = ready_selector # Sama odotettava elementti kuin fetch_page_seleniumissa
+        self.settle_selectors = list(settle_selectors)
+        self.baseline = baseline # Entinen kiinteä odotus, valmiustilaston säästölaskentaa varten
+        self.on_wait_timeout = on_wait_timeout # Kutsutaan (driver, url) aktiivisena, kun widgetiä ei löytynyt
+        self.load_timeout = load_timeout
+        self.element_wait = element_wait
+        self.attempts = attempts
+        self.block_resources = block_resources
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._driver = None
+        self._handles = [] # Välilehtien ikkunakahvat
+        self._busy = {} # kahva -> _TabTask
+        self._driver_pages = 0 # Tämän selaimen sivut; kierrätys poolin sivurajalla kuten fetch_page_seleniumissa
+        self.pages = 0
+        self.failed = 0
+        self.restarts = 0
+
+    def fetch(self, url):
+        """Queue one URL and block until its page source (or None after the last attempt) is ready"""
+        future = Future()
+        self._ensure_thread()
+        self._requests.put((url, future))
+        return future.result()
+
+    def close(self, timeout=None):
+        """Finish the tabs in flight, then hand the browser back to the pool"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._requests.put(_STOP)
+        thread.join(timeout)
+        logger.info("Välilehtihaku: %s", self.summary())
+
+    def summary(self):
+        return f"{self.tabs} välilehteä, {self.pages} sivua, {self.failed} epäonnistui, selain käynnistetty uudelleen {self.restarts} kertaa"
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tab-fetcher", daemon=True)
+                self._thread.start()
+
+    # --- Selain ja välilehdet ---
+    def _open_browser(self):
+        self._driver = self.driver_pool.acquire()
+        self._driver_pages = 0
+        self._handles = [self._driver.current_window_handle]
+        while len(self._handles) < self.tabs:
+            self._driver.switch_to.new_window('tab')
+            self._handles.append(self._driver.current_window_handle)
+        logger.debug("Selain avattu %s välilehdellä.", len(self._handles))
+
+    def _close_browser(self, broken=False):
+        if self._driver is not None:
+            self.driver_pool.release(self._driver, broken=broken)
+        self._driver = None
+        self._handles = []
+
+    def _restart_browser(self, error):
+        """The browser itself failed: requeue every tab in flight on a fresh browser"""
+        logger.warning("Välilehtien selain kaatui (%s), käynnistetään uudelleen.", type(error).__name__)
+        self.restarts += 1
+        tasks = list(self._busy.values())
+        self._busy.clear()
+        self._close_browser(broken=True)
+        for task in tasks:
+            scrape_metrics.count('fetch_errors', stage='navigation')
+            self._retry(task, error)
+        return [task for task in tasks if not task.future.done()]
+
+    def _browser_alive(self):
+        try:
+            return self._driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    # --- Taustasäie ---
+    def _run(self):
+        waiting = [] # Tehtävät, joille ei vielä ole vapaata välilehteä (uudet, kierrätys tai selaimen kaatuminen)
+        stopping = False
+        try:
+            while True:
+                if not stopping:
+                    stopping = self._take_requests(waiting)
+                if stopping and not self._busy and not waiting:
+                    break
+                if self._driver is not None and not self._busy and self._driver_pages >= self.driver_pool.max_pages_per_driver:
+                    logger.debug("Kierrätetään välilehtien selain %s sivun jälkeen.", self._driver_pages)
+                    self._close_browser(broken=True)
+                if self._driver is None and waiting:
+                    try:
+                        self._open_browser()
+                    except Exception as e:
+                        logger.error("Selaimen avaus välilehtihakua varten epäonnistui: %s", e)
+                        for task in waiting:
+                            scrape_metrics.count('fetch_errors', stage='driver_startup')
+                            self._retry(task, e)
+                        waiting = [task for task in waiting if not task.future.done()]
+                        time.sleep(TAB_POLL_INTERVAL)
+                        continue
+                if waiting and self._driver_pages < self.driver_pool.max_pages_per_driver:
+                    waiting = self._assign(waiting) # Sivurajan täyttyessä välilehdet vain tyhjennetään
+                self._poll_tabs(waiting)
+                time.sleep(TAB_POLL_INTERVAL)
+        except Exception as e:
+            logger.exception("Välilehtihaun säie kaatui: %s", e)
+            with self._lock:
+                self._thread = None # Seuraava fetch käynnistää uuden säikeen
+            for task in waiting + list(self._busy.values()):
+                if not task.future.done():
+                    task.future.set_result(None)
+            self._busy.clear()
+            while True: # Jonossa odottavat workerit eivät saa jäädä odottamaan ikuisesti
+                try:
+                    item = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    item[1].set_result(None)
+        finally:
+            self._close_browser(broken=bool(self._busy))
+
+    def _take_requests(self, waiting):
+        """Move new requests onto free tabs; blocks only when nothing is in flight. Returns True on stop."""
+        block = not self._busy and not waiting
+        while len(self._busy) + len(waiting) < self.tabs or block:
+            try:
+                item = self._requests.get(block=block)
+            except queue.Empty:
+                return False
+            block = False
+            if item is _STOP:
+                return True
+            url, future = item
+            task = _TabTask(url, future)
+            self._retry(task) # Ensimmäinen yritys ilman viivettä
+            waiting.append(task)
+        return False
+
+    def _assign(self, waiting):
+        free = [handle for handle in self._handles if handle not in self._busy]
+        for task, handle in zip(list(waiting), free):
+            self._busy[handle] = task
+            waiting.remove(task)
+        return waiting
+
+    def _retry(self, task, error=None):
+        """Schedule the next attempt or fail the task after the last one"""
+        if error is not None:
+            task.last_error = error
+            if self.limiter:
+                self.limiter.record(ok=False)
+        if task.attempt >= self.attempts:
+            logger.error("Sivun %s haku epäonnistui %s yrityksen jälkeen välilehdessä. Viimeisin virhe: %s",
+                         task.url, task.attempt, task.last_error)
+            scrape_metrics.count('fetch_failed')
+            self.failed += 1
+            task.future.set_result(None)
+            return
+        delay = 0.0
+        if task.attempt > 0:
+            scrape_metrics.count('retries')
+            if error is not None and self.limiter: # Uusinta vain virheen jälkeen; viive ajoitetaan, ei nukuta
+                delay = self.limiter.backoff_delay(task.attempt)
+        task.attempt += 1
+        task.phase = 'backoff'
+        task.not_before = time.monotonic() + delay
+        task.widget_found = False
+
+    def _poll_tabs(self, waiting):
+        for handle, task in list(self._busy.items()):
+            if self._driver is None:
+                return
+            try:
+                if self._step(handle, task):
+                    del self._busy[handle]
+            except WebDriverException as e:
+                if not self._browser_alive():
+                    waiting.extend(self._restart_browser(e))
+                    return
+                logger.warning("%s välilehdessä yrityksellä %s/%s haettaessa %s: %s",
+                               type(e).__name__, task.attempt, self.attempts, task.url, e)
+                scrape_metrics.count('fetch_errors', stage='navigation')
+                self._retry(task, e)
+                if task.future.done():
+                    del self._busy[handle]
+
+    def _step(self, handle, task):
+        """Advance one tab by one poll; returns True when the task has left the tab"""
+        now = time.monotonic()
+        if task.phase == 'backoff':
+            if now < task.not_before:
+                return False
+            task.not_before = now + (self.limiter.reserve() if self.limiter else 0.0)
+            task.phase = 'queued'
+        if task.phase == 'queued':
+            if now < task.not_before:
+                return False
+            logger.debug("Välilehtihaku yritys %s/%s URL: %s", task.attempt, self.attempts, task.url)
+            self._driver.switch_to.window(handle)
+            self._driver.execute_script(_NAVIGATE_SCRIPT, task.url)
+            task.phase, task.phase_start = 'loading', time.monotonic()
+            return False
+
+        self._driver.switch_to.window(handle)
+        if task.phase == 'loading':
+            state = self._driver.execute_script(_LOAD_STATE_SCRIPT) or {}
+            elapsed = now - task.phase_start
+            if state.get('fresh') and state.get('complete'):
+                if self.limiter:
+                    self.limiter.record(elapsed, ok=True)
+                scrape_metrics.observe('navigation_seconds', elapsed)
+                task.phase, task.phase_start = 'element', now
+            elif elapsed >= self.load_timeout:
+                logger.warning("Sivu %s ei latautunut %s sekunnissa välilehdessä (yritys %s/%s).",
+                               task.url, self.load_timeout, task.attempt, self.attempts)
+                scrape_metrics.count('timeouts', stage='navigation')
+                self._driver.execute_script("window.stop();")
+                self._retry(task, TimeoutError(f"page load {self.load_timeout}s"))
+                return task.future.done()
+            return False
+
+        if task.phase == 'element':
+            if self._driver.execute_script(_ELEMENT_SCRIPT, self.ready_selector):
+                scrape_metrics.observe('element_wait_seconds', now - task.phase_start)
+                task.widget_found = True
+            elif now - task.phase_start >= self.element_wait:
+                scrape_metrics.observe('element_wait_seconds', now - task.phase_start)
+                scrape_metrics.count('timeouts', stage='element_wait')
+                if self.on_wait_timeout:
+                    self.on_wait_timeout(self._driver, task.url)
+            else:
+                return False
+            task.phase, task.phase_start = 'settling', now
+            return False
+
+        # settling: samat ehdot kuin wait_until_ready; ilman widgetiä ei odoteta solmuja, joita ei tule
+        selectors = self.settle_selectors if task.widget_found else []
+        hard_cap = READY_HARD_CAP if task.widget_found else self.baseline
+        ready, _ = check_ready(self._driver, selectors)
+        waited = now - task.phase_start
+        if not ready and waited < hard_cap:
+            return False
+        readiness_stats.add(waited, self.baseline, ready)
+        scrape_metrics.observe('readiness_seconds', waited)
+        if not ready:
+            scrape_metrics.count('timeouts', stage='readiness')
+        page_source = self._driver.page_source
+        scrape_metrics.observe('page_source_bytes', len(page_source.encode('utf-8')))
+        if self.block_resources:
+            blocking_report.collect(self._driver, task.url) # Performance-loki on selainkohtainen: sivun luvut ovat likimääräisiä
+        self.pages += 1
+        self._driver_pages += 1
+        logger.info("Sivun %s haku onnistui välilehdessä yrityksellä %s", task.url, task.attempt)
+        task.future.set_result(page_source)
+        return True
@@ -0,0 +1,366 @@
+import re
+import logging
+
+from bs4 import BeautifulSoup, NavigableString
+
+# -------------------------------------------------------
+# Lähtötason purku: MatchDataScraperin selektorit, extract_events ja extract_data sellaisinaan
+# baseline-commitista (select_one/select jokaiselle kentälle, html.parser, koko puu).
+# Pariteettitesti vertaa nykyistä purkua tähän; tätä tiedostoa ei muokata purun mukana.
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+
+def baseline_soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+
+class BaselineExtractor:
+    # --- Selektorit ---
+    HOME_TEAM_SELECTOR = "a#team_A span.teamname"
+    AWAY_TEAM_SELECTOR = "a#team_B span.teamname"
+    SCORE_SELECTOR = "div.widget-match-header-score span.score"
+    HALF_TIME_SCORE_SELECTOR = "div.widget-match-header-score span.halftime"
+    STATUS_SELECTOR = "div.widget-match-header-status span.status-name"
+    INFO_BLOCK_SELECTOR = "div.widget-match-info"
+    MATCH_DATE_ID_SELECTOR = "span.match-date" # Sisältää myös ottelunumeron
+    MATCH_VENUE_TIME_SELECTOR = "span.match-venue" # Sisältää ajan ja paikan
+    ATTENDANCE_SELECTOR = "div.widget-match-info-item--attendance span.value"
+    FORMATION_SELECTOR = "div.widget-match-info-item--formation span.value"
+    MATCH_DURATION_SELECTOR = "div.widget-match-info-item--duration span.value"
+    SUBSTITUTIONS_SELECTOR = "div.widget-match-info-item--substitutions span.value"
+    WEATHER_SELECTOR = "div.widget-match-info-item--weather span.value"
+    AWARD_CONTAINER_SELECTOR = "div.awards-container" # Palkintojen kontti
+    AWARD_PLAYER_DIV_SELECTOR = "div.player" # Yksittäisen pelaajan div
+    AWARD_LINK_SELECTOR = "a[href*='/pelaaja/']" # Linkki pelaajan profiiliin
+    AWARD_SPAN_SELECTOR = "span.name" # Pelaajan nimen sisältävä span
+    AWARD_STAR_CONTAINER_SELECTOR = "span.stars" # Tähtien kontti
+    AWARD_STAR_ICON_SELECTOR = "i.fa-star" # Tähti-ikoni
+    STATS_WRAPPER_SELECTOR = "div.stats-wrapper div.stat" # Yksittäinen tilastorivi
+    STATS_NAME_SELECTOR = "div.name"
+    STATS_HOME_VALUE_SELECTOR = "div.value-A"
+    STATS_AWAY_VALUE_SELECTOR = "div.value-B"
+    GOAL_ASSIST_HEADING_SELECTOR = "h3.section-title"
+    GOAL_ASSIST_ROW_SELECTOR = "div.row.gutter-12" # Rivi, joka sisältää molempien joukkueiden sarakkeet
+    GOAL_ASSIST_COL_SELECTOR = "div.col-md-6" # Yksittäisen joukkueen sarake
+    GOAL_ASSIST_TEAM_NAME_SELECTOR = "h3.subsection-title" # Joukkueen nimi sarakkeen sisällä
+    GOAL_ASSIST_TABLE_SELECTOR = "table.table-stats" # Tilastotaulukko sarakkeen sisällä
+    GOAL_ASSIST_TABLE_BODY_SELECTOR = "tbody"
+    GOAL_ASSIST_TABLE_ROW_SELECTOR = "tr" # Pelaajarivi taulukossa
+    GOAL_ASSIST_JERSEY_SELECTOR = "td.jersey"
+    GOAL_ASSIST_PLAYER_SELECTOR = "td.player a"
+    GOAL_ASSIST_CONTRIBUTION_SELECTOR = "td.contribution"
+
+    def extract_events(self, soup, team_id_suffix): # team_id_suffix 'A' tai 'B'
+        events = {'goals': [], 'yellow_cards': [], 'red_cards': []}
+        try:
+            # Maalit
+            scorers_container_selector = f"div#scorers_{team_id_suffix} div.football.scorernames"
+            scorers_container = soup.select_one(scorers_container_selector)
+            if scorers_container:
+                scorer_spans = scorers_container.find_all('span', recursive=False) # Vain suorat lapsielementit
+                for scorer_span in scorer_spans:
+                     scorer_link = scorer_span.find('a', class_='scorer')
+                     if scorer_link:
+                         player_name = scorer_link.get_text(strip=True)
+                         player_href = scorer_link.get('href')
+                         time_node = scorer_link.next_sibling # Oletetaan, että aika on heti linkin jälkeen
+                         goal_times_str = time_node.strip() if time_node and isinstance(time_node, NavigableString) else ""
+                         if player_name and goal_times_str:
+                             goal_times = re.findall(r"(\d+'?)", goal_times_str) # Etsii numeroita ja valinnaista heittomerkkiä
+                             for time_val in goal_times:
+                                 events['goals'].append({'player': player_name, 'time': time_val.replace("'", "") + "'", 'link': player_href})
+                                 logger.debug(f"Maali ({team_id_suffix}): {player_name} ({time_val})")
+
+            # Punaiset kortit
+            red_card_selector = f"div.redcard_{team_id_suffix} span" # Olettaen että span sisältää nimen ja ajan
+            red_card_spans = soup.select(red_card_selector)
+            for span in red_card_spans:
+                text_content = span.get_text(strip=True)
+                # Yritä purkaa nimi ja aika, esim. "Pelaaja Nimi 78'"
+                match_obj = re.match(r"(.+)\s+(\d+'?)", text_content)
+                if match_obj:
+                    player_name = match_obj.group(1).strip()
+                    time_str = match_obj.group(2).replace("'", "") + "'" # Varmista heittomerkki
+                    events['red_cards'].append({'player': player_name, 'time': time_str})
+                    logger.debug(f"Punainen kortti ({team_id_suffix}): {player_name} ({time_str})")
+
+            # Keltaiset kortit
+            yellow_card_selector = f"div.yellowcard_{team_id_suffix} span"
+            yellow_card_spans = soup.select(yellow_card_selector)
+            for span in yellow_card_spans:
+                text_content = span.get_text(strip=True)
+                match_obj = re.match(r"(.+)\s+(\d+'?)", text_content)
+                if match_obj:
+                    player_name = match_obj.group(1).strip()
+                    time_str = match_obj.group(2).replace("'", "") + "'"
+                    events['yellow_cards'].append({'player': player_name, 'time': time_str})
+                    logger.debug(f"Keltainen kortti ({team_id_suffix}): {player_name} ({time_str})")
+
+        except Exception as e:
+            logger.error(f"Virhe tapahtumien purussa ({team_id_suffix}): {e}", exc_info=True)
+        return events
+
+    def extract_data(self, soup, match_id):
+        data = {'match_id': match_id, 'match_id_from_page': None}
+        logger.debug(f"Aloitetaan datan purku ID:lle {match_id}")
+
+        # Sivun otsikko
+        try: data['page_title'] = soup.find('title').get_text(strip=True) if soup.find('title') else None
+        except Exception as e: logger.warning(f"Virhe otsikko: {e}"); data['page_title'] = None
+        
+        # Joukkueet
+        try: data['team_home'] = soup.select_one(self.HOME_TEAM_SELECTOR).get_text(strip=True) if soup.select_one(self.HOME_TEAM_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe kotijoukkue: {e}"); data['team_home'] = None
+        try: data['team_away'] = soup.select_one(self.AWAY_TEAM_SELECTOR).get_text(strip=True) if soup.select_one(self.AWAY_TEAM_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe vierasjoukkue: {e}"); data['team_away'] = None
+
+        # Tulos ja puoliaikatulos
+        try: 
+            score_el = soup.select_one(self.SCORE_SELECTOR)
+            score_text = score_el.get_text(strip=True).replace(" ", "") if score_el else None # Poista välilyönnit
+            # Varmista, että tulos sisältää viivan, muuten se ei ole validi tulos
+            data['score'] = score_text if score_text and '–' in score_text else None
+        except Exception as e: logger.warning(f"Virhe tulos: {e}"); data['score'] = None
+        try:
+            ht_el = soup.select_one(self.HALF_TIME_SCORE_SELECTOR)
+            ht_text = ht_el.get_text(strip=True).replace("(", "").replace(")", "").replace(" ", "") if ht_el else ""
+            data['score_halftime'] = ht_text if ht_text and '–' in ht_text else None
+        except Exception as e: logger.warning(f"Virhe puoliaikatulos: {e}"); data['score_halftime'] = None
+        
+        # Ottelun tila
+        try:
+            status_element = soup.select_one(self.STATUS_SELECTOR)
+            data['match_status_raw'] = status_element.get_text(strip=True) if status_element else None
+        except Exception as e: logger.warning(f"Virhe ottelun tila: {e}"); data['match_status_raw'] = None
+
+        # Pvm, aika, paikka ja ottelunumero sivulta
+        data['match_datetime_raw'] = None
+        data['venue'] = None
+        date_match_obj = None # Alustetaan, jotta sitä voidaan käyttää myöhemmin
+
+        try:
+            info_block = soup.select_one(self.INFO_BLOCK_SELECTOR)
+            if info_block:
+                # Ottelunumero sivulta
+                match_date_el = info_block.select_one(self.MATCH_DATE_ID_SELECTOR)
+                if match_date_el:
+                    id_match = re.search(r'Ottelu\s+(\d+)', match_date_el.get_text())
+                    data['match_id_from_page'] = int(id_match.group(1)) if id_match else None
+                
+                # Aika ja paikka
+                match_venue_el = info_block.select_one(self.MATCH_VENUE_TIME_SELECTOR)
+                extracted_datetime_str = None
+                venue_text_for_extraction = ""
+                venue_raw_text = ""
+
+                if match_venue_el:
+                    venue_raw_text = match_venue_el.get_text(strip=True) # Koko teksti ilman separointia
+                    venue_text_for_extraction = match_venue_el.get_text(separator='|', strip=True) # Teksti separoitu |
+                    logger.debug(f"Raw venue/time text (for datetime extraction): '{venue_text_for_extraction}'")
+                    logger.debug(f"Raw venue text (for venue cleanup): '{venue_raw_text}'")
+
+                    # Yritä ensin tarkkaa regexiä ajalle ja päivämäärälle
+                    # Olettaa muodon "HH:MM | Viikonpäivä DD.MM." tai "HH:MM | Viikonpäivä DD.MM.YYYY"
+                    time_date_match = re.search(r'(\d{1,2}:\d{2})\s*\|\s*([a-zA-ZÄÖÅäöå\s]+\s+\d{1,2}\.\d{1,2}\.?(\d{4})?)', venue_text_for_extraction)
+                    if time_date_match:
+                        extracted_datetime_str = f"{time_date_match.group(1)} | {time_date_match.group(2).strip().rstrip('.')}"
+                        logger.debug(f"Extracted datetime with strict regex: {extracted_datetime_str}")
+                        # Otetaan päivämääräosa talteen myöhempää paikan siivousta varten
+                        date_match_obj = re.search(r'([a-zA-ZÄÖÅäöå\s]+\s+\d{1,2}\.\d{1,2}\.?(\d{4})?)', time_date_match.group(2).strip())
+
+                    else: # Jos tarkka ei toimi, yritä erillisiä kuvioita
+                        logger.debug("Strict regex failed for datetime, trying separate patterns.")
+                        time_match = re.search(r'(\d{1,2}:\d{2})', venue_text_for_extraction)
+                        # Yritä löytää päivämäärä, joka voi olla muodossa "Viikonpäivä DD.MM." tai "DD.MM.YYYY"
+                        date_match_obj = re.search(r'([A-ZÄÖÅa-zäöå]{2,}\s+\d{1,2}\.\d{1,2}\.?(\d{4})?)', venue_text_for_extraction) # Esim. "Tiistai 01.01." tai "Ti 1.1.2024"
+                        if not date_match_obj: # Jos edellinen ei löydy, kokeile pelkkää DD.MM.YYYY
+                            date_match_obj = re.search(r'(\d{1,2}\.\d{1,2}\.\d{4})', venue_text_for_extraction)
+                        
+                        time_str = time_match.group(1) if time_match else "??:??"
+                        date_str = date_match_obj.group(1).strip().rstrip('.') if date_match_obj else "Pvm Tuntematon"
+                        
+                        if time_match or date_match_obj: # Jos edes jompikumpi löytyi
+                            extracted_datetime_str = f"{time_str} | {date_str}"
+                        else:
+                            logger.warning(f"Could not extract time or date from: '{venue_text_for_extraction}'")
+                            extracted_datetime_str = None
+                        if extracted_datetime_str: logger.debug(f"Extracted datetime with separate patterns: {extracted_datetime_str}")
+
+                    data['match_datetime_raw'] = extracted_datetime_str
+                    
+                    # Paikan purku
+                    venue_link = match_venue_el.find('a') # Onko paikalla linkki?
+                    if venue_link:
+                        # Yritä ottaa teksti ennen linkkiä ja linkin teksti
+                        venue_text_before = venue_link.previous_sibling
+                        venue_parts = [
+                            venue_text_before.strip() if venue_text_before and isinstance(venue_text_before, NavigableString) else None,
+                            venue_link.get_text(strip=True)
+                        ]
+                        data['venue'] = ', '.join(filter(None, venue_parts))
+                        logger.debug(f"Extracted venue using link: {data['venue']}")
+                    else: # Jos ei linkkiä, yritä siivota koko venue_raw_text
+                        cleaned_venue = venue_raw_text
+                        if time_match: # Poista kellonaika, jos löytyi
+                            cleaned_venue = cleaned_venue.replace(time_match.group(0), '').strip()
+                        if date_match_obj: # Poista päivämäärä, jos löytyi
+                            cleaned_venue = cleaned_venue.replace(date_match_obj.group(0), '').strip()
+                        # Poista mahdolliset jäljelle jääneet erottimet ja ylimääräiset välilyönnit
+                        data['venue'] = cleaned_venue.replace('|','').strip(',').strip()
+                        logger.debug(f"Extracted venue by cleaning raw text: {data['venue']}")
+            else:
+                logger.warning(f"Info block ({self.INFO_BLOCK_SELECTOR}) not found for ID {match_id}")
+        except Exception as e:
+            logger.error(f"Virhe info blockin (pvm/aika/paikka) purussa: {e}", exc_info=True)
+
+        # Muut tiedot
+        data['formation'] = None; data['match_duration_format'] = None; data['substitutions_allowed'] = None; data['weather'] = None; data['audience'] = None;
+        try: data['formation'] = soup.select_one(self.FORMATION_SELECTOR).get_text(strip=True) if soup.select_one(self.FORMATION_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe formation: {e}")
+        try: data['match_duration_format'] = soup.select_one(self.MATCH_DURATION_SELECTOR).get_text(strip=True) if soup.select_one(self.MATCH_DURATION_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe duration format: {e}")
+        try: data['substitutions_allowed'] = soup.select_one(self.SUBSTITUTIONS_SELECTOR).get_text(strip=True) if soup.select_one(self.SUBSTITUTIONS_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe substitutions: {e}")
+        try: data['weather'] = soup.select_one(self.WEATHER_SELECTOR).get_text(strip=True) if soup.select_one(self.WEATHER_SELECTOR) else None
+        except Exception as e: logger.warning(f"Virhe weather: {e}")
+        try:
+            audience_el = soup.select_one(self.ATTENDANCE_SELECTOR)
+            audience_text = audience_el.get_text(strip=True) if audience_el else None
+            data['audience'] = int(audience_text) if audience_text and audience_text.isdigit() else None # Varmista, että on numero
+        except Exception as e: logger.warning(f"Virhe yleisömäärä: {e}")
+        
+        # Palkinnot
+        data['awards'] = []
+        try:
+             award_container = soup.select_one(self.AWARD_CONTAINER_SELECTOR)
+             if award_container:
+                  player_divs = award_container.select(self.AWARD_PLAYER_DIV_SELECTOR)
+                  for player_div in player_divs:
+                    link = player_div.select_one(self.AWARD_LINK_SELECTOR)
+                    if link:
+                        player_href = link.get('href')
+                        player_name = None
+                        # Yritä ensin span.name sisällä
+                        award_span = link.select_one(self.AWARD_SPAN_SELECTOR);
+                        if award_span:
+                            crest = award_span.select_one("span.crest"); # Poista mahdollinen crest-spani
+                            if crest: crest.extract() 
+                            player_name = award_span.get_text(strip=True)
+                        
+                        # Jos span.name ei tuottanut tulosta tai oli tyhjä, yritä suoraa tekstisisältöä linkistä
+                        if not player_name:
+                            name_parts = [text.strip() for text in link.find_all(string=True, recursive=False) if text.strip()]
+                            player_name = " ".join(name_parts) if name_parts else link.get_text(strip=True) # Fallback koko linkin tekstiin
+
+                        star_count = 0
+                        star_container = link.select_one(self.AWARD_STAR_CONTAINER_SELECTOR)
+                        star_count = len(star_container.select(self.AWARD_STAR_ICON_SELECTOR)) if star_container else 0
+                        
+                        if player_name and player_href:
+                            data['awards'].append({'player': player_name, 'link': player_href, 'stars': star_count})
+                            logger.debug(f"Löytyi palkittu: {player_name} ({star_count} tähteä)")
+                        else:
+                            logger.warning(f"Ei saatu purettua palkitun nimeä/linkkiä: {link.prettify()}")
+        except Exception as e: logger.warning(f"Virhe palkinnot: {e}")
+
+        # Tilastot
+        data['stats'] = {}
+        try:
+            stat_wrappers = soup.select(self.STATS_WRAPPER_SELECTOR)
+            logger.debug(f"Löytyi {len(stat_wrappers)} tilasto-wrapperia.")
+            for wrapper in stat_wrappers:
+                name_el = wrapper.select_one(self.STATS_NAME_SELECTOR)
+                home_el = wrapper.select_one(self.STATS_HOME_VALUE_SELECTOR)
+                away_el = wrapper.select_one(self.STATS_AWAY_VALUE_SELECTOR)
+                if name_el and home_el and away_el:
+                    stat_name_raw = name_el.get_text(strip=True)
+                    # Siivoa tilaston nimi: poista sulut, pienet kirjaimet, välilyönnit alaviivoiksi, skandit
+                    stat_name_clean = re.sub(r'[()]', '', stat_name_raw.lower().replace(" ", "_").replace("ä", "a").replace("ö", "o"))
+                    home_val_raw = home_el.get_text(strip=True)
+                    away_val_raw = away_el.get_text(strip=True)
+                    try: home_val = int(home_val_raw)
+                    except ValueError: home_val = home_val_raw # Jätä merkkijonoksi jos ei ole numero
+                    try: away_val = int(away_val_raw)
+                    except ValueError: away_val = away_val_raw
+                    data['stats'][stat_name_clean] = {'home': home_val, 'away': away_val}
+                    logger.debug(f"Tilasto: '{stat_name_clean}' Koti: {home_val}, Vieras: {away_val}")
+                else:
+                    logger.warning(f"Ei voitu purkaa tilastoa tästä wrapperista (puuttuvia elementtejä): {wrapper.prettify()}")
+        except Exception as e: logger.error(f"Virhe tilastojen purussa: {e}")
+
+        # Tapahtumat (maalit, kortit) puretaan erikseen
+        data['events_from_list'] = {};
+        try:
+            home_events = self.extract_events(soup, 'A') # Kotijoukkueen ID on usein 'A'
+            away_events = self.extract_events(soup, 'B') # Vierasjoukkueen ID on usein 'B'
+            data['events_from_list']['home'] = home_events
+            data['events_from_list']['away'] = away_events
+        except Exception as e:
+            logger.error(f"Yllättävä virhe extract_events-kutsussa ID {match_id}: {e}", exc_info=True)
+            data['events_from_list'] = {'home': {}, 'away': {}} # Alusta tyhjäksi virhetilanteessa
+
+        # Maalit ja syötöt -taulukko
+        data['goal_assist_details'] = {'home': [], 'away': []}
+        try:
+            heading = soup.find(self.GOAL_ASSIST_HEADING_SELECTOR, string=re.compile(r'Maalit\s+ja\s+syötöt', re.IGNORECASE))
+            if heading:
+                logger.debug("Löytyi 'Maalit ja syötöt' -otsikko.")
+                parent_row = heading.find_next_sibling(self.GOAL_ASSIST_ROW_SELECTOR) # Olettaa, että data on seuraavassa rivielementissä
+                if parent_row:
+                    cols = parent_row.select(self.GOAL_ASSIST_COL_SELECTOR) # Koti- ja vierasjoukkueen sarakkeet
+                    logger.debug(f"Löytyi {len(cols)} saraketta maali/syöttö-datalle.")
+                    for col in cols:
+                        team_name_h3 = col.select_one(self.GOAL_ASSIST_TEAM_NAME_SELECTOR)
+                        team_name = team_name_h3.get_text(strip=True) if team_name_h3 else None
+                        team_key = None
+                        # Määritä, onko kyseessä koti- vai vierasjoukkue
+                        if team_name and data['team_home'] and team_name in data['team_home']: team_key = 'home'
+                        elif team_name and data['team_away'] and team_name in data['team_away']: team_key = 'away'
+                        else: logger.warning(f"Ei tunnistettu joukkuetta '{team_name}' maali/syöttö-taulukosta."); continue
+                        
+                        logger.debug(f"Käsitellään maali/syöttö-taulukkoa joukkueelle: {team_name} ({team_key})")
+                        table = col.select_one(self.GOAL_ASSIST_TABLE_SELECTOR)
+                        if table:
+                            tbody = table.select_one(self.GOAL_ASSIST_TABLE_BODY_SELECTOR)
+                            if tbody:
+                                rows = tbody.select(self.GOAL_ASSIST_TABLE_ROW_SELECTOR)
+                                logger.debug(f"Löytyi {len(rows)} pelaajariviä taulukosta ({team_key}).")
+                                for row in rows:
+                                    jersey_el = row.select_one(self.GOAL_ASSIST_JERSEY_SELECTOR)
+                                    player_link_el = row.select_one(self.GOAL_ASSIST_PLAYER_SELECTOR)
+                                    contrib_el = row.select_one(self.GOAL_ASSIST_CONTRIBUTION_SELECTOR)
+                                    
+                                    if jersey_el and player_link_el and contrib_el:
+                                        jersey = jersey_el.get_text(strip=True)
+                                        player_name = player_link_el.get_text(strip=True)
+                                        player_link = player_link_el.get('href')
+                                        contrib_str = contrib_el.get_text(strip=True) # Esim. "2+1=3"
+                                        
+                                        goals, assists, total = 0, 0, 0
+                                        contrib_match = re.match(r'(\d+)\s*\+\s*(\d+)\s*=\s*(\d+)', contrib_str)
+                                        if contrib_match:
+                                            try:
+                                                goals = int(contrib_match.group(1))
+                                                assists = int(contrib_match.group(2))
+                                                total = int(contrib_match.group(3))
+                                            except ValueError:
+                                                logger.warning(f"Virhe muunnettaessa G+A numeroiksi: {contrib_str}")
+
+                                        player_data = {
+                                            'jersey': jersey, 'player': player_name, 'link': player_link, 
+                                            'contribution_raw': contrib_str, 'goals': goals, 'assists': assists, 'total_points': total
+                                        }
+                                        data['goal_assist_details'][team_key].append(player_data)
+                                    else:
+                                        logger.warning(f"Ei voitu purkaa kaikkia tietoja maali/syöttö-riviltä: {row.prettify()}")
+                            else: logger.warning(f"Ei löytynyt tbody-elementtiä maali/syöttö-taulukosta ({team_key}).")
+                        else: logger.warning(f"Ei löytynyt table-elementtiä maali/syöttö-sarakkeesta ({team_key}).")
+                else: logger.warning("Ei löytynyt rivielementtiä 'Maalit ja syötöt' -otsikon jälkeen.")
+            else: logger.debug("Ei löytynyt 'Maalit ja syötöt' -otsikkoa.")
+        except Exception as e:
+            logger.error(f"Virhe maali/syöttö-taulukon purussa: {e}")
+
+        logger.debug(f"Datan purku valmis ID:lle {match_id}")
+        return data
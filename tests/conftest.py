@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Skraperimoduulit ovat repon juuressa
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# audience_scraper avaa lokinsa tuonnissa; testit eivät saa kirjoittaa repon match_scraper.log-tiedostoon
+os.environ.setdefault("SCRAPER_LOG_FILE", os.path.join(tempfile.mkdtemp(prefix="scraper-tests-"), "match_scraper.log"))
@@ -0,0 +1,55 @@
+import queue
+import threading
+
+import pytest
+
+from audience_scraper import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        self.closed = True
+
+
+def _acquire_in_thread(pool):
+    got = []
+    thread = threading.Thread(target=lambda: got.append(pool.acquire()), daemon=True)
+    thread.start()
+    return thread, got
+
+
+@pytest.mark.parametrize("broken", [True, False])
+def test_waiter_gets_a_replacement_when_a_driver_is_recycled(broken):
+    # Kaatunut selain tai täysi sivuraja (1): selain suljetaan eikä idle-jonoon tule mitään
+    pool = DriverPool(FakeDriver, size=1, max_pages_per_driver=1 if not broken else 100)
+    first = pool.acquire()
+    thread, got = _acquire_in_thread(pool)
+    thread.join(0.2)
+    assert thread.is_alive() # Pooli täynnä: odottaa
+
+    pool.release(first, broken=broken)
+    thread.join(2)
+    assert not thread.is_alive() and got[0] is not first and first.closed
+    assert pool.launches == 2
+
+
+def test_waiter_gets_a_released_driver():
+    pool = DriverPool(FakeDriver, size=1)
+    first = pool.acquire()
+    thread, got = _acquire_in_thread(pool)
+    pool.release(first)
+    thread.join(2)
+    assert got == [first] and pool.launches == 1
+
+
+def test_acquire_times_out_when_the_pool_stays_full():
+    pool = DriverPool(FakeDriver, size=1)
+    pool.acquire()
+    with pytest.raises(queue.Empty):
+        pool.acquire(timeout=0.1)
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from audience_scraper import MatchPageParser, PARSER_BACKENDS
+from baseline_extraction import BaselineExtractor, baseline_soup
+from parser_benchmark import PAGE_CLASSES, synthetic_page, variants
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MATCH_ID = 3748500
+
+
+def pages():
+    """Every synthetic page class plus the fixture match page of the JSON adapter test"""
+    found = [(kind, synthetic_page(kind, MATCH_ID)) for kind in PAGE_CLASSES]
+    with open(os.path.join(FIXTURES, f"match_{MATCH_ID}.html"), encoding="utf-8") as f:
+        found.append(("fixture", f.read()))
+    return found
+
+
+@pytest.mark.parametrize("backend,partial", variants(PARSER_BACKENDS))
+@pytest.mark.parametrize("name,html", pages(), ids=[name for name, _ in pages()])
+def test_extraction_matches_baseline(name, html, backend, partial):
+    expected = BaselineExtractor().extract_data(baseline_soup(html), MATCH_ID)
+    parser = MatchPageParser(backend, partial)
+    assert parser.extract_data(parser.make_soup(html), MATCH_ID) == expected
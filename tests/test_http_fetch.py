@@ -0,0 +1,140 @@
+import sys
+import importlib
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from audience_scraper import MatchDataScraper, MatchPageParser
+import http_fetch
+from http_fetch import fetch_http_page, has_markers, MarkerMissTracker, MATCH_PAGE_MARKERS, PLAYER_STATS_MARKERS
+from parser_benchmark import synthetic_page
+from rate_limiter import configure_rate_limiter
+
+# Tilastosivu, jonka HTTP-vastauksessa on vain navigaation taulukko: tilastot syntyvät vasta JS:llä
+NAV_TABLE_PAGE = ("<html><body><table class=\"menu\"><tr><td>Sarjat</td></tr><tr><td>Joukkueet</td></tr></table>"
+                  "<div id=\"stats\"></div></body></html>")
+STATS_PAGE = ("<html><body><table class=\"spl-table\"><tr><th>#</th><th>Pelaaja</th><th>Joukkue</th><th>Maalit</th></tr>"
+              "<tr><td>1</td><td>Pekka Pelaaja</td><td>Koti FC</td><td>12</td></tr></table></body></html>")
+
+
+@pytest.fixture
+def stand_in_server():
+    """Local HTTP server; tests put {path: html} into the returned pages dict, requested paths go to hits"""
+    pages, hits = {}, []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = pages.get(self.path)
+            payload = (body or "").encode("utf-8")
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    configure_rate_limiter(rate=100, burst=100)
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", pages, hits
+    finally:
+        server.shutdown()
+        server.server_close()
+        configure_rate_limiter()
+
+
+@pytest.fixture(autouse=True)
+def marker_misses(monkeypatch):
+    """Fresh miss statistics per test so earlier misses never skip a later test's HTTP attempt"""
+    tracker = MarkerMissTracker(window=4, min_samples=4, skip_rate=0.9, reprobe_every=3)
+    monkeypatch.setattr(http_fetch, "marker_misses", tracker)
+    return tracker
+
+
+@pytest.fixture
+def fetch_and_calculate(tmp_path, monkeypatch):
+    """Import fetch_and_calculate in a temp dir: it opens its log and data/cache in the working directory"""
+    monkeypatch.chdir(tmp_path)
+    module = sys.modules.get("fetch_and_calculate") or importlib.import_module("fetch_and_calculate")
+    monkeypatch.setattr(module, "load_cache", lambda *args, **kwargs: None)
+    monkeypatch.setattr(module, "save_cache", lambda *args, **kwargs: None)
+    return module
+
+
+def test_player_stats_markers_reject_other_tables(stand_in_server):
+    base_url, pages, _ = stand_in_server
+    pages["/nav"], pages["/stats"] = NAV_TABLE_PAGE, STATS_PAGE
+    assert fetch_http_page(base_url + "/nav", PLAYER_STATS_MARKERS) == (None, None)
+    html, soup = fetch_http_page(base_url + "/stats", PLAYER_STATS_MARKERS)
+    assert html == STATS_PAGE and soup.select_one("table.spl-table")
+
+
+def test_marker_check_reuses_the_callers_soup(stand_in_server):
+    base_url, pages, _ = stand_in_server
+    pages["/match"] = synthetic_page('finished')
+    parser = MatchPageParser("lxml")
+    built = []
+
+    def make_soup(html):
+        built.append(parser.make_soup(html))
+        return built[-1]
+
+    html, soup = fetch_http_page(base_url + "/match", MATCH_PAGE_MARKERS, make_soup=make_soup)
+    assert html == pages["/match"] and len(built) == 1 and soup is built[0]
+    assert has_markers(soup, MATCH_PAGE_MARKERS) and not has_markers(soup, PLAYER_STATS_MARKERS)
+
+
+def test_match_page_is_parsed_once(stand_in_server, monkeypatch):
+    base_url, pages, _ = stand_in_server
+    pages["/match"] = synthetic_page('finished')
+    parser = MatchPageParser("lxml")
+    fake = SimpleNamespace(http_first=True, make_soup=parser.make_soup, rate_limiter=None)
+    html, soup = MatchDataScraper.fetch_page(fake, base_url + "/match")
+
+    monkeypatch.setattr(parser, "make_soup", lambda html: pytest.fail("sivu jäsennettiin uudelleen"))
+    record = parser.parse_page(html, 3748500, scrape_timestamp="test", soup=soup)
+    assert record == MatchPageParser("lxml").parse_page(html, 3748500, scrape_timestamp="test")
+
+
+def test_player_stats_fall_back_to_selenium_without_spl_table(stand_in_server, fetch_and_calculate, monkeypatch):
+    base_url, pages, _ = stand_in_server
+    pages["/goals"] = NAV_TABLE_PAGE
+    selenium_urls = []
+    monkeypatch.setattr(fetch_and_calculate, "fetch_with_selenium",
+                        lambda url, **kwargs: selenium_urls.append(url) or STATS_PAGE)
+
+    players = fetch_and_calculate.fetch_player_stats_category(base_url + "/goals", 'goals', 'goals')
+    assert selenium_urls == [base_url + "/goals"]
+    assert [player['name'] for player in players] == ["Pekka Pelaaja"]
+
+
+def test_player_stats_use_http_soup(stand_in_server, fetch_and_calculate, monkeypatch):
+    base_url, pages, _ = stand_in_server
+    pages["/goals"] = STATS_PAGE
+    monkeypatch.setattr(fetch_and_calculate, "fetch_with_selenium", lambda url, **kwargs: pytest.fail("Selenium-varapolku"))
+    monkeypatch.setattr(fetch_and_calculate, "BeautifulSoup", lambda *args, **kwargs: pytest.fail("sivu jäsennettiin uudelleen"))
+
+    players = fetch_and_calculate.fetch_player_stats_category(base_url + "/goals", 'goals', 'goals')
+    assert [player['name'] for player in players] == ["Pekka Pelaaja"]
+
+
+def test_host_without_markers_stops_costing_rate_limiter_tokens(stand_in_server):
+    base_url, pages, hits = stand_in_server
+    pages["/match"] = NAV_TABLE_PAGE # JS-sivun staattinen HTML: ottelumerkit puuttuvat aina
+    limiter = configure_rate_limiter(rate=100, burst=100)
+    for _ in range(4):
+        assert fetch_http_page(base_url + "/match", MATCH_PAGE_MARKERS) == (None, None)
+    assert len(hits) == 4 and limiter.requests == 4
+
+    results = [fetch_http_page(base_url + "/match", MATCH_PAGE_MARKERS) for _ in range(3)]
+    assert results == [(None, None)] * 3
+    assert len(hits) == 5 and limiter.requests == 5 # Vain joka 3. ohitettu kutsu kokeilee uudelleen
+
+    pages["/stats"] = STATS_PAGE # Eri merkit samalla isännällä lasketaan erikseen
+    assert fetch_http_page(base_url + "/stats", PLAYER_STATS_MARKERS)[0] == STATS_PAGE
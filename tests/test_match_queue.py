@@ -0,0 +1,29 @@
+from match_queue import MatchWorkQueue
+
+
+def test_replay_after_crash_keeps_frontier_below_empty_probes(tmp_path):
+    path = str(tmp_path / "match_queue.json")
+    queue = MatchWorkQueue(path, frontier=100)
+    queue.save()
+    # Frontier-haku: ID:t 101-110 ovat olemassa, 111-116 koetettiin tyhjiksi; ajo tapetaan ennen save():a
+    for match_id in range(111, 117):
+        queue.mark_empty(match_id)
+
+    restarted = MatchWorkQueue(path, frontier=100)
+    assert restarted.frontier == 100
+    assert all(restarted.entries[match_id]['state'] == 'empty' for match_id in range(111, 117))
+    assert restarted.due_ids(10) == list(range(101, 111))
+
+
+def test_replay_after_crash_keeps_claimed_ids_and_results(tmp_path):
+    path = str(tmp_path / "match_queue.json")
+    queue = MatchWorkQueue(path, frontier=100)
+    queue.save()
+    assert queue.due_ids(3) == [101, 102, 103]
+    queue.record_result(101, {'status': 'success_finished'})
+
+    restarted = MatchWorkQueue(path, frontier=100)
+    assert restarted.frontier == 103 # Jaetut ID:t eivät palaa uusina
+    assert restarted.entries[101]['state'] == 'done'
+    assert restarted.entries[102]['state'] == 'new'
+    assert sorted(restarted.due_ids(5)) == [102, 103, 104, 105, 106]
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from audience_scraper import MatchDataScraper
+from match_queue import MatchWorkQueue
+from match_store import MatchStore
+
+
+def _scraper(tmp_path):
+    store = MatchStore(str(tmp_path / "match_data.jsonl"))
+    return SimpleNamespace(store=store, match_data=store.records,
+                           work_queue=MatchWorkQueue(str(tmp_path / "match_queue.json")))
+
+
+def test_failed_revisit_keeps_stored_success(tmp_path):
+    scraper = _scraper(tmp_path)
+    stored = {'match_id': 7, 'status': 'success_not_started', 'match_datetime_raw': 'ma 1.9.2025 18:30'}
+    scraper.store.upsert(stored)
+
+    failure = {'match_id': 7, 'status': 'page_load_failed', 'status_details': ['HTML content was empty after fetch attempts.']}
+    assert MatchDataScraper._merge_result(scraper, 7, failure) is False
+    assert scraper.match_data[7] == stored
+    assert MatchStore(scraper.store.path).records[7] == stored # Epäonnistumista ei kirjattu lokiin
+
+    entry = scraper.work_queue.record_result(7, failure) # Jono saa silti epäonnistumisen ja uusintaviiveen
+    assert entry['state'] == 'failed' and entry['attempts'] == 1
+
+
+def test_success_and_first_failure_are_stored(tmp_path):
+    scraper = _scraper(tmp_path)
+    failure = {'match_id': 8, 'status': 'critical_error_processing'}
+    assert MatchDataScraper._merge_result(scraper, 8, failure) is False
+    assert scraper.match_data[8] == failure # Ei aiempaa tietuetta: virhe tallennetaan
+
+    success = {'match_id': 8, 'status': 'success_finished'}
+    assert MatchDataScraper._merge_result(scraper, 8, success) is True
+    assert scraper.match_data[8] == success
+
+
+def test_degraded_revisit_keeps_complete_record(tmp_path):
+    scraper = _scraper(tmp_path)
+    stored = {'match_id': 9, 'status': 'success_not_started', 'match_datetime_raw': 'ma 1.9.2025 18:30'}
+    scraper.store.upsert(stored)
+
+    degraded = {'match_id': 9, 'status': 'success_partial_data', 'match_datetime_raw': None}
+    assert MatchDataScraper._merge_result(scraper, 9, degraded) is True # Haku onnistui, tietue säilyy
+    assert scraper.match_data[9] == stored
+
+    live = {'match_id': 9, 'status': 'success_live', 'match_datetime_raw': 'ma 1.9.2025 18:30'}
+    assert MatchDataScraper._merge_result(scraper, 9, live) is True # Sama tai parempi taso korvaa
+    assert scraper.match_data[9] == live
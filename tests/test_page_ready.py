@@ -0,0 +1,95 @@
+import json
+import time
+import shutil
+import subprocess
+
+import pytest
+
+from page_ready import wait_until_ready, _READY_SCRIPT
+
+# Ajaa _READY_SCRIPTin Nodella minimaalista DOMia vasten. MutationObserver toimittaa muutoksen vain,
+# jos sen tyyppi on observe()-asetuksissa, kuten selaimessa; aika (performance.now) kulkee askelten mukaan.
+_DOM_HARNESS = """
+const [script, steps] = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+let now = 0;
+const observers = [], present = new Set(), states = [];
+global.performance = {now: () => now};
+global.window = {};
+global.MutationObserver = class {
+    constructor(callback) { this.callback = callback; }
+    observe(target, options) { this.options = options; observers.push(this); }
+};
+global.document = {documentElement: {}, readyState: 'complete', querySelector: (s) => present.has(s) ? {} : null};
+const delivered = (o, type) => type === 'childList' ? !!o.childList
+    : type === 'attributes' ? !!(o.attributes || o.attributeFilter || o.attributeOldValue)
+    : !!(o.characterData || o.characterDataOldValue);
+const ready = new Function(script);
+for (const step of steps) {
+    now = step.at * 1000;
+    if (step.add) { present.add(step.add); }
+    if (step.mutation) { observers.filter((o) => delivered(o.options, step.mutation)).forEach((o) => o.callback([{type: step.mutation}])); }
+    if (step.check) { states.push(ready(step.check)); }
+}
+console.log(JSON.stringify(states));
+"""
+NODE = shutil.which("node")
+
+
+def run_ready_script(steps):
+    """Return the script's state at every step with a 'check' selector list"""
+    done = subprocess.run([NODE, "-e", _DOM_HARNESS], input=json.dumps([_READY_SCRIPT, steps]),
+                          capture_output=True, text=True, check=True, timeout=30)
+    return json.loads(done.stdout)
+
+
+class TickingPage:
+    """Fake driver for a live match page: the clock changes the DOM on every poll, the status node appears after appear_after"""
+
+    def __init__(self, appear_after):
+        self.start = time.monotonic()
+        self.appear_after = appear_after
+
+    def execute_script(self, script, selectors):
+        elapsed = time.monotonic() - self.start
+        found = elapsed >= self.appear_after
+        return {'quiet': 0.0, 'present': elapsed - self.appear_after if found else 0,
+                'complete': True, 'missing': [] if found else list(selectors)}
+
+
+@pytest.mark.skipif(NODE is None, reason="Node.js puuttuu")
+def test_attribute_and_text_changes_do_not_reset_quiet():
+    states = run_ready_script([
+        {'at': 0.0, 'check': []},
+        {'at': 0.3, 'mutation': 'attributes'}, # Luokan vaihto
+        {'at': 0.4, 'mutation': 'characterData'}, # Kellon tekstisolmun päivitys
+        {'at': 1.0, 'check': []},
+        {'at': 1.1, 'mutation': 'childList'}, # Uusi solmu nollaa hiljaisuuden
+        {'at': 1.2, 'check': []},
+    ])
+    assert states[1]['quiet'] == pytest.approx(1.0)
+    assert states[2]['quiet'] == pytest.approx(0.1)
+
+
+@pytest.mark.skipif(NODE is None, reason="Node.js puuttuu")
+def test_required_nodes_report_how_long_they_have_been_present():
+    states = run_ready_script([
+        {'at': 0.0, 'check': ["span.status-name"]},
+        {'at': 0.5, 'add': "span.status-name", 'mutation': 'childList', 'check': ["span.status-name"]},
+        {'at': 0.9, 'mutation': 'childList'},
+        {'at': 1.0, 'check': ["span.status-name"]},
+    ])
+    assert states[0]['missing'] == ["span.status-name"] and states[0]['present'] == 0
+    assert states[2]['missing'] == [] and states[2]['present'] == pytest.approx(0.5)
+    assert states[2]['quiet'] == pytest.approx(0.1)
+
+
+def test_live_page_is_ready_once_required_nodes_stay():
+    waited, ready = wait_until_ready(TickingPage(appear_after=0.2), ["span.status-name"], quiet_period=0.2,
+                                     hard_cap=5.0, poll_interval=0.02, stats=None)
+    assert ready and 0.4 <= waited < 1.0
+
+
+def test_page_without_required_nodes_still_waits_for_quiet():
+    waited, ready = wait_until_ready(TickingPage(appear_after=0.0), [], quiet_period=0.2,
+                                     hard_cap=0.5, poll_interval=0.02, stats=None)
+    assert not ready and waited >= 0.5
@@ -0,0 +1,17 @@
+from page_store import PageStore
+
+
+def test_prune_keeps_newest_page_per_match_and_referenced_pages(tmp_path):
+    store = PageStore(str(tmp_path / "pages"))
+    old = store.put(1, "<html>vanha</html>", fetch_time="2025-01-01T00:00:00Z")
+    referenced = store.put(1, "<html>onnistunut</html>", fetch_time="2025-01-02T00:00:00Z")
+    newest = store.put(1, "<html>virhe</html>", fetch_time="2025-01-03T00:00:00Z")
+    other = store.put(2, "<html>toinen</html>", fetch_time="2025-01-01T00:00:00Z")
+
+    removed, freed = store.prune(keep_digests={referenced})
+    assert removed == 1 and freed > 0
+    assert store.get(old) is None
+    assert store.get(referenced) == "<html>onnistunut</html>"
+    assert store.latest_entries()[1]['sha256'] == newest
+    assert store.latest_entries()[2]['sha256'] == other
+    assert {entry['sha256'] for entry in store.iter_index()} == {referenced, newest, other}
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from audience_scraper import MatchDataScraper, MatchPageParser
+from match_store import MatchStore
+from page_store import PageStore
+from parser_benchmark import synthetic_page
+
+MATCH_ID = 3748500
+T1, T2 = '2026-10-17T18:00:00Z', '2026-10-17T19:00:00Z'
+
+
+def _scraper(tmp_path):
+    store = MatchStore(str(tmp_path / "match_data.jsonl"))
+    return SimpleNamespace(store=store, match_data=store.records, page_store=PageStore(str(tmp_path / "pages")),
+                           parser_backend="html.parser", save_data=lambda: None)
+
+
+def _store_success_then_error(scraper):
+    """A finished page at T1 is the stored record; the T2 revisit got an error page that is kept in the page store"""
+    good_html = synthetic_page('finished', MATCH_ID)
+    good_digest = scraper.page_store.put(MATCH_ID, good_html, fetch_time=T1)
+    record = MatchPageParser("html.parser").parse_page(good_html, MATCH_ID, T1)
+    record['page_sha256'] = good_digest
+    scraper.store.upsert(record)
+    scraper.page_store.put(MATCH_ID, synthetic_page('empty', MATCH_ID), fetch_time=T2)
+    return good_digest
+
+
+def test_reparse_uses_the_records_own_page(tmp_path):
+    scraper = _scraper(tmp_path)
+    good_digest = _store_success_then_error(scraper)
+
+    assert MatchDataScraper.reparse(scraper, workers=1) == 1
+    assert scraper.match_data[MATCH_ID]['status'] == 'success_finished'
+    assert scraper.match_data[MATCH_ID]['page_sha256'] == good_digest
+
+
+def test_reparse_never_replaces_a_success_with_a_newer_error_page(tmp_path):
+    scraper = _scraper(tmp_path)
+    good_digest = _store_success_then_error(scraper)
+    scraper.page_store.blob_path(good_digest).unlink() # Oma sivu kadonnut: varalla uusin (virhe)sivu
+
+    assert MatchDataScraper.reparse(scraper, workers=1) == 0
+    assert scraper.match_data[MATCH_ID]['status'] == 'success_finished'
+    assert scraper.match_data[MATCH_ID]['page_sha256'] == good_digest
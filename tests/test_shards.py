@@ -0,0 +1,63 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from audience_scraper import MatchDataScraper
+from match_queue import MatchWorkQueue
+from match_store import MatchStore
+from shard_lease import LeaseStore
+
+
+def _timestamp():
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class StubScraper(MatchDataScraper):
+    def process_match(self, match_id):
+        return {'match_id': match_id, 'scrape_timestamp': _timestamp(), 'status': 'success_finished', 'status_details': []}
+
+
+def test_give_back_splits_the_leased_range(tmp_path):
+    leases = LeaseStore(str(tmp_path / "leases.sqlite"))
+    leases.plan(1, 10, range_size=10)
+    assert leases.claim("a") == (1, 10)
+    assert leases.give_back("b", 1, 4) is False # Vain vuokraaja voi palauttaa
+    assert leases.give_back("a", 1, 4) is True
+    assert leases.complete("a", 1)
+    assert leases.claim("b") == (5, 10)
+    assert leases.summary() == "pending 0, leased 1, done 1"
+
+
+def test_shard_worker_stops_at_budget_inside_a_range(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    leases = LeaseStore(str(tmp_path / "leases.sqlite"))
+    leases.plan(100, 149, range_size=50)
+    scraper = StubScraper(max_matches=7, http_first=False, partition=str(tmp_path / "parts" / "w1"))
+    scraper.run_shard_worker(leases, "w1")
+
+    assert sorted(scraper.match_data) == list(range(100, 107))
+    assert leases.summary() == "pending 1, leased 0, done 1"
+    assert leases.claim("w2") == (107, 149)
+
+
+@pytest.mark.parametrize("canonical_status, shard_status, merged_status", [
+    ('success_finished', 'page_load_failed', 'success_finished'), # Uudempi virhe ei korvaa onnistumista
+    ('page_load_failed', 'success_finished', 'success_finished'),
+    ('success_not_started', 'success_finished', 'success_finished'),
+    ('success_live', 'success_partial_data', 'success_live'), # Vajaa sivu ei korvaa live-tietuetta
+    ('success_not_started', 'success_data_found_unknown_state', 'success_not_started'),
+])
+def test_merge_prefers_success_over_newer_failure(tmp_path, canonical_status, shard_status, merged_status):
+    store = MatchStore(str(tmp_path / "match_data.jsonl"))
+    store.upsert({'match_id': 1, 'scrape_timestamp': '2025-01-01T00:00:00Z', 'status': canonical_status})
+    (tmp_path / "parts" / "w1").mkdir(parents=True)
+    part = MatchStore(str(tmp_path / "parts" / "w1" / "match_data.jsonl"))
+    part.upsert({'match_id': 1, 'scrape_timestamp': '2025-02-01T00:00:00Z', 'status': shard_status})
+    part.close()
+
+    scraper = SimpleNamespace(store=store, match_data=store.records, work_queue=MatchWorkQueue(str(tmp_path / "match_queue.json")),
+                              save_data=lambda: None, save_progress=lambda: None, current_id=0)
+    MatchDataScraper.merge_shards(scraper, root=str(tmp_path / "parts"))
+    assert store.records[1]['status'] == merged_status
+    assert MatchDataScraper.merge_shards(scraper, root=str(tmp_path / "parts")) == 0 # Toistettava
@@ -0,0 +1,109 @@
+import os
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from audience_scraper import MatchPageParser
+from rate_limiter import configure_rate_limiter
+from tulospalvelu_source import TulospalveluJsonSource
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MATCH_ID = 3748500
+
+# JSON-rajapinnalla ei ole sivun <title>-tekstiä, joten kenttä on aina None
+NOT_IN_JSON = {'page_title'}
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def api_server():
+    """Serve the getMatch fixture at /taso/rest/getMatch on a local port"""
+    body = read_fixture(f"getMatch_{MATCH_ID}.json").encode("utf-8")
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            requests_seen.append((url.path, query))
+            if url.path == "/taso/rest/getMatch" and query.get('match_id') == [str(MATCH_ID)]:
+                payload, status = body, 200
+            else:
+                payload, status = json.dumps({'match': None}).encode("utf-8"), 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    configure_rate_limiter(rate=100, burst=100)
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/taso/rest/", requests_seen
+    finally:
+        server.shutdown()
+        server.server_close()
+        configure_rate_limiter()
+
+
+def test_json_record_matches_html_extraction(api_server):
+    api_url, requests_seen = api_server
+    record = TulospalveluJsonSource(api_url=api_url, api_key=None).fetch_record(MATCH_ID)
+    parser = MatchPageParser()
+    expected = parser.extract_data(parser.make_soup(read_fixture(f"match_{MATCH_ID}.html")), MATCH_ID)
+
+    assert [path for path, _ in requests_seen] == ["/taso/rest/getMatch"] # Yksi pyyntö per ottelu
+    assert set(record) == set(expected)
+    assert all(record[field] is None for field in NOT_IN_JSON)
+    for field in sorted(set(record) - NOT_IN_JSON - {'goal_assist_details'}):
+        assert record[field] == expected[field], field
+    assert record['match_id_from_page'] == MATCH_ID # match_id, ei sarjan match_number-kenttää
+
+    # HTML-polun otsikkohaku (soup.find CSS-selektorilla) ei löydä Maalit ja syötöt -taulukkoa,
+    # joten sitä verrataan suoraan fixture-sivun riveihin
+    assert record['goal_assist_details'] == {
+        'home': [
+            {'jersey': '9', 'player': 'Pekka Pelaaja', 'link': '/pelaaja/101', 'contribution_raw': '2+0=2',
+             'goals': 2, 'assists': 0, 'total_points': 2},
+            {'jersey': '10', 'player': 'Seppo Syöttäjä', 'link': '/pelaaja/102', 'contribution_raw': '0+2=2',
+             'goals': 0, 'assists': 2, 'total_points': 2},
+        ],
+        'away': [
+            {'jersey': '7', 'player': 'Ville Vieras', 'link': '/pelaaja/201', 'contribution_raw': '1+0=1',
+             'goals': 1, 'assists': 0, 'total_points': 1},
+        ],
+    }
+
+
+def test_classification_matches_html_path(api_server):
+    api_url, _ = api_server
+    record = TulospalveluJsonSource(api_url=api_url, api_key=None).fetch_record(MATCH_ID)
+    record.update({'scrape_timestamp': "test", 'status_details': []})
+    parser = MatchPageParser()
+    parser.classify_result(record, MATCH_ID)
+    expected = parser.parse_page(read_fixture(f"match_{MATCH_ID}.html"), MATCH_ID, scrape_timestamp="test")
+    assert (record['status'], record['status_details']) == (expected['status'], expected['status_details'])
+
+
+def test_unknown_match_falls_back_to_html(api_server):
+    api_url, _ = api_server
+    assert TulospalveluJsonSource(api_url=api_url, api_key=None).fetch_record(MATCH_ID + 1) is None
+
+
+def test_event_without_minute_has_no_time():
+    match = json.loads(read_fixture(f"getMatch_{MATCH_ID}.json"))['match']
+    match['events'].append({"code": "varoitus", "team_id": "5001", "player_id": "104", "player_name": "Aku Aikaton"})
+    yellow_cards = TulospalveluJsonSource(api_url="http://127.0.0.1:9/", api_key=None).map_events(match, 'A')['yellow_cards']
+    assert yellow_cards == [{'player': 'Kalle Koti', 'time': "44'"}, {'player': 'Aku Aikaton', 'time': None}]
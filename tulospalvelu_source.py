@@ -0,0 +1,198 @@
+import os
+import re
+import time
+import logging
+import datetime
+
+import requests
+
+from http_fetch import get_session, HTTP_TIMEOUT, RETRY_STATUSES
+from rate_limiter import get_rate_limiter
+from scrape_metrics import scrape_metrics
+
+# -------------------------------------------------------
+# Tulospalvelun JSON-lähde: ottelusivun widgetit täytetään Torneopalin REST-rajapinnasta,
+# joten sama data saadaan suoraan JSONina ilman selainta ja DOM-jäsennystä.
+# Yksi getMatch-vastaus riittää: tapahtumat (events), kokoonpanot (lineups) ja tilastot (statistics)
+# ovat sen match-objektin listoja, eikä niille tehdä erillisiä pyyntöjä.
+# Sovitin tuottaa saman tietuemuodon kuin MatchDataScraper.extract_data (tests/test_tulospalvelu_source.py).
+# -------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+JSON_API_URL = os.environ.get("TULOSPALVELU_API_URL", "https://spl.torneopal.net/taso/rest/")
+JSON_API_KEY = os.environ.get("TULOSPALVELU_API_KEY") # Ilman avainta rajapinta voi hylätä pyynnön, jolloin käytetään HTML-polkua
+
+# Rajapinnan tilakoodit -> sivulla näkyvä teksti, jotta tilaluokittelu toimii samoin kuin HTML-polulla
+STATUS_TEXTS = {
+    'played': 'Päättynyt',
+    'finished': 'Päättynyt',
+    'fixture': 'Ei alkanut',
+    'scheduled': 'Ei alkanut',
+    'live': 'Käynnissä',
+    'playing': 'Käynnissä',
+}
+# Tapahtumakoodit -> events_from_list-avain
+EVENT_KINDS = {
+    'maali': 'goals', 'goal': 'goals', 'rp': 'goals',
+    'varoitus': 'yellow_cards', 'yellow': 'yellow_cards', 'kv': 'yellow_cards',
+    'ulosajo': 'red_cards', 'red': 'red_cards', 'pv': 'red_cards',
+}
+WEEKDAYS_FI = ['Maanantai', 'Tiistai', 'Keskiviikko', 'Torstai', 'Perjantai', 'Lauantai', 'Sunnuntai']
+
+
+def clean_stat_name(stat_name_raw):
+    """Normalize a statistic label the same way for HTML and JSON sources"""
+    # Siivoa tilaston nimi: poista sulut, pienet kirjaimet, välilyönnit alaviivoiksi, skandit
+    return re.sub(r'[()]', '', stat_name_raw.lower().replace(" ", "_").replace("ä", "a").replace("ö", "o"))
+
+
+def _int_or_raw(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _format_datetime(date_str, time_str):
+    """Build match_datetime_raw in the page format 'HH:MM | Viikonpäivä DD.MM.YYYY'"""
+    if not date_str:
+        return None
+    try:
+        date_obj = datetime.date.fromisoformat(date_str[:10])
+    except ValueError:
+        return f"{(time_str or '??:??')[:5]} | {date_str}"
+    date_part = f"{WEEKDAYS_FI[date_obj.weekday()]} {date_obj.day:02d}.{date_obj.month:02d}.{date_obj.year}"
+    return f"{(time_str or '??:??')[:5]} | {date_part}"
+
+
+class TulospalveluJsonSource:
+    """Fetches match records as JSON from the tulospalvelu backend instead of scraping the rendered page."""
+
+    def __init__(self, api_url=JSON_API_URL, api_key=JSON_API_KEY, timeout=HTTP_TIMEOUT):
+        self.api_url = api_url if api_url.endswith('/') else api_url + '/'
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def fetch_json(self, endpoint, **params):
+        if self.api_key:
+            params['api_key'] = self.api_key
+        url = self.api_url + endpoint
+        limiter = get_rate_limiter()
+        limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = get_session().get(url, params=params, timeout=self.timeout,
+                                         headers={'Accept': 'application/json'})
+        except requests.RequestException as e:
+            limiter.record(time.monotonic() - start, ok=False)
+            scrape_metrics.observe('json_fetch_seconds', time.monotonic() - start)
+            scrape_metrics.count('json_status', status=type(e).__name__)
+            logger.info("JSON-haku epäonnistui (%s): %s - %s", endpoint, type(e).__name__, e)
+            return None
+        limiter.record(time.monotonic() - start, ok=response.status_code not in RETRY_STATUSES)
+        scrape_metrics.observe('json_fetch_seconds', time.monotonic() - start)
+        scrape_metrics.count('json_status', status=response.status_code)
+        if response.status_code != 200:
+            logger.info("JSON-rajapinta palautti tilan %s (%s %s)", response.status_code, endpoint, params.get('match_id'))
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            logger.info("JSON-haku epäonnistui (%s): %s - %s", endpoint, type(e).__name__, e)
+            return None
+
+    def fetch_record(self, match_id):
+        """Return a record in extract_data format from one getMatch call, or None if the JSON path cannot serve this match"""
+        payload = self.fetch_json('getMatch', match_id=match_id)
+        match = payload.get('match') if isinstance(payload, dict) else None
+        if not isinstance(match, dict) or not match.get('match_id'):
+            logger.info("JSON-lähteellä ei ottelua ID:lle %s, käytetään HTML-polkua.", match_id)
+            return None
+        return self.map_match(match, match_id)
+
+    def map_match(self, match, match_id):
+        # Sivun "Ottelu N" on ottelun ID; match_number on sarjan sisäinen numero eikä vastaa sitä
+        data = {'match_id': match_id, 'match_id_from_page': _int_or_raw(match.get('match_id'))}
+        data['page_title'] = None
+        data['team_home'] = match.get('team_A_name') or None
+        data['team_away'] = match.get('team_B_name') or None
+
+        fs_a, fs_b = match.get('fs_A'), match.get('fs_B')
+        data['score'] = f"{fs_a}–{fs_b}" if fs_a not in (None, '') and fs_b not in (None, '') else None
+        hts_a, hts_b = match.get('hts_A'), match.get('hts_B')
+        data['score_halftime'] = f"{hts_a}–{hts_b}" if hts_a not in (None, '') and hts_b not in (None, '') else None
+
+        status_code = str(match.get('status') or '').lower()
+        data['match_status_raw'] = STATUS_TEXTS.get(status_code, match.get('status') or None)
+        data['match_datetime_raw'] = _format_datetime(match.get('date'), match.get('time'))
+        venue_parts = [match.get('venue_location_name'), match.get('venue_name')]
+        data['venue'] = ', '.join(filter(None, venue_parts)) or None
+
+        data['formation'] = match.get('formation') or None
+        data['match_duration_format'] = match.get('duration') or None
+        data['substitutions_allowed'] = match.get('substitutions') or None
+        data['weather'] = match.get('weather') or None
+        attendance = str(match.get('attendance') or '')
+        data['audience'] = int(attendance) if attendance.isdigit() else None
+
+        data['awards'] = []
+        for award in match.get('awards') or []:
+            if award.get('player_name') and award.get('player_id'):
+                data['awards'].append({
+                    'player': award['player_name'],
+                    'link': f"/pelaaja/{award['player_id']}",
+                    'stars': _int_or_raw(award.get('stars') or 0),
+                })
+
+        data['stats'] = {}
+        for stat in match.get('statistics') or []:
+            name = stat.get('name')
+            if name:
+                data['stats'][clean_stat_name(name)] = {'home': _int_or_raw(stat.get('value_A')),
+                                                        'away': _int_or_raw(stat.get('value_B'))}
+
+        data['events_from_list'] = {'home': self.map_events(match, 'A'), 'away': self.map_events(match, 'B')}
+        data['goal_assist_details'] = {'home': self.map_contributions(match, 'A'),
+                                       'away': self.map_contributions(match, 'B')}
+        return data
+
+    def map_events(self, match, team_suffix):
+        events = {'goals': [], 'yellow_cards': [], 'red_cards': []}
+        team_id = match.get(f'team_{team_suffix}_id')
+        for event in match.get('events') or []:
+            if str(event.get('team_id')) != str(team_id):
+                continue
+            kind = EVENT_KINDS.get(str(event.get('code') or '').lower())
+            player_name = event.get('player_name')
+            if not kind or not player_name:
+                continue
+            time_min = str(event.get('time_min') or '').replace("'", "")
+            entry = {'player': player_name, 'time': f"{time_min}'" if time_min else None} # Ei pelkkää heittomerkkiä
+            if kind == 'goals':
+                entry['link'] = f"/pelaaja/{event['player_id']}" if event.get('player_id') else None
+            events[kind].append(entry)
+        return events
+
+    def map_contributions(self, match, team_suffix):
+        """Goals and assists table from the lineup records"""
+        contributions = []
+        lineups = match.get('lineups') or []
+        if isinstance(lineups, dict): # Joko {'A': [...], 'B': [...]} tai yksi lista team_id:llä
+            players = lineups.get(team_suffix) or []
+        else:
+            team_id = str(match.get(f'team_{team_suffix}_id'))
+            players = [p for p in lineups if str(p.get('team_id')) == team_id]
+        for player in players:
+            goals = _int_or_raw(player.get('goals') or 0)
+            assists = _int_or_raw(player.get('assists') or 0)
+            if not isinstance(goals, int) or not isinstance(assists, int) or goals + assists == 0:
+                continue
+            contributions.append({
+                'jersey': str(player.get('shirt_number') or ''),
+                'player': player.get('player_name'),
+                'link': f"/pelaaja/{player['player_id']}" if player.get('player_id') else None,
+                'contribution_raw': f"{goals}+{assists}={goals + assists}",
+                'goals': goals, 'assists': assists, 'total_points': goals + assists,
+            })
+        return contributions